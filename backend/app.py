@@ -8,6 +8,7 @@ Run from backend/ directory:
 
 from flask import Flask, jsonify
 from flask_cors import CORS
+from werkzeug.serving import is_running_from_reloader
 import os
 import sys
 from dotenv import load_dotenv
@@ -18,6 +19,8 @@ load_dotenv()
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from utils.warmup import WARMUP_ON_STARTUP, get_warmup, start_warmup
+
 # Import route blueprints
 from routes.admin_routes import admin_bp
 from routes.farmer_routes import farmer_bp
@@ -30,6 +33,11 @@ CORS(app)  # Enable CORS for mobile app access
 app.register_blueprint(admin_bp)
 app.register_blueprint(farmer_bp)
 
+# Initialize Firestore, models and plant DB before the first request
+# (under `python app.py`, see the bottom of this file)
+if WARMUP_ON_STARTUP and __name__ != '__main__':
+    start_warmup()
+
 
 @app.route('/')
 def index():
@@ -49,7 +57,10 @@ def index():
                     'GET /valve/status - Check valve status',
                     'POST /ai-mode - Toggle AI automatic mode',
                     'POST /decision - Get AI irrigation decision',
+                    'POST /telemetry - Ingest a batch of sensor readings',
+                    'GET /sensor-history - Downsampled sensor history',
                     'GET /history - View irrigation history',
+                    'GET /usage - Daily irrigation counters',
                     'GET /plants - List user plants'
                 ]
             },
@@ -57,22 +68,30 @@ def index():
                 'description': 'Admin dashboard for system management',
                 'base_url': '/api/admin',
                 'endpoints': [
-                    'GET /users - List all users',
+                    'GET /users - List users (?limit=&cursor= pages, streamed otherwise)',
                     'POST /users - Add new user',
+                    'POST /users/bulk - Import users from CSV or JSON',
                     'GET /users/<id> - Get user details',
                     'PUT /users/<id> - Update user',
                     'DELETE /users/<id> - Delete user',
                     'POST /users/<id>/plants - Add plant to user',
                     'DELETE /users/<id>/plants/<name> - Remove plant',
                     'GET /plants - List all available plants',
-                    'GET /stats - System statistics'
+                    'GET /stats - System statistics',
+                    'POST /stats/reconcile - Recount user stats counters',
+                    'GET /irrigation-rollups - Daily irrigation counters',
+                    'GET /log-queue - Irrigation log queue metrics',
+                    'GET /profile-cache - User profile cache metrics',
+                    'GET /weather-cache - Forecast cache metrics',
+                    'POST /weather-cache/prefetch - Warm forecasts for all user locations'
                 ]
             }
         },
         'documentation': {
             'api_docs': '/api/docs (coming soon)',
             'readme': 'See README.md in backend folder'
-        }
+        },
+        'system': ['GET /health - Liveness', 'GET /ready - Readiness (503 until warmup finishes)']
     })
 
 
@@ -86,6 +105,13 @@ def health():
     })
 
 
+@app.route('/ready')
+def ready():
+    """Readiness check - 503 until startup warmup has finished"""
+    status = get_warmup().get_status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+
 if __name__ == '__main__':
     print()
     print("="*70)
@@ -110,9 +136,15 @@ if __name__ == '__main__':
     print("="*70)
     print()
     
+    debug = True  # Set to False in production
+    
+    # With the debug reloader, only the serving child process warms up
+    if WARMUP_ON_STARTUP and (not debug or is_running_from_reloader()):
+        start_warmup()
+    
     # Run Flask app
     app.run(
         host='0.0.0.0',
         port=5000,
-        debug=True  # Set to False in production
+        debug=debug
     )
@@ -0,0 +1,61 @@
+"""
+Archive old irrigation logs
+Moves logs older than the retention window out of irrigation_logs into
+per-user, per-month archive documents (or local Parquet files)
+
+Examples:
+  python archive_logs.py --dry-run
+  python archive_logs.py --retention-days 90
+  python archive_logs.py --backend parquet
+"""
+import argparse
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.archive_service import archive_old_logs, ARCHIVE_BACKEND, RETENTION_DAYS
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archive old irrigation logs')
+    parser.add_argument('--retention-days', type=int, default=RETENTION_DAYS,
+                        help=f'Keep logs newer than this in irrigation_logs (default {RETENTION_DAYS})')
+    parser.add_argument('--backend', choices=['firestore', 'parquet'], default=ARCHIVE_BACKEND,
+                        help=f'Archive destination (default {ARCHIVE_BACKEND})')
+    parser.add_argument('--max-logs', type=int, default=None, help='Stop after this many logs')
+    parser.add_argument('--dry-run', action='store_true', help='Only count logs that would be archived')
+    parser.add_argument('--yes', action='store_true', help='Do not ask for confirmation')
+    args = parser.parse_args()
+
+    print("="*70)
+    print("🗄️  ARCHIVING IRRIGATION LOGS")
+    print("="*70)
+    print(f"Retention: {args.retention_days} days | Backend: {args.backend}"
+          f"{' | DRY RUN' if args.dry_run else ''}")
+    print()
+
+    if not args.dry_run and not args.yes:
+        response = input("Logs will be moved out of irrigation_logs. Continue? (yes/no): ")
+        if response.lower() not in ['yes', 'y']:
+            print("❌ Cancelled.")
+            return
+
+    result = archive_old_logs(args.retention_days, args.backend,
+                              dry_run=args.dry_run, max_logs=args.max_logs)
+
+    print()
+    if not result['success']:
+        print(f"❌ {result['error']}")
+        return
+
+    print("="*70)
+    print("📊 SUMMARY")
+    print("="*70)
+    print(f"Cutoff: {result['cutoff']}")
+    print(f"{'Would archive' if args.dry_run else 'Archived'}: {result['logs_archived']} logs "
+          f"in {result['user_months']} user-months")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Rebuild irrigation rollups from existing irrigation_logs (and archived logs)
+Run once after deploying rollups, or to correct drift
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.rollup_service import backfill_rollups
+
+
+def run_backfill():
+    """Scan all logs and rewrite every rollup document"""
+    print("="*70)
+    print("📊 BACKFILLING IRRIGATION ROLLUPS")
+    print("="*70)
+    print()
+
+    result = backfill_rollups()
+
+    print()
+    print("="*70)
+    print("📊 SUMMARY")
+    print("="*70)
+    print(f"📄 Logs scanned: {result['logs_scanned']}")
+    print(f"🗄️  Archived logs scanned: {result['archived_logs_scanned']}")
+    print(f"👤 Per-user daily rollups written: {result['user_day_rollups']}")
+    print(f"📅 System daily rollups written: {result['daily_rollups']}")
+    print(f"🗑️  Stale rollups deleted (no logs left): {result['stale_rollups_deleted']}")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    print()
+    print("This script will overwrite all irrigation rollup documents")
+    print("with counters recomputed from irrigation_logs, and delete")
+    print("rollups of days that have no logs left.")
+    print("Run it while no irrigation decisions are being made.")
+    print()
+
+    response = input("Continue? (yes/no): ")
+
+    if response.lower() in ['yes', 'y']:
+        run_backfill()
+    else:
+        print("❌ Cancelled.")
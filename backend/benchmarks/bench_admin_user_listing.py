@@ -0,0 +1,163 @@
+"""
+BENCHMARK - Admin user listing memory
+=====================================
+
+Seeds N farmers (default 100,000, a few plants with full features each) and
+compares peak Python memory and time of:
+1. list_all_users() - every user held in one list (the old GET /users)
+2. GET /api/admin/users streamed page by page
+3. Walking the pages with ?limit=&cursor= like the dashboard does
+
+Peak memory is measured with tracemalloc, which slows everything down, so
+compare the cases with each other rather than with production latency.
+
+Run from backend/ directory (the in-memory backend is the default here;
+seeding 100k users into Firestore costs 100k writes):
+  python benchmarks/bench_admin_user_listing.py --users 100000
+  STORAGE_BACKEND=firestore python benchmarks/bench_admin_user_listing.py --users 5000
+  STORAGE_BACKEND=firestore python benchmarks/bench_admin_user_listing.py --cleanup
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+os.environ.setdefault('WARMUP_ON_STARTUP', '0')
+
+from app import app
+from utils.firebase_client import get_db
+from utils.repositories import USERS_COLLECTION
+from services.admin_service import list_all_users
+from services.plant_service import get_plant_database
+
+BENCH_PREFIX = 'bench_list_'
+FIRESTORE_BATCH_LIMIT = 500
+
+
+def seed_users(count: int, plants_per_user: int):
+    """Write `count` farmers in batches of 500"""
+    db = get_db()
+    crops = list(get_plant_database().items())
+    print(f"🌱 Seeding {count} users...")
+    batch = db.batch()
+    for i in range(count):
+        user_id = f'{BENCH_PREFIX}{i:07d}'
+        plants = [{'name': name, 'area_sqm': 100, 'features': dict(features)}
+                  for name, features in crops[i % len(crops):][:plants_per_user]]
+        batch.set(db.collection(USERS_COLLECTION).document(user_id), {
+            'user_id': user_id,
+            'email': f'farmer{i}@example.com',
+            'name': f'Farmer {i}',
+            'location': 'Zaghouan',
+            'soil_properties': {'soil_type': 'loam', 'soil_type_encoded': 2,
+                                'soil_compaction': 55, 'slope_degrees': 3.5},
+            'plants': plants,
+            'created_at': '2025-11-01T10:00:00',
+            'last_watering': None,
+            'ai_mode': i % 3 != 0,
+            'role': 'farmer'
+        })
+        if len(batch) == FIRESTORE_BATCH_LIMIT:
+            batch.commit()
+            batch = db.batch()
+    if len(batch):
+        batch.commit()
+    print("   ✅ Seeded")
+
+
+def cleanup_users():
+    """Delete every benchmark user"""
+    db = get_db()
+    query = db.collection(USERS_COLLECTION)\
+              .where('__name__', '>=', db.collection(USERS_COLLECTION).document(BENCH_PREFIX))\
+              .where('__name__', '<', db.collection(USERS_COLLECTION).document(BENCH_PREFIX + '~'))
+    deleted = 0
+    while True:
+        docs = list(query.limit(FIRESTORE_BATCH_LIMIT).select([]).stream())
+        if not docs:
+            break
+        batch = db.batch()
+        for doc in docs:
+            batch.delete(doc.reference)
+        batch.commit()
+        deleted += len(docs)
+    print(f"🧹 Deleted {deleted} benchmark users")
+
+
+def measure(label: str, fn):
+    """Run fn under tracemalloc and print users, peak MB and seconds"""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    users, size = fn()
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"   {label:22s} {users:8d} users  {size / 1e6:7.1f} MB JSON  "
+          f"peak {peak / 1e6:7.1f} MB  {elapsed:6.1f} s")
+
+
+def in_memory_list():
+    with app.test_request_context():
+        result = list_all_users('farmer')
+        body = app.json.dumps(result).encode('utf-8')
+    return result['count'], len(body)
+
+
+def streamed():
+    client = app.test_client()
+    response = client.get('/api/admin/users?role=farmer', buffered=False)
+    size = 0
+    for chunk in response.response:
+        size += len(chunk)
+    tail = chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk
+    return int(tail.split('"count": ')[1].split(',')[0]), size
+
+
+def paged(page_size: int):
+    client = app.test_client()
+    users = size = 0
+    cursor = ''
+    while True:
+        response = client.get(f'/api/admin/users?role=farmer&limit={page_size}&cursor={cursor}')
+        page = response.get_json()
+        users += page['count']
+        size += len(response.get_data())
+        cursor = page['next_cursor']
+        if not cursor:
+            return users, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark admin user listing memory')
+    parser.add_argument('--users', type=int, default=100000, help='Users to seed')
+    parser.add_argument('--plants', type=int, default=3, help='Plants per user')
+    parser.add_argument('--page-size', type=int, default=1000, help='Page size for the cursor walk')
+    parser.add_argument('--no-seed', action='store_true', help='Reuse previously seeded users')
+    parser.add_argument('--cleanup', action='store_true', help='Delete benchmark users and exit')
+    args = parser.parse_args()
+
+    if args.cleanup:
+        cleanup_users()
+        return
+
+    print("=" * 70)
+    print("📊 ADMIN USER LISTING BENCHMARK")
+    print("=" * 70)
+
+    if not args.no_seed:
+        seed_users(args.users, args.plants)
+
+    print()
+    measure('list_all_users()', in_memory_list)
+    measure('GET /users (stream)', streamed)
+    measure(f'GET /users?limit={args.page_size}', lambda: paged(args.page_size))
+
+    print("\n" + "=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+BENCHMARK - Forecast payload parsing
+====================================
+
+Compares parsing of a WeatherAPI forecast.json payload (2 days x 24 hours):
+1. Legacy: strptime on every hour's time string + Python list appends
+2. Current: utils.forecast.parse_forecast (epoch index arithmetic + NumPy)
+
+Uses the sample payload in benchmarks/fixtures/ (WeatherAPI format) at
+several local times, checks that both parsers agree, then times them.
+JSON decoding is excluded: both parsers get the same decoded dict.
+The current parser also extracts temperature/humidity/wind/radiation and
+computes hourly ET0, which the legacy loop did not; that work runs once per
+forecast refresh, not per request.
+
+Run from backend/ directory:
+  python benchmarks/bench_forecast_parsing.py
+  python benchmarks/bench_forecast_parsing.py --iterations 20000
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.forecast import parse_forecast
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures',
+                       'weatherapi_forecast_zaghouan.json')
+
+
+def legacy_parse(data, location):
+    """The parsing loop get_weather_forecast used before"""
+    current = data['current']
+    current_weather = {
+        'temperature': current['temp_c'],
+        'humidity': current['humidity'],
+        'condition': current['condition']['text'],
+        'wind_kph': current.get('wind_kph', 0),
+        'feels_like': current.get('feelslike_c', current['temp_c'])
+    }
+    current_time = datetime.strptime(data["location"]["localtime"], "%Y-%m-%d %H:%M")
+    hourly_rain_probability = []
+    hourly_precipitation_mm = []
+    for day in data["forecast"]["forecastday"]:
+        for hour in day["hour"]:
+            hour_time = datetime.strptime(hour["time"], "%Y-%m-%d %H:%M")
+            if current_time <= hour_time < current_time + timedelta(hours=24):
+                hourly_rain_probability.append(float(hour["chance_of_rain"]))
+                hourly_precipitation_mm.append(float(hour["precip_mm"]))
+    while len(hourly_rain_probability) < 24:
+        hourly_rain_probability.append(0.0)
+        hourly_precipitation_mm.append(0.0)
+    hourly_rain_probability = hourly_rain_probability[:24]
+    hourly_precipitation_mm = hourly_precipitation_mm[:24]
+    return {
+        'success': True,
+        'location': location,
+        'current': current_weather,
+        'hourly_rain_probability': hourly_rain_probability,
+        'hourly_precipitation_mm': hourly_precipitation_mm,
+        'total_rainfall_24h': sum(hourly_precipitation_mm),
+        'max_rain_probability_24h': max(hourly_rain_probability),
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+def at_local_time(payload, minutes_after_midnight: int):
+    """Copy of the payload as if fetched at another local time on day 1"""
+    shifted = copy.deepcopy(payload)
+    first = payload['forecast']['forecastday'][0]['hour'][0]
+    local = datetime.strptime(first['time'], '%Y-%m-%d %H:%M') + timedelta(minutes=minutes_after_midnight)
+    # WeatherAPI does not zero-pad the hour of localtime
+    shifted['location']['localtime'] = f"{local:%Y-%m-%d} {local.hour}:{local:%M}"
+    shifted['location']['localtime_epoch'] = first['time_epoch'] + minutes_after_midnight * 60 + 17
+    return shifted
+
+
+def check_equivalent(payloads):
+    for payload in payloads:
+        old, new = legacy_parse(payload, 'x'), parse_forecast(payload, 'x')
+        assert old['hourly_rain_probability'] == new['hourly_rain_probability'].tolist(), payload['location']
+        assert old['hourly_precipitation_mm'] == new['hourly_precipitation_mm'].tolist(), payload['location']
+        assert abs(old['total_rainfall_24h'] - new['total_rainfall_24h']) < 1e-9
+        assert old['max_rain_probability_24h'] == new['max_rain_probability_24h']
+
+
+def bench(label, parse, payloads, iterations):
+    t0 = time.perf_counter()
+    for i in range(iterations):
+        parse(payloads[i % len(payloads)], 'Zaghouan')
+    elapsed = time.perf_counter() - t0
+    per_call_us = elapsed / iterations * 1e6
+    print(f"   {label:36s} {per_call_us:8.1f} µs/parse  ({iterations / elapsed:10,.0f} parses/s)")
+    return per_call_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark forecast payload parsing')
+    parser.add_argument('--iterations', type=int, default=5000)
+    args = parser.parse_args()
+
+    with open(FIXTURE, 'r', encoding='utf-8') as f:
+        recorded = json.load(f)
+    # Same payload fetched at 00:00, 10:37 (as recorded), 18:05 and 23:59
+    payloads = [recorded] + [at_local_time(recorded, m) for m in (0, 18 * 60 + 5, 23 * 60 + 59)]
+
+    print("=" * 70)
+    print("📊 FORECAST PARSING BENCHMARK")
+    print("=" * 70)
+    print(f"{len(payloads)} payloads, {sum(len(d['hour']) for d in recorded['forecast']['forecastday'])} "
+          f"hours each, {args.iterations} parses per parser\n")
+
+    check_equivalent(payloads)
+    print("   ✓ Both parsers produce the same 24-hour window and totals\n")
+
+    legacy = bench('legacy (strptime per hour, lists)', legacy_parse, payloads, args.iterations)
+    current = bench('epoch index + NumPy (+ ET0)', parse_forecast, payloads, args.iterations)
+    print(f"\n   Speedup: {legacy / current:.1f}x")
+    print("\n" + "=" * 70)
+
+
+if __name__ == "__main__":
+    main()
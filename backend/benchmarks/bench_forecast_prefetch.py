@@ -0,0 +1,146 @@
+"""
+BENCHMARK - Bulk forecast prefetch
+==================================
+
+Measures how long warming the forecast cache takes for N distinct
+locations (default 500) with different thread pool sizes, against a local
+stand-in for WeatherAPI (http.server with configurable latency). Reports
+per-location failures and connection reuse.
+
+Run from backend/ directory:
+  python benchmarks/bench_forecast_prefetch.py
+  python benchmarks/bench_forecast_prefetch.py --locations 500 --latency-ms 150 --workers 1 8 32
+  python benchmarks/bench_forecast_prefetch.py --quota-per-minute 3000 --fail-rate 0.02
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_payload(query: str) -> dict:
+    """WeatherAPI-shaped forecast.json response for the current hour"""
+    now = datetime.now().replace(second=0, microsecond=0)
+    days = []
+    for d in range(2):
+        day = (now + timedelta(days=d)).replace(hour=0, minute=0)
+        hours = []
+        for h in range(24):
+            t = day + timedelta(hours=h)
+            hours.append({
+                'time_epoch': int(t.timestamp()),
+                'time': t.strftime('%Y-%m-%d %H:%M'),
+                'temp_c': round(18 + 8 * random.random(), 1),
+                'humidity': random.randint(30, 90),
+                'wind_kph': round(20 * random.random(), 1),
+                'chance_of_rain': random.choice([0, 0, 0, 10, 40, 80]),
+                'precip_mm': random.choice([0.0, 0.0, 0.0, 0.2, 1.5])
+            })
+        days.append({'date': day.strftime('%Y-%m-%d'), 'date_epoch': int(day.timestamp()), 'hour': hours})
+    return {
+        'location': {'name': query, 'localtime_epoch': int(now.timestamp()),
+                     'localtime': now.strftime('%Y-%m-%d %H:%M')},
+        'current': {'temp_c': 24.0, 'humidity': 55, 'condition': {'text': 'Sunny'},
+                    'wind_kph': 9.0, 'feelslike_c': 25.1},
+        'forecast': {'forecastday': days}
+    }
+
+
+class StandInWeatherAPI(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    latency = 0.1
+    fail_rate = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        if random.random() < self.fail_rate:
+            body, status = b'{"error": {"message": "stand-in failure"}}', 503
+        else:
+            query = parse_qs(urlparse(self.path).query).get('q', [''])[0]
+            body, status = json.dumps(make_payload(query)).encode('utf-8'), 200
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_locations(n: int):
+    """n coordinates, each in a different geohash cell"""
+    locations = []
+    lat = 28.0
+    while len(locations) < n:
+        lon = 5.0
+        while lon < 13.0 and len(locations) < n:
+            locations.append(f'{lat:.4f},{lon:.4f}')
+            lon += 0.36
+        lat += 0.18
+    return locations
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark parallel forecast prefetch')
+    parser.add_argument('--locations', type=int, default=500)
+    parser.add_argument('--latency-ms', type=float, default=100, help='Stand-in server latency per call')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 8, 16, 32])
+    parser.add_argument('--quota-per-minute', type=float, default=100000, help='WeatherAPI quota to enforce')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Fraction of stand-in calls returning 503')
+    args = parser.parse_args()
+
+    random.seed(42)
+    StandInWeatherAPI.latency = args.latency_ms / 1000
+    StandInWeatherAPI.fail_rate = args.fail_rate
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInWeatherAPI)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Configure the client before importing it
+    os.environ['WEATHER_API_BASE_URL'] = f'http://127.0.0.1:{server.server_address[1]}/v1'
+    os.environ['WEATHER_API_MAX_CALLS_PER_MINUTE'] = str(args.quota_per_minute)
+    os.environ['WEATHER_API_QUOTA_BURST'] = str(max(1, int(args.quota_per_minute / 60)))
+    os.environ.setdefault('WEATHER_HTTP_POOL_SIZE', str(max(args.workers)))
+    from utils import forecast
+
+    locations = make_locations(args.locations)
+
+    print("=" * 70)
+    print("📊 FORECAST PREFETCH BENCHMARK")
+    print("=" * 70)
+    print(f"{len(locations)} locations, stand-in latency {args.latency_ms:.0f} ms, "
+          f"quota {args.quota_per_minute:.0f}/min, fail rate {args.fail_rate:.0%}\n")
+
+    for workers in args.workers:
+        forecast._forecast_cache = None  # Cold cache for every run
+        http_before = forecast.get_http_stats()
+        result = forecast.prefetch_forecasts(locations, max_workers=workers)
+        http_after = forecast.get_http_stats()
+        opened = http_after['connections_opened'] - http_before['connections_opened']
+        calls = http_after['requests'] - http_before['requests']
+        print(f"   {workers:3d} workers: {result['elapsed_seconds']:7.2f}s  "
+              f"fetched {result['fetched']:4d}  failed {result['failed']:3d}  "
+              f"({calls} calls over {opened} new connections)")
+        for location, error in list(result['failures'].items())[:3]:
+            print(f"         ❌ {location}: {error}")
+
+    # Second pass on a warm cache: nothing to fetch
+    result = forecast.prefetch_forecasts(locations, max_workers=args.workers[-1])
+    print(f"\n   Warm cache re-run: {result['elapsed_seconds']:.3f}s, {result['cached']} already cached")
+    print(f"   Quota limiter: {forecast.get_quota_stats()}")
+    print("\n" + "=" * 70)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+BENCHMARK - Forecast sharing across nearby farms
+================================================
+
+Compares forecast cache effectiveness for a simulated fleet whose user
+locations are free text, keyed two ways:
+1. Normalized location string (previous behavior)
+2. Geohash cell from utils.geo (gazetteer + coordinates)
+
+Locations are drawn from the sample user set (generate_sample_users.py)
+written the way farmers and installers actually type them: different
+case, with or without accents, Arabic names, and GPS coordinates of the
+farm near each town. The provider is stubbed, so no network is needed.
+
+Run from backend/ directory:
+  python benchmarks/bench_forecast_sharing.py
+  python benchmarks/bench_forecast_sharing.py --users 5000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import unicodedata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_sample_users import TUNISIA_LOCATIONS
+from utils.forecast_cache import ForecastCache, normalize_location
+from utils.geo import GAZETTEER_PATH, GEOHASH_PRECISION, normalize_name, resolve_location
+
+
+def load_towns():
+    with open(GAZETTEER_PATH, 'r', encoding='utf-8') as f:
+        return {normalize_name(t['name']): t for t in json.load(f)['locations']}
+
+
+def spelling_variants(name: str, town: dict):
+    """Ways the same town shows up in user profiles"""
+    plain = ''.join(c for c in unicodedata.normalize('NFKD', name) if not unicodedata.combining(c))
+    variants = [name, name.lower(), name.upper(), plain, f'{name}, Tunisia', f' {plain.lower()} ']
+    variants += [a for a in town.get('aliases', []) if a]
+    return variants
+
+
+def make_fleet(n_users: int):
+    towns = load_towns()
+    fleet = []
+    for _ in range(n_users):
+        name = random.choice(TUNISIA_LOCATIONS)
+        town = towns[normalize_name(name)]
+        if random.random() < 0.3:
+            # GPS coordinates of a farm within ~5 km of the town
+            lat = town['lat'] + random.uniform(-0.045, 0.045)
+            lon = town['lon'] + random.uniform(-0.055, 0.055)
+            fleet.append(f'{lat:.5f},{lon:.5f}')
+        else:
+            fleet.append(random.choice(spelling_variants(name, town)))
+    return fleet
+
+
+def run(label: str, fleet, key_fn):
+    fetched = []
+    cache = ForecastCache(lambda query: fetched.append(query) or {'success': True, 'location': query})
+    for location in fleet:
+        query, key = key_fn(location)
+        cache.get(query, key)
+    stats = cache.get_stats()
+    print(f"   {label:26s} {stats['fetches']:6d} API calls  "
+          f"{stats['locations']:6d} cache entries  hit rate {stats['hit_rate']:.1%}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark forecast sharing by geohash cell')
+    parser.add_argument('--users', type=int, default=1000, help='Simulated users')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    fleet = make_fleet(args.users)
+
+    print("=" * 70)
+    print("📊 FORECAST SHARING BENCHMARK (one decision cycle)")
+    print("=" * 70)
+    print(f"{args.users} users, {len(set(fleet))} distinct location strings, "
+          f"{len(TUNISIA_LOCATIONS)} towns, geohash precision {GEOHASH_PRECISION}\n")
+
+    by_string = run('by location string', fleet,
+                    lambda location: (location, normalize_location(location)))
+
+    def by_cell(location):
+        resolved = resolve_location(location)
+        key = f"cell:{resolved['cell']}" if resolved['cell'] else f'name:{normalize_location(location)}'
+        return resolved['query'], key
+
+    by_geo = run('by geohash cell', fleet, by_cell)
+
+    unresolved = sum(1 for location in set(fleet) if not resolve_location(location)['resolved'])
+    print(f"\n   API calls saved: {by_string['fetches'] - by_geo['fetches']} "
+          f"({1 - by_geo['fetches'] / by_string['fetches']:.1%})")
+    print(f"   Unresolved location strings: {unresolved}")
+    print("\n" + "=" * 70)
+
+
+if __name__ == "__main__":
+    main()
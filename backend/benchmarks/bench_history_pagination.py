@@ -0,0 +1,176 @@
+"""
+BENCHMARK - Irrigation history pagination and projection
+=========================================================
+
+Seeds a benchmark user with N irrigation logs (default 10,000) and compares:
+1. Full documents, first page of 50 (the old /history behaviour)
+2. Projected page (timestamp, action, should_water)
+3. Walking the whole history with cursor pagination, full vs projected
+
+Reports JSON payload size and latency for each case.
+
+Run from backend/ directory:
+  python benchmarks/bench_history_pagination.py --logs 10000
+  python benchmarks/bench_history_pagination.py --cleanup
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.firebase_client import get_db
+from services.irrigation_service import get_irrigation_history
+
+BENCH_USER_ID = 'bench_history_user'
+MOBILE_FIELDS = ['timestamp', 'action', 'should_water']
+FIRESTORE_BATCH_LIMIT = 500
+
+
+def make_log(i: int, start: datetime) -> dict:
+    """Build a realistic AI decision log (sensor_data + Arabic reasoning)"""
+    should_water = random.random() < 0.4
+    return {
+        'user_id': BENCH_USER_ID,
+        'plant_name': random.choice(['tomato', 'olive', 'pepper']),
+        'timestamp': (start + timedelta(minutes=30 * i)).isoformat(),
+        'sensor_data': {
+            'soil_moisture': round(random.uniform(20, 70), 1),
+            'current_temperature': round(random.uniform(12, 38), 1),
+            'current_humidity': round(random.uniform(25, 85), 1),
+            'minutes_since_last_watering': random.randint(30, 2880),
+            'water_requirement_level': 3,
+            'root_depth_cm': 60,
+            'drought_tolerance': 2,
+            'soil_type_encoded': 2,
+            'soil_type': 'loam',
+            'soil_compaction': 55,
+            'slope_degrees': 3.5,
+            'hour_of_day': i % 24,
+            'day_of_year': 1 + (i // 48) % 365,
+            'season': 2
+        },
+        'decision': {
+            'should_water': should_water,
+            'duration_minutes': random.randint(10, 60) if should_water else 0,
+            'intensity_percent': random.randint(40, 90) if should_water else 0
+        },
+        'reasoning': {
+            'xgboost_recommendation': 'النموذج ينصح بالري لمدة 30 دقيقة بسبب انخفاض رطوبة التربة',
+            'weather_analysis': 'لا يتوقع هطول أمطار خلال الـ 24 ساعة القادمة مع حرارة مرتفعة',
+            'decision_rationale': 'رطوبة التربة أقل من المستوى الأمثل لذلك نوصي بالري',
+            'adjustments_made': 'لا توجد تعديلات',
+            'confidence_level': 'high'
+        },
+        'mode': 'ai'
+    }
+
+
+def seed_logs(count: int):
+    """Write `count` logs for the benchmark user in batches of 500"""
+    db = get_db()
+    start = datetime.now() - timedelta(minutes=30 * count)
+    print(f"🌱 Seeding {count} logs for {BENCH_USER_ID}...")
+
+    batch = db.batch()
+    in_batch = 0
+    for i in range(count):
+        batch.set(db.collection('irrigation_logs').document(), make_log(i, start))
+        in_batch += 1
+        if in_batch == FIRESTORE_BATCH_LIMIT:
+            batch.commit()
+            batch = db.batch()
+            in_batch = 0
+    if in_batch:
+        batch.commit()
+    print("   ✅ Seeded")
+
+
+def cleanup_logs():
+    """Delete every log of the benchmark user"""
+    db = get_db()
+    query = db.collection('irrigation_logs').where('user_id', '==', BENCH_USER_ID)
+    deleted = 0
+    while True:
+        docs = list(query.limit(FIRESTORE_BATCH_LIMIT).stream())
+        if not docs:
+            break
+        batch = db.batch()
+        for doc in docs:
+            batch.delete(doc.reference)
+        batch.commit()
+        deleted += len(docs)
+    print(f"🧹 Deleted {deleted} benchmark logs")
+
+
+def measure_page(limit: int, fields=None, start_after=None):
+    """Fetch one page and return (result, payload_bytes, latency_ms)"""
+    t0 = time.perf_counter()
+    result = get_irrigation_history(BENCH_USER_ID, limit, start_after=start_after, fields=fields)
+    latency_ms = (time.perf_counter() - t0) * 1000
+    payload = json.dumps(result, ensure_ascii=False).encode('utf-8')
+    return result, len(payload), latency_ms
+
+
+def walk_history(page_size: int, fields=None):
+    """Page through the whole history, returning totals"""
+    cursor = None
+    pages = logs = total_bytes = 0
+    t0 = time.perf_counter()
+    while True:
+        result, size, _ = measure_page(page_size, fields, cursor)
+        if not result['success']:
+            raise RuntimeError(result['error'])
+        pages += 1
+        logs += result['count']
+        total_bytes += size
+        cursor = result['next_cursor']
+        if not cursor:
+            break
+    return pages, logs, total_bytes, (time.perf_counter() - t0) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark /history pagination and projection')
+    parser.add_argument('--logs', type=int, default=10000, help='Logs to seed for the benchmark user')
+    parser.add_argument('--page-size', type=int, default=500, help='Page size for the full walk')
+    parser.add_argument('--no-seed', action='store_true', help='Reuse previously seeded logs')
+    parser.add_argument('--cleanup', action='store_true', help='Delete benchmark logs and exit')
+    args = parser.parse_args()
+
+    if args.cleanup:
+        cleanup_logs()
+        return
+
+    print("=" * 70)
+    print("📊 HISTORY PAGINATION BENCHMARK")
+    print("=" * 70)
+
+    if not args.no_seed:
+        random.seed(42)
+        seed_logs(args.logs)
+
+    # Warm up the connection so the first case does not pay for it
+    measure_page(1, ['timestamp'])
+
+    print("\n📄 First page (50 logs):")
+    for label, fields in [('full documents', None), ('projected', MOBILE_FIELDS)]:
+        result, size, latency = measure_page(50, fields)
+        print(f"   {label:16s} {size / 1024:8.1f} KB  {latency:8.1f} ms  ({result['count']} logs)")
+
+    print(f"\n📚 Full history walk (page size {args.page_size}):")
+    for label, fields in [('full documents', None), ('projected', MOBILE_FIELDS)]:
+        pages, logs, size, latency = walk_history(args.page_size, fields)
+        print(f"   {label:16s} {size / 1024:8.1f} KB  {latency:8.1f} ms  "
+              f"({logs} logs, {pages} pages, {latency / pages:.1f} ms/page)")
+
+    print("\n" + "=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+BENCHMARK - User profile cache
+==============================
+
+Seeds N farmers (default 200) and replays a farmer request mix against them:
+1. valve/status  (VALVE_STATUS_FIELDS)
+2. decision      (DECISION_FIELDS)
+3. state         (FARM_STATE_FIELDS)
+4. exists        (valve/close, ai-mode)
+with a write (AI mode toggle) every --write-every reads, once with the
+profile cache disabled and once enabled.
+
+Reports profile reads per request, document reads and median latency. Reads
+with the cache enabled include the reads that start each profile's listener.
+Needs STORAGE_BACKEND=memory (the read counters come from the in-memory
+backend).
+
+Run from backend/ directory:
+  STORAGE_BACKEND=memory python benchmarks/bench_profile_cache.py
+  STORAGE_BACKEND=memory python benchmarks/bench_profile_cache.py --users 1000 --requests 20000
+  STORAGE_BACKEND=memory python benchmarks/bench_profile_cache.py --cache-size 100   # LRU churn
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.firebase_client import get_db
+from utils.memory_firestore import MemoryFirestore
+from utils.profile_cache import get_profile_cache
+from utils.repositories import get_user_repository
+from utils.fleet_generator import FleetGenerator
+from services.valve_service import VALVE_STATUS_FIELDS
+from services.farmer_service import FARM_STATE_FIELDS
+from services.irrigation_service import DECISION_FIELDS
+
+CASES = [
+    ('valve/status', VALVE_STATUS_FIELDS),
+    ('decision', DECISION_FIELDS),
+    ('state', FARM_STATE_FIELDS),
+    ('exists', None),
+]
+
+
+def seed_users(count: int):
+    """Write `count` synthetic farmers (profiles only) and return their IDs"""
+    users = get_user_repository()
+    gen = FleetGenerator(seed=7, days=1, prefix='bench_cache_')
+    ids = []
+    for user_id, user, _ in gen.farms(count):
+        users.set(user_id, user)
+        ids.append(user_id)
+    print(f"🌱 Seeded {count} farmers")
+    return ids
+
+
+def replay(user_ids, requests: int, write_every: int, seed: int):
+    """Run the request mix; return (document reads, median_ms)"""
+    db = get_db()
+    users = get_user_repository()
+    rng = random.Random(seed)
+    latencies = []
+    with db.measure() as ops:
+        for n in range(1, requests + 1):
+            user_id = rng.choice(user_ids)
+            _, fields = rng.choice(CASES)
+            t0 = time.perf_counter()
+            if fields is None:
+                users.exists(user_id)
+            else:
+                users.get(user_id, fields=fields)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if write_every and n % write_every == 0:
+                users.update(user_id, {'ai_mode': rng.random() < 0.5})
+    return ops['reads'], statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the user profile cache')
+    parser.add_argument('--users', type=int, default=200, help='Farmers to seed')
+    parser.add_argument('--requests', type=int, default=10000, help='Profile reads to replay')
+    parser.add_argument('--write-every', type=int, default=50,
+                        help='Toggle AI mode after every N reads (0 = no writes)')
+    parser.add_argument('--cache-size', type=int, default=None,
+                        help='Profiles cached (default USER_PROFILE_CACHE_SIZE)')
+    args = parser.parse_args()
+
+    if not isinstance(get_db(), MemoryFirestore):
+        print("❌ Run with STORAGE_BACKEND=memory")
+        return
+
+    print("=" * 70)
+    print("📊 USER PROFILE CACHE BENCHMARK")
+    print("=" * 70)
+
+    user_ids = seed_users(args.users)
+    cache = get_profile_cache()
+    max_size = args.cache_size or cache.max_size or 500
+
+    print(f"\n   {'cache':10s} {'reads':>8s} {'per req':>9s} {'latency':>10s}")
+    for label, size in (('off', 0), (f'{max_size}', max_size)):
+        cache.clear()
+        cache.max_size = size
+        reads, latency = replay(user_ids, args.requests, args.write_every, seed=1)
+        print(f"   {label:10s} {reads:8d} {reads / args.requests:9.3f} {latency:7.3f} ms")
+
+    stats = cache.get_stats()
+    print(f"\n   hit rate {stats['hit_rate']}, {stats['listeners']} listeners, "
+          f"{stats['invalidations']} invalidations, {stats['evictions']} evictions")
+    cache.clear()
+    print("\n" + "=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+BENCHMARK - Telemetry ingestion throughput
+==========================================
+
+Measures readings per second on one core for the /telemetry pipeline
+(parse + bulk validate + append to the store) for both wire formats:
+1. NDJSON batches
+2. Packed binary batches
+
+Optionally (--http) also goes through the Flask route with the test client
+to include request handling overhead. No network or Firestore needed: the
+benchmark Pis' profiles (ingest checks the user and plants) live in an
+in-memory database.
+
+Run from backend/ directory:
+  python benchmarks/bench_telemetry_ingest.py
+  python benchmarks/bench_telemetry_ingest.py --batch-size 1000 --batches 200 --http
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.firebase_client import set_db
+from utils.memory_firestore import MemoryFirestore
+from utils.repositories import get_user_repository
+from utils.telemetry import BINARY_RECORD_DTYPE, ingest_telemetry
+
+PLANTS = ['tomato', 'olive', 'pepper']
+
+
+def make_ndjson_batch(size: int, start_ts: int) -> bytes:
+    lines = []
+    for i in range(size):
+        lines.append(json.dumps({
+            'plant_name': random.choice(PLANTS),
+            'soil_moisture': round(random.uniform(20, 70), 1),
+            'temperature': round(random.uniform(12, 38), 1),
+            'humidity': round(random.uniform(25, 85), 1),
+            'timestamp': start_ts + i * 60
+        }))
+    return '\n'.join(lines).encode('utf-8')
+
+
+def make_binary_batch(size: int, start_ts: int) -> bytes:
+    records = np.zeros(size, dtype=BINARY_RECORD_DTYPE)
+    records['timestamp'] = start_ts + np.arange(size) * 60
+    records['soil_moisture'] = np.random.uniform(20, 70, size)
+    records['temperature'] = np.random.uniform(12, 38, size)
+    records['humidity'] = np.random.uniform(25, 85, size)
+    return records.tobytes()
+
+
+def seed_users(count: int):
+    """Profiles for the benchmark Pis, in an in-memory database"""
+    set_db(MemoryFirestore())
+    users = get_user_repository()
+    for i in range(count):
+        users.set(f'bench_pi_{i}', {'name': f'Bench Pi {i}',
+                                    'plants': [{'name': plant} for plant in PLANTS]})
+
+
+def run(label: str, bodies, ingest):
+    """Ingest every body once and report throughput"""
+    readings = 0
+    t0 = time.perf_counter()
+    for body in bodies:
+        readings += ingest(body)
+    elapsed = time.perf_counter() - t0
+    print(f"   {label:28s} {readings / elapsed:12,.0f} readings/s  "
+          f"({readings} readings in {elapsed * 1000:.0f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark telemetry ingestion')
+    parser.add_argument('--batch-size', type=int, default=500, help='Readings per request')
+    parser.add_argument('--batches', type=int, default=200, help='Requests per format')
+    parser.add_argument('--users', type=int, default=100, help='Distinct Pis (users)')
+    parser.add_argument('--http', action='store_true', help='Also measure through the Flask route')
+    args = parser.parse_args()
+
+    random.seed(42)
+    np.random.seed(42)
+    start_ts = int(time.time()) - args.batch_size * 60
+
+    print("=" * 70)
+    print("📊 TELEMETRY INGESTION BENCHMARK (single core)")
+    print("=" * 70)
+    print(f"{args.batches} batches x {args.batch_size} readings, {args.users} Pis\n")
+
+    seed_users(args.users)
+    ndjson_bodies = [make_ndjson_batch(args.batch_size, start_ts) for _ in range(args.batches)]
+    binary_bodies = [make_binary_batch(args.batch_size, start_ts) for _ in range(args.batches)]
+    print(f"   Payload per batch: NDJSON {len(ndjson_bodies[0]) / 1024:.1f} KB, "
+          f"binary {len(binary_bodies[0]) / 1024:.1f} KB\n")
+
+    counter = iter(range(10**9))
+
+    def user():
+        return f'bench_pi_{next(counter) % args.users}'
+
+    run('NDJSON (service)', ndjson_bodies,
+        lambda body: ingest_telemetry(user(), body, 'application/x-ndjson')['accepted'])
+    run('binary (service)', binary_bodies,
+        lambda body: ingest_telemetry(user(), body, 'application/octet-stream', 'tomato')['accepted'])
+
+    if args.http:
+        from flask import Flask
+        from routes.farmer_routes import farmer_bp
+
+        app = Flask(__name__)
+        app.register_blueprint(farmer_bp)
+        client = app.test_client()
+
+        run('NDJSON (Flask route)', ndjson_bodies,
+            lambda body: client.post(f'/api/farmer/{user()}/telemetry', data=body,
+                                     content_type='application/x-ndjson').json['accepted'])
+        run('binary (Flask route)', binary_bodies,
+            lambda body: client.post(f'/api/farmer/{user()}/telemetry?plant_name=tomato', data=body,
+                                     content_type='application/octet-stream').json['accepted'])
+
+    print("\n" + "=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+BENCHMARK - Field-masked user reads
+===================================
+
+Seeds a benchmark farmer with N plants (default 60, full features each) and
+compares reading the whole users/<id> document against the field mask each
+hot endpoint declares:
+1. valve/status  (watering_state, ai_mode, last_watering)
+2. valve/open    (watering_state)
+3. existence checks (valve/close, ai-mode, admin update/delete)
+4. decision      (plants, soil, location, ...)
+5. state         (profile + plants + valve fields, one read instead of two)
+
+Reports document bytes returned (Firestore document size) and median
+latency per read. The profile cache is turned off so every read reaches
+the database. With STORAGE_BACKEND=memory the latency is only the
+client-side cost; run against Firestore to see the network effect.
+
+Run from backend/ directory:
+  python benchmarks/bench_user_field_masks.py --plants 60
+  STORAGE_BACKEND=memory python benchmarks/bench_user_field_masks.py
+  python benchmarks/bench_user_field_masks.py --cleanup
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.memory_firestore import document_size
+from utils.profile_cache import get_profile_cache
+from utils.repositories import USERS_COLLECTION, get_user_repository
+from services.plant_service import get_plant_database
+from services.valve_service import OPEN_VALVE_FIELDS, VALVE_STATUS_FIELDS
+from services.farmer_service import FARM_STATE_FIELDS
+from services.irrigation_service import DECISION_FIELDS
+
+BENCH_USER_ID = 'bench_field_mask_user'
+
+CASES = [
+    ('valve/status', VALVE_STATUS_FIELDS),
+    ('valve/open', OPEN_VALVE_FIELDS),
+    ('exists', []),
+    ('decision', DECISION_FIELDS),
+    ('state', FARM_STATE_FIELDS),
+]
+
+
+def seed_user(plant_count: int):
+    """Write a farmer with `plant_count` plants cycling through the plant database"""
+    crops = list(get_plant_database().items())
+    plants = []
+    for i in range(plant_count):
+        name, features = crops[i % len(crops)]
+        plants.append({
+            'name': f'{name}_{i}' if i >= len(crops) else name,
+            'area_sqm': 50 + i,
+            'features': dict(features)
+        })
+    now = datetime.now()
+    get_user_repository().set(BENCH_USER_ID, {
+        'user_id': BENCH_USER_ID,
+        'email': 'bench@example.com',
+        'name': 'Bench Farmer',
+        'location': 'Sidi Bouzid',
+        'soil_properties': {'soil_type': 'loam', 'soil_type_encoded': 2,
+                            'soil_compaction': 55, 'slope_degrees': 3.5},
+        'plants': plants,
+        'created_at': now.isoformat(),
+        'last_watering': (now - timedelta(hours=6)).isoformat(),
+        'watering_state': {
+            'is_watering': True, 'plant_name': plants[0]['name'], 'mode': 'ai',
+            'start_time': now.isoformat(),
+            'expected_end': (now + timedelta(minutes=20)).isoformat(),
+            'duration_minutes': 20
+        },
+        'ai_mode': True,
+        'role': 'farmer'
+    })
+    print(f"🌱 Seeded {BENCH_USER_ID} with {plant_count} plants")
+
+
+def measure(fields, repeats: int):
+    """Return (document_bytes, median_ms) for reading the user with `fields`"""
+    users = get_user_repository()
+    latencies = []
+    data = None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        data = users.get(BENCH_USER_ID, fields=fields)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return document_size(USERS_COLLECTION, BENCH_USER_ID, data), statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark field-masked user reads')
+    parser.add_argument('--plants', type=int, default=60, help='Plants on the benchmark user')
+    parser.add_argument('--repeats', type=int, default=20, help='Reads per case (median reported)')
+    parser.add_argument('--cleanup', action='store_true', help='Delete the benchmark user and exit')
+    args = parser.parse_args()
+
+    if args.cleanup:
+        get_user_repository().delete(BENCH_USER_ID)
+        print(f"🧹 Deleted {BENCH_USER_ID}")
+        return
+
+    print("=" * 70)
+    print("📊 USER FIELD MASK BENCHMARK")
+    print("=" * 70)
+
+    get_profile_cache().max_size = 0  # Measure the masked reads, not the cache
+    seed_user(args.plants)
+
+    # Warm up the connection so the first case does not pay for it
+    measure([], 1)
+
+    full_bytes, full_ms = measure(None, args.repeats)
+    print(f"\n📄 Full document: {full_bytes / 1024:.1f} KB, {full_ms:.2f} ms\n")
+    print(f"   {'endpoint':14s} {'masked':>10s} {'saved':>8s} {'latency':>10s}")
+    for label, fields in CASES:
+        size, latency = measure(fields, args.repeats)
+        saved = 100 * (1 - size / full_bytes)
+        print(f"   {label:14s} {size / 1024:7.2f} KB {saved:7.1f}% {latency:7.2f} ms")
+
+    print("\n   state reads the profile once; it used to read it again for the valve status")
+    print("   decision/state still read plants whole: masks cannot select inside arrays")
+    print("\n" + "=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Generate a synthetic farmer fleet for load and performance tests
+Deterministic from --seed: the same arguments always produce the same users,
+plants and irrigation logs (see utils/fleet_generator.py)
+
+generate_sample_users.py creates a handful of demo farmers (with Gemini plant
+lookups); this script creates as many as a load test needs.
+
+Examples:
+  python generate_fleet.py --users 100000 --snapshot data/fleet_100k.jsonl.gz --checks-per-day 0.25
+  MEMORY_SNAPSHOT=data/fleet_100k.jsonl.gz STORAGE_BACKEND=memory python app.py
+  python generate_fleet.py --users 5000 --days 60 --end-date 2026-06-30
+  python generate_fleet.py --cleanup
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.fleet_generator import (
+    DEFAULT_SEED, FLEET_PREFIX, FleetGenerator, delete_fleet, write_fleet, write_fleet_snapshot
+)
+from utils.firebase_client import STORAGE_BACKEND
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic farmer fleet')
+    parser.add_argument('--users', type=int, default=1000, help='Farmers to generate')
+    parser.add_argument('--first', type=int, default=0,
+                        help='Index of the first farmer (to add farmers to an existing fleet)')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help=f'Random seed (default {DEFAULT_SEED})')
+    parser.add_argument('--days', type=int, default=90, help='Days of irrigation history')
+    parser.add_argument('--checks-per-day', type=float, default=1.0,
+                        help='Average AI checks per plant per day (0 for users only)')
+    parser.add_argument('--end-date', type=date.fromisoformat, default=None,
+                        help='Last day of history, YYYY-MM-DD (default today; set it to reproduce a fleet later)')
+    parser.add_argument('--prefix', default=FLEET_PREFIX, help=f'User ID prefix (default {FLEET_PREFIX})')
+    parser.add_argument('--snapshot', default=None,
+                        help='Write a snapshot file (.jsonl.gz) instead of the database')
+    parser.add_argument('--workers', type=int, default=4, help='Batches committed in parallel')
+    parser.add_argument('--cleanup', action='store_true', help='Delete the generated fleet and exit')
+    parser.add_argument('--yes', action='store_true', help='Do not ask for confirmation')
+    args = parser.parse_args()
+
+    target = args.snapshot or f'{STORAGE_BACKEND} database'
+
+    print("="*70)
+    print("🚜 SYNTHETIC FLEET" + (" CLEANUP" if args.cleanup else ""))
+    print("="*70)
+    if args.cleanup:
+        print(f"Prefix: {args.prefix} | Target: {STORAGE_BACKEND} database")
+    else:
+        print(f"Users: {args.users} (from #{args.first}) | Seed: {args.seed} | History: {args.days} days, "
+              f"{args.checks_per_day} checks/plant/day")
+        print(f"Target: {target}")
+    print()
+
+    if not args.snapshot and STORAGE_BACKEND != 'memory' and not args.yes:
+        action = 'deleted from' if args.cleanup else 'written to'
+        response = input(f"Documents will be {action} Firestore. Continue? (yes/no): ")
+        if response.lower() not in ['yes', 'y']:
+            print("❌ Cancelled.")
+            return
+
+    if args.cleanup:
+        delete_fleet(args.prefix)
+        print("\nRun reconcile_user_stats.py and backfill_rollups.py to correct counters and daily rollups.")
+        return
+
+    generator = FleetGenerator(seed=args.seed, days=args.days, checks_per_day=args.checks_per_day,
+                               end_date=args.end_date, prefix=args.prefix)
+    t0 = time.perf_counter()
+    if args.snapshot:
+        result = write_fleet_snapshot(generator, args.users, args.snapshot, first=args.first)
+    else:
+        result = write_fleet(generator, args.users, first=args.first, workers=args.workers)
+    elapsed = time.perf_counter() - t0
+
+    print()
+    print("="*70)
+    print("📊 SUMMARY")
+    print("="*70)
+    print(f"History: {generator.start.date()} → {generator.end_date} (seed {args.seed})")
+    print(f"👤 Users created: {result['users_created']}")
+    if result.get('users_skipped'):
+        print(f"⏭️  Users skipped (already exist): {result['users_skipped']}")
+    if result.get('users_failed'):
+        print(f"❌ Users failed: {result['users_failed']}")
+    print(f"📄 Irrigation logs: {result['logs']}")
+    print(f"📊 Rollups: {result['user_rollups']} per-user daily, {result['daily_rollups']} system daily")
+    if args.snapshot:
+        size = os.path.getsize(args.snapshot)
+        print(f"📦 Snapshot: {args.snapshot} ({result['documents']} documents, {size / 1e6:.1f} MB)")
+    print(f"⏱️  {elapsed:.1f}s ({result['users_created'] / max(elapsed, 1e-9):.0f} users/s)")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,8 +7,9 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from utils.firebase_client import get_db
+from utils.repositories import get_user_repository
 from services.plant_service import get_plant_features
+from services.admin_service import SOIL_TYPE_ENCODING
 from datetime import datetime
 import random
 
@@ -48,8 +49,6 @@ def generate_user_id(name, email):
 
 def create_sample_user(farmer_data):
     """Create a single sample user with realistic data"""
-    db = get_db()
-    
     # Generate user ID
     user_id = generate_user_id(farmer_data["name"], farmer_data["email"])
     
@@ -57,13 +56,10 @@ def create_sample_user(farmer_data):
     location = random.choice(TUNISIA_LOCATIONS)
     
     # Random soil properties
-    soil_types = ["clay", "loam", "sandy", "silty"]
-    soil_type_encoding = {"clay": 1, "loam": 2, "sandy": 3, "silty": 4}
-    
-    soil_type = random.choice(soil_types)
+    soil_type = random.choice(list(SOIL_TYPE_ENCODING))
     soil_properties = {
         "soil_type": soil_type,
-        "soil_type_encoded": soil_type_encoding[soil_type],
+        "soil_type_encoded": SOIL_TYPE_ENCODING[soil_type],
         "soil_compaction": random.randint(40, 70),
         "slope_degrees": round(random.uniform(0.5, 8.0), 1)
     }
@@ -103,8 +99,8 @@ def create_sample_user(farmer_data):
         }
     }
     
-    # Save to Firestore
-    db.collection('users').document(user_id).set(user_data)
+    # Save to Firestore (through the repository so the stats counters follow)
+    get_user_repository().set(user_id, user_data)
     
     print(f"✅ Created user: {farmer_data['name']} ({user_id})")
     print(f"   Location: {location}")
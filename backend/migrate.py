@@ -0,0 +1,120 @@
+"""
+Run data migrations
+Scans the migration's collection in pages, commits updates in batches on
+parallel workers and checkpoints progress, so an interrupted run resumes
+where it stopped. Migrations are defined in migrations/.
+
+Examples:
+  python migrate.py --list
+  python migrate.py 001_soil_type_encoding --dry-run
+  python migrate.py 001_soil_type_encoding --workers 8
+  python migrate.py 001_soil_type_encoding --restart
+"""
+import argparse
+import json
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from migrations import MIGRATIONS, get_migration
+from services.migration_service import (
+    DEFAULT_PAGE_SIZE, DEFAULT_WORKERS, get_checkpoint, run_migration
+)
+
+
+def list_migrations():
+    print("="*70)
+    print("📋 MIGRATIONS")
+    print("="*70)
+    for migration in MIGRATIONS:
+        checkpoint = get_checkpoint(migration.name)
+        if checkpoint is None:
+            status = 'not run'
+        else:
+            status = f"{checkpoint['status']}, {checkpoint.get('updated', 0)}/{checkpoint.get('scanned', 0)} updated"
+            if checkpoint['status'] != 'done' and checkpoint.get('cursor'):
+                status += f", resumes after {checkpoint['cursor']}"
+        print(f"{migration.name}  [{status}]")
+        print(f"   {migration.description}")
+    print("="*70)
+
+
+def print_diff(diff):
+    for entry in diff:
+        print(f"   {entry['id']}")
+        for path, (old, new) in entry['changes'].items():
+            print(f"      {path}: {json.dumps(old)} → {json.dumps(new)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run data migrations')
+    parser.add_argument('name', nargs='?', help='Migration to run (see --list)')
+    parser.add_argument('--list', action='store_true', help='List migrations and their progress')
+    parser.add_argument('--dry-run', action='store_true', help='Show what would change without writing')
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE,
+                        help=f'Documents read per query (default {DEFAULT_PAGE_SIZE})')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Batches committed in parallel (default {DEFAULT_WORKERS})')
+    parser.add_argument('--max-docs', type=int, default=None,
+                        help='Stop after scanning this many documents (run again to resume)')
+    parser.add_argument('--diff-limit', type=int, default=20, help='Documents shown in the dry-run diff')
+    parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and start over')
+    parser.add_argument('--yes', action='store_true', help='Do not ask for confirmation')
+    args = parser.parse_args()
+
+    if args.list or not args.name:
+        list_migrations()
+        return
+
+    migration = get_migration(args.name)
+    if migration is None:
+        print(f"❌ Unknown migration '{args.name}' (see --list)")
+        sys.exit(1)
+
+    print("="*70)
+    print(f"🔧 MIGRATION {migration.name}")
+    print("="*70)
+    print(migration.description)
+    print(f"Collection: {migration.collection} | Page size: {args.page_size} | Workers: {args.workers}"
+          f"{' | DRY RUN' if args.dry_run else ''}")
+    print()
+
+    if not args.dry_run and not args.yes:
+        response = input(f"Documents in {migration.collection} will be updated. Continue? (yes/no): ")
+        if response.lower() not in ['yes', 'y']:
+            print("❌ Cancelled.")
+            return
+
+    result = run_migration(migration, dry_run=args.dry_run, page_size=args.page_size,
+                           workers=args.workers, restart=args.restart, max_docs=args.max_docs,
+                           diff_limit=args.diff_limit)
+
+    print()
+    if args.dry_run and result['diff']:
+        print(f"📝 Changes (first {len(result['diff'])}):")
+        print_diff(result['diff'])
+        print()
+
+    print("="*70)
+    print("📊 SUMMARY")
+    print("="*70)
+    print(f"Status: {result['status']}")
+    if result.get('message'):
+        print(result['message'])
+    print(f"Scanned: {result['scanned']} documents")
+    if args.dry_run:
+        print(f"Would update: {result['would_update']} documents")
+    else:
+        print(f"Updated: {result['updated']} documents")
+        if result['status'] in ('paused', 'interrupted', 'failed'):
+            print(f"Checkpoint: after {result['cursor']} (run again to resume)")
+    if result.get('error'):
+        print(f"❌ {result['error']}")
+    print("="*70)
+
+    if not result['success']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""
+Data migrations
+Each migration is a services.migration_service.Migration; add new ones to
+MIGRATIONS in the order they should run. Run with `python migrate.py`.
+"""
+
+from typing import Optional
+
+# Handle imports for running from backend/ or parent directory
+try:
+    from migrations.soil_type_encoding import SoilTypeEncoding
+except ImportError:
+    from backend.migrations.soil_type_encoding import SoilTypeEncoding
+
+MIGRATIONS = [
+    SoilTypeEncoding(),
+]
+
+
+def get_migration(name: str) -> Optional[object]:
+    """Registered migration by name, or None"""
+    for migration in MIGRATIONS:
+        if migration.name == name:
+            return migration
+    return None
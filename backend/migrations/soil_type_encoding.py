@@ -0,0 +1,54 @@
+"""
+001_soil_type_encoding
+Backfill users' soil_properties for the decision models
+
+Sets soil_type_encoded from soil_type with the encoding the models were
+trained on (sandy=1, loam=2, clay=3; unknown types count as loam) and fills
+missing soil fields with defaults. Replaces fix_user_soil_properties.py,
+which only filled missing values and used the wrong encoding
+(clay=1, sandy=3), so it also corrects users it wrote.
+"""
+
+from typing import Dict, Optional
+
+# Handle imports for running from backend/ or parent directory
+try:
+    from services.migration_service import Migration
+    from services.admin_service import SOIL_TYPE_ENCODING
+    from utils.repositories import USERS_COLLECTION
+except ImportError:
+    from backend.services.migration_service import Migration
+    from backend.services.admin_service import SOIL_TYPE_ENCODING
+    from backend.utils.repositories import USERS_COLLECTION
+
+SOIL_DEFAULTS = {
+    'soil_type': 'loam',
+    'soil_compaction': 55.0,
+    'slope_degrees': 2.0
+}
+
+
+class SoilTypeEncoding(Migration):
+    name = '001_soil_type_encoding'
+    description = 'Set soil_type_encoded (sandy=1, loam=2, clay=3) and fill missing soil fields'
+    collection = USERS_COLLECTION
+    fields = ['soil_properties']
+
+    def transform(self, doc_id: str, data: Dict) -> Optional[Dict]:
+        soil = data.get('soil_properties')
+        if not isinstance(soil, dict):
+            soil_properties = dict(SOIL_DEFAULTS)
+            soil_properties['soil_type_encoded'] = SOIL_TYPE_ENCODING[SOIL_DEFAULTS['soil_type']]
+            return {'soil_properties': soil_properties}
+
+        updates = {f'soil_properties.{field}': default
+                   for field, default in SOIL_DEFAULTS.items() if field not in soil}
+
+        soil_type = str(soil.get('soil_type', SOIL_DEFAULTS['soil_type'])).strip().lower()
+        if 'soil_type' in soil and soil['soil_type'] != soil_type:
+            updates['soil_properties.soil_type'] = soil_type
+        encoded = SOIL_TYPE_ENCODING.get(soil_type, 2)
+        if soil.get('soil_type_encoded') != encoded:
+            updates['soil_properties.soil_type_encoded'] = encoded
+
+        return updates or None
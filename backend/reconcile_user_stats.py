@@ -0,0 +1,43 @@
+"""
+Recount the admin stats counters from the users collection
+Run once after deploying counters, or to correct drift
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.stats_service import reconcile_user_stats
+
+
+def run_reconcile():
+    """Scan all users and correct the counter shards"""
+    print("="*70)
+    print("📊 RECONCILING USER STATS COUNTERS")
+    print("="*70)
+    print()
+
+    result = reconcile_user_stats()
+
+    print()
+    print("="*70)
+    print("📊 SUMMARY")
+    print("="*70)
+    print(f"👤 Users scanned: {result['users_scanned']}")
+    for field, value in result['stats'].items():
+        drift = result['drift'][field]
+        print(f"   {field}: {value}" + (f" (counters were off by {drift:+d})" if drift else ""))
+    print("="*70)
+
+
+if __name__ == "__main__":
+    print()
+    print("This script will correct the user stats counters")
+    print("to the totals recounted from the users collection.")
+    print()
+
+    response = input("Continue? (yes/no): ")
+
+    if response.lower() in ['yes', 'y']:
+        run_reconcile()
+    else:
+        print("❌ Cancelled.")
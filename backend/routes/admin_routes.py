@@ -3,38 +3,29 @@ Admin Routes Blueprint
 Endpoints for admin interface to manage users and system
 """
 
-from flask import Blueprint, request, jsonify
+from datetime import datetime
+
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 
 # Handle imports for running from backend/ or parent directory
 try:
-    from services import admin_service
+    from services import admin_service, rollup_service, stats_service, weather_service
     from services.plant_service import list_all_plants
+    from utils.log_writer import get_log_writer
+    from utils.profile_cache import get_profile_cache
+    from services.irrigation_service import get_decision_maker
 except ImportError:
-    from backend.services import admin_service
+    from backend.services import admin_service, rollup_service, stats_service, weather_service
     from backend.services.plant_service import list_all_plants
+    from backend.utils.log_writer import get_log_writer
+    from backend.utils.profile_cache import get_profile_cache
+    from backend.services.irrigation_service import get_decision_maker
 
-# Import Gemini model for plant generation
-try:
-    from utils.gemini_decision import GeminiIrrigationDecision
-except ImportError:
-    try:
-        from backend.utils.gemini_decision import GeminiIrrigationDecision
-    except ImportError:
-        GeminiIrrigationDecision = None
-
-# Global Gemini instance
-_gemini_instance = None
 
 def get_gemini():
-    """Get Gemini model instance (lazy initialization)"""
-    global _gemini_instance
-    if _gemini_instance is None and GeminiIrrigationDecision is not None:
-        try:
-            _gemini_instance = GeminiIrrigationDecision()
-        except Exception as e:
-            print(f"Warning: Could not initialize Gemini: {e}")
-            return None
-    return _gemini_instance.model if _gemini_instance else None
+    """Gemini model for plant generation (shares the irrigation decision maker)"""
+    decision_maker = get_decision_maker()
+    return decision_maker.model if decision_maker else None
 
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
@@ -42,10 +33,42 @@ admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 
 @admin_bp.route('/users', methods=['GET'])
 def list_users():
-    """Get all users"""
-    role = request.args.get('role')  # Optional filter
-    result = admin_service.list_all_users(role)
-    return jsonify(result)
+    """
+    List users
+    
+    Query params:
+        role: optional filter ('farmer', 'admin'), applied by Firestore
+        limit: page size (default 100, max 1000)
+        cursor: next_cursor from the previous page
+    
+    With limit or cursor, returns one page and next_cursor. Without them,
+    streams every user as one JSON document, reading a page at a time so
+    memory stays bounded however many users there are.
+    """
+    role = request.args.get('role') or None
+    if 'limit' in request.args or 'cursor' in request.args:
+        result = admin_service.list_users_page(
+            role,
+            request.args.get('limit', admin_service.DEFAULT_USER_PAGE_SIZE, type=int),
+            request.args.get('cursor') or None
+        )
+        return jsonify(result)
+    return Response(stream_with_context(_stream_users(role)), mimetype='application/json')
+
+
+def _stream_users(role):
+    """{"users": [...], "count": N, "success": true} written page by page"""
+    dumps = current_app.json.dumps
+    count = 0
+    yield '{"users": ['
+    try:
+        for page in admin_service.iter_users(role):
+            yield (',' if count else '') + ','.join(dumps(user) for user in page)
+            count += len(page)
+        yield f'], "count": {count}, "success": true}}'
+    except Exception as e:
+        # Headers are already sent: report the failure in the body
+        yield f'], "count": {count}, "success": false, "error": {dumps(str(e))}}}'
 
 
 @admin_bp.route('/users', methods=['POST'])
@@ -90,6 +113,44 @@ def add_user():
         }), 400
 
 
+@admin_bp.route('/users/bulk', methods=['POST'])
+def bulk_add_users():
+    """
+    Add many users (e.g. a cooperative) in one request
+    
+    Body, one of:
+        Content-Type: text/csv
+            email,name,location,soil_type,soil_compaction,slope_degrees,plants
+            fatma@farm.tn,Fatma,Sfax,sandy,40,2,tomato:100;olive:50
+        multipart/form-data with the CSV as "file"
+        JSON: [{...add user body...}, ...] or {"users": [...]}
+    
+    Returns per-row results; invalid rows do not stop the others.
+    """
+    try:
+        if 'file' in request.files:
+            rows = admin_service.parse_users_csv(request.files['file'].read().decode('utf-8-sig'))
+        elif request.mimetype in ('text/csv', 'application/csv'):
+            rows = admin_service.parse_users_csv(request.get_data(as_text=True))
+        else:
+            data = request.get_json(silent=True)
+            rows = data.get('users') if isinstance(data, dict) else data
+            if not isinstance(rows, list):
+                return jsonify({
+                    'success': False,
+                    'error': 'Send a CSV, a JSON list of users or {"users": [...]}'
+                }), 400
+        
+        result = admin_service.bulk_add_users(rows, get_gemini())
+        return jsonify(result), 200 if result['success'] else 400
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @admin_bp.route('/users/<user_id>', methods=['GET'])
 def get_user(user_id):
     """Get user details"""
@@ -178,23 +239,21 @@ def get_all_plants():
 
 @admin_bp.route('/stats', methods=['GET'])
 def get_stats():
-    """Get system statistics"""
+    """Get system statistics (from counters: cost does not grow with users)"""
     try:
-        users_result = admin_service.list_all_users()
-        users = users_result.get('users', [])
+        user_stats = stats_service.get_user_stats()
         
-        # Calculate stats
-        total_users = len(users)
-        active_users = sum(1 for u in users if u.get('ai_mode', True))
-        total_plants = sum(len(u.get('plants', [])) for u in users)
+        # Irrigation activity comes from daily rollups, never from raw logs
+        irrigation_7d = rollup_service.get_daily_rollups(days=7)['totals']
         
         return jsonify({
             'success': True,
             'stats': {
-                'total_users': total_users,
-                'active_ai_users': active_users,
-                'total_plants': total_plants,
-                'timestamp': users[0].get('created_at') if users else None
+                'total_users': user_stats['total_users'],
+                'active_ai_users': user_stats['active_ai_users'],
+                'total_plants': user_stats['total_plants'],
+                'irrigation_last_7_days': irrigation_7d,
+                'timestamp': datetime.now().isoformat()
             }
         })
         
@@ -203,3 +262,71 @@ def get_stats():
             'success': False,
             'error': str(e)
         }), 500
+
+
+@admin_bp.route('/stats/reconcile', methods=['POST'])
+def reconcile_stats():
+    """Recount user counters from the users collection (corrects drift)"""
+    try:
+        return jsonify(stats_service.reconcile_user_stats(verbose=False))
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@admin_bp.route('/irrigation-rollups', methods=['GET'])
+def get_irrigation_rollups():
+    """
+    Get system-wide daily irrigation counters
+    
+    Query params:
+        days: number of days up to today (default 30, max 366)
+    """
+    days = request.args.get('days', 30, type=int)
+    try:
+        return jsonify(rollup_service.get_daily_rollups(days))
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@admin_bp.route('/log-queue', methods=['GET'])
+def get_log_queue_stats():
+    """Get irrigation log write-behind queue depth and flush latency"""
+    return jsonify({
+        'success': True,
+        'log_queue': get_log_writer().get_stats()
+    })
+
+
+@admin_bp.route('/profile-cache', methods=['GET'])
+def get_profile_cache_stats():
+    """Get user profile cache hit rate, size, evictions and listener activity"""
+    return jsonify({
+        'success': True,
+        'profile_cache': get_profile_cache().get_stats()
+    })
+
+
+@admin_bp.route('/weather-cache', methods=['GET'])
+def get_weather_cache_stats():
+    """Get forecast cache hit rate and WeatherAPI fetch counts"""
+    return jsonify(weather_service.get_weather_cache_stats())
+
+
+@admin_bp.route('/weather-cache/prefetch', methods=['POST'])
+def prefetch_weather():
+    """
+    Warm forecasts for every distinct user location
+    
+    Run before a fleet decision cycle. Query param: workers (default 8)
+    """
+    workers = request.args.get('workers', type=int)
+    result = weather_service.prefetch_user_forecasts(
+        **({'max_workers': workers} if workers else {})
+    )
+    return jsonify(result), 200 if result['success'] else 500
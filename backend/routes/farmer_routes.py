@@ -3,13 +3,17 @@ Farmer Routes Blueprint
 Endpoints for women farmers' mobile interface
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 
 # Handle imports for running from backend/ or parent directory
 try:
-    from services import farmer_service, valve_service, irrigation_service
+    from services import farmer_service, valve_service, irrigation_service, rollup_service
+    from utils.idempotency import get_idempotency_store, IdempotencyKeyConflict, MAX_KEY_LENGTH
+    from utils.telemetry import ingest_telemetry, get_sensor_series, MAX_BATCH_BYTES
 except ImportError:
-    from backend.services import farmer_service, valve_service, irrigation_service
+    from backend.services import farmer_service, valve_service, irrigation_service, rollup_service
+    from backend.utils.idempotency import get_idempotency_store, IdempotencyKeyConflict, MAX_KEY_LENGTH
+    from backend.utils.telemetry import ingest_telemetry, get_sensor_series, MAX_BATCH_BYTES
 
 
 farmer_bp = Blueprint('farmer', __name__, url_prefix='/api/farmer')
@@ -169,6 +173,36 @@ def toggle_ai_mode(user_id):
         }), 400
 
 
+def _decision_response(user_id):
+    """Run the decision pipeline and serialize it: (status, body bytes)"""
+    try:
+        data = request.json
+        soil_moisture = data.get('soil_moisture')
+        result = irrigation_service.get_irrigation_decision(
+            user_id=user_id,
+            plant_name=data['plant_name'],
+            soil_moisture=float(soil_moisture) if soil_moisture is not None else None,
+            sensor_temperature=data.get('sensor_temperature'),
+            sensor_humidity=data.get('sensor_humidity')
+        )
+        if result['success']:
+            status = 200
+        elif result.get('retryable'):
+            # Transient (weather, telemetry): 503 so an Idempotency-Key retry recomputes it
+            status = 503
+        else:
+            status = 400
+        response = jsonify(result)
+        
+    except Exception as e:
+        response, status = jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+    
+    return status, response.get_data()
+
+
 @farmer_bp.route('/<user_id>/decision', methods=['POST'])
 def get_decision(user_id):
     """
@@ -177,32 +211,136 @@ def get_decision(user_id):
     Body:
     {
         "plant_name": "tomato",
-        "soil_moisture": 45.5,
+        "soil_moisture": 45.5,        // optional if the Pi streams /telemetry
         "sensor_temperature": 28.3,  // optional
         "sensor_humidity": 52.1       // optional
     }
+    
+    Headers:
+        Idempotency-Key: optional, unique per decision cycle. A retry with the
+        same key gets the original response back byte-for-byte (header
+        Idempotent-Replayed: true) instead of re-running weather, XGBoost,
+        Gemini and logging a duplicate.
     """
+    key = request.headers.get('Idempotency-Key')
+    if not key:
+        status, body = _decision_response(user_id)
+        return Response(body, status=status, mimetype='application/json')
+    
+    if len(key) > MAX_KEY_LENGTH:
+        return jsonify({
+            'success': False,
+            'error': f'Idempotency-Key longer than {MAX_KEY_LENGTH} characters'
+        }), 400
+    
     try:
-        data = request.json
-        result = irrigation_service.get_irrigation_decision(
-            user_id=user_id,
-            plant_name=data['plant_name'],
-            soil_moisture=float(data['soil_moisture']),
-            sensor_temperature=data.get('sensor_temperature'),
-            sensor_humidity=data.get('sensor_humidity')
+        status, body, replayed = get_idempotency_store().run(
+            f'decision:{user_id}', key, request.get_data(),
+            lambda: _decision_response(user_id)
         )
-        return jsonify(result), 200 if result['success'] else 400
-        
-    except Exception as e:
+    except IdempotencyKeyConflict as e:
         return jsonify({
             'success': False,
             'error': str(e)
-        }), 500
+        }), 422
+    
+    response = Response(body, status=status, mimetype='application/json')
+    if replayed:
+        response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+@farmer_bp.route('/<user_id>/telemetry', methods=['POST'])
+def post_telemetry(user_id):
+    """
+    Ingest a batch of sensor readings
+    
+    Content-Type: application/x-ndjson - one JSON reading per line
+        {"plant_name": "tomato", "soil_moisture": 41.2, "temperature": 27.5,
+         "humidity": 48.0, "timestamp": 1730540000}
+    
+    Content-Type: application/octet-stream (?plant_name=tomato)
+        packed 16-byte records: uint32 ts | float32 moisture | float32 temp | float32 humidity
+    
+    Returns 202 with accepted/rejected counts. Invalid readings (and
+    readings of plants not in the profile) are rejected individually; the
+    rest of the batch is stored. Unknown users get 404, bodies over
+    MAX_BATCH_BYTES 413.
+    """
+    too_large = {'success': False, 'error': f'Batch larger than {MAX_BATCH_BYTES} bytes'}
+    if request.content_length is not None and request.content_length > MAX_BATCH_BYTES:
+        return jsonify(too_large), 413
+    # Bounded read: chunked bodies carry no Content-Length
+    body = request.stream.read(MAX_BATCH_BYTES + 1)
+    if len(body) > MAX_BATCH_BYTES:
+        return jsonify(too_large), 413
+
+    result = ingest_telemetry(
+        user_id,
+        body,
+        request.mimetype,
+        plant_name=request.args.get('plant_name')
+    )
+    if result.get('not_found'):
+        return jsonify(result), 404
+    return jsonify(result), 202 if result['success'] else 400
+
+
+@farmer_bp.route('/<user_id>/sensor-history', methods=['GET'])
+def get_sensor_history(user_id):
+    """
+    Downsampled sensor history of one plant
+    
+    Query params:
+        plant_name: required
+        start, end: epoch seconds (default: last 24 hours)
+        resolution: raw | 1m | 1h | 1d (default 1h)
+    """
+    plant_name = request.args.get('plant_name')
+    if not plant_name:
+        return jsonify({'success': False, 'error': 'plant_name is required'}), 400
+    result = get_sensor_series(user_id, plant_name,
+                               request.args.get('start', type=int),
+                               request.args.get('end', type=int),
+                               request.args.get('resolution', '1h'))
+    return jsonify(result), 200 if result['success'] else 400
 
 
 @farmer_bp.route('/<user_id>/history', methods=['GET'])
 def get_history(user_id):
-    """Get irrigation history"""
+    """
+    Get irrigation history (paginated, newest first)
+    
+    Query params:
+        limit: page size (default 50, max 500)
+        cursor: next_cursor from the previous page
+        fields: comma-separated projection, e.g. "timestamp,action,should_water"
+    """
     limit = request.args.get('limit', 50, type=int)
-    result = irrigation_service.get_irrigation_history(user_id, limit)
-    return jsonify(result), 200 if result['success'] else 500
+    cursor = request.args.get('cursor') or None
+    fields = request.args.get('fields')
+    fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else None
+    
+    result = irrigation_service.get_irrigation_history(user_id, limit, start_after=cursor, fields=fields)
+    if result['success']:
+        return jsonify(result), 200
+    return jsonify(result), 400 if result.get('invalid_fields') else 500
+
+
+@farmer_bp.route('/<user_id>/usage', methods=['GET'])
+def get_usage(user_id):
+    """
+    Get daily irrigation counters (from rollups, no log scan)
+    
+    Query params:
+        days: number of days up to today (default 30, max 366)
+    """
+    days = request.args.get('days', 30, type=int)
+    try:
+        result = rollup_service.get_user_rollups(user_id, days)
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
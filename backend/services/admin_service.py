@@ -3,18 +3,30 @@ Admin Service
 Handles admin operations: add/edit/delete users, manage data
 """
 
+import csv
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional
-from firebase_admin import firestore
+from typing import Dict, Iterator, List, Optional, Tuple
 
 # Handle imports for running from backend/ or parent directory
 try:
-    from utils.firebase_client import get_db
+    from utils.repositories import get_user_repository
     from services.plant_service import get_plant_features
 except ImportError:
-    from backend.utils.firebase_client import get_db
+    from backend.utils.repositories import get_user_repository
     from backend.services.plant_service import get_plant_features
 
+DEFAULT_USER_PAGE_SIZE = 100
+MAX_USER_PAGE_SIZE = 1000
+
+SOIL_TYPE_ENCODING = {'sandy': 1, 'loam': 2, 'clay': 3}
+
+MAX_BULK_USERS = 5000
+# Concurrent plant lookups in a bulk import (each may be a Gemini call)
+BULK_PLANT_WORKERS = int(os.environ.get('BULK_PLANT_WORKERS', '4'))
+
 
 def add_user(email: str, name: str, location: str, 
              soil_properties: Dict, plants: List[Dict], 
@@ -33,12 +45,7 @@ def add_user(email: str, name: str, location: str,
     Returns:
         Dictionary with user_id and status
     """
-    db = get_db()
-    
-    # Get soil type encoding
-    soil_type_map = {'sandy': 1, 'loam': 2, 'clay': 3}
-    soil_type = soil_properties['soil_type'].lower()
-    soil_type_encoded = soil_type_map.get(soil_type, 2)
+    users = get_user_repository()
     
     # Get plant features for each plant
     plants_with_features = []
@@ -51,12 +58,29 @@ def add_user(email: str, name: str, location: str,
         })
     
     # Create user document
-    user_ref = db.collection('users').document()
-    user_id = user_ref.id
+    user_id = users.new_id()
+    user_data = _build_user(user_id, email, name, location, soil_properties, plants_with_features)
     
-    user_data = {
+    users.set(user_id, user_data)
+    
+    return {
+        'success': True,
         'user_id': user_id,
-        'email': email,
+        'message': f'User {name} added successfully',
+        'plants_processed': len(plants_with_features)
+    }
+
+
+def _build_user(user_id: str, email: str, name: str, location: str,
+                soil_properties: Dict, plants_with_features: List[Dict]) -> Dict:
+    """New farmer document"""
+    # Get soil type encoding
+    soil_type = soil_properties['soil_type'].lower()
+    soil_type_encoded = SOIL_TYPE_ENCODING.get(soil_type, 2)
+    
+    return {
+        'user_id': user_id,
+        'email': email.strip().lower(),  # Normalized so imports can find existing users
         'name': name,
         'location': location,
         'soil_properties': {
@@ -71,14 +95,193 @@ def add_user(email: str, name: str, location: str,
         'ai_mode': True,  # Default: AI makes decisions
         'role': 'farmer'
     }
+
+
+def parse_users_csv(text: str) -> List[Dict]:
+    """
+    Parse a bulk import CSV into user rows
+    
+    Columns: email, name, location, soil_type, soil_compaction, slope_degrees, plants
+    where plants is "name:area_sqm" pairs separated by ";" (e.g. "tomato:100;olive:50")
+    
+    Returns:
+        Rows in the JSON bulk format (values still strings; validated later).
+        A row with more or fewer fields than the header is returned as
+        {'_error': ...} and reported by bulk_add_users as a failed row.
+    """
+    rows = []
+    reader = csv.DictReader(io.StringIO(text))
+    for record in reader:
+        # DictReader puts extra fields in a list under None, and missing ones as None
+        extra = record.pop(None, None)
+        missing = [k for k, v in record.items() if v is None]
+        if extra or missing:
+            found = len(reader.fieldnames) + len(extra or []) - len(missing)
+            hint = ' (quote values that contain commas)' if extra else ''
+            rows.append({'_error': f'Line {reader.line_num}: {found} fields, header has '
+                                   f'{len(reader.fieldnames)}{hint}'})
+            continue
+        record = {(k or '').strip(): v.strip() for k, v in record.items()}
+        plants = []
+        for item in filter(None, (p.strip() for p in record.get('plants', '').split(';'))):
+            plant_name, _, area = item.partition(':')
+            plants.append({'name': plant_name.strip(), 'area_sqm': area.strip() or None})
+        rows.append({
+            'email': record.get('email'),
+            'name': record.get('name'),
+            'location': record.get('location'),
+            'soil_properties': {
+                'soil_type': record.get('soil_type'),
+                'soil_compaction': record.get('soil_compaction'),
+                'slope_degrees': record.get('slope_degrees')
+            },
+            'plants': plants
+        })
+    return rows
+
+
+def _validate_bulk_row(row) -> Tuple[Optional[Dict], Optional[str]]:
+    """Normalize one bulk row. Returns (row, None) or (None, error)."""
+    if not isinstance(row, dict):
+        return None, 'Row must be an object'
+    if row.get('_error'):
+        return None, row['_error']
+    missing = [field for field in ('email', 'name', 'location', 'soil_properties', 'plants')
+               if not row.get(field)]
+    if missing:
+        return None, f"Missing fields: {', '.join(missing)}"
+    
+    soil = row['soil_properties']
+    if not isinstance(soil, dict) or not soil.get('soil_type'):
+        return None, 'soil_properties.soil_type is required'
+    if str(soil['soil_type']).lower() not in SOIL_TYPE_ENCODING:
+        return None, f"Unknown soil_type '{soil['soil_type']}' (sandy, loam or clay)"
+    try:
+        soil_properties = {
+            'soil_type': str(soil['soil_type']).lower(),
+            'soil_compaction': float(soil['soil_compaction']),
+            'slope_degrees': float(soil['slope_degrees'])
+        }
+    except (KeyError, TypeError, ValueError):
+        return None, 'soil_compaction and slope_degrees must be numbers'
+    
+    if not isinstance(row['plants'], list):
+        return None, 'plants must be a list'
+    plants = []
+    for plant in row['plants']:
+        if not isinstance(plant, dict) or not str(plant.get('name') or '').strip():
+            return None, 'Every plant needs a name'
+        try:
+            area_sqm = float(plant['area_sqm'])
+        except (KeyError, TypeError, ValueError):
+            return None, f"Plant {plant['name']}: area_sqm must be a number"
+        plants.append({'name': str(plant['name']).strip(), 'area_sqm': area_sqm})
+    
+    return {
+        'email': str(row['email']).strip(),
+        'name': str(row['name']).strip(),
+        'location': str(row['location']).strip(),
+        'soil_properties': soil_properties,
+        'plants': plants
+    }, None
+
+
+def bulk_add_users(rows: List, gemini_model=None) -> Dict:
+    """
+    Add many farmers at once (admin function)
+    
+    Rows are validated first; rows whose email already belongs to a user
+    fail with "already exists", so re-posting the same file creates nobody
+    twice. Each distinct plant name is then resolved once with up to
+    BULK_PLANT_WORKERS lookups in parallel; a failed lookup fails only the
+    rows with that plant. Users are committed in batches of 500 writes with
+    their stats counters.
+    
+    Args:
+        rows: Users in the add_user format ({email, name, location,
+              soil_properties, plants}), e.g. from parse_users_csv()
+        gemini_model: Optional Gemini model for plant generation
+        
+    Returns:
+        Per-row results (row numbers start at 1) and counts
+    """
+    if len(rows) > MAX_BULK_USERS:
+        return {
+            'success': False,
+            'error': f'At most {MAX_BULK_USERS} users per import (got {len(rows)})'
+        }
+    
+    results = [None] * len(rows)
+    valid = []
+    seen_emails = set()
+    for i, row in enumerate(rows):
+        user, error = _validate_bulk_row(row)
+        if user and user['email'].lower() in seen_emails:
+            error = f"Duplicate email {user['email']} in this import"
+        if error:
+            results[i] = {'row': i + 1, 'success': False, 'error': error}
+            continue
+        seen_emails.add(user['email'].lower())
+        valid.append((i, user))
+    
+    users = get_user_repository()
+    existing = users.existing_emails([user['email'] for _, user in valid])
+    for i, user in valid:
+        if user['email'].lower() in existing:
+            results[i] = {'row': i + 1, 'success': False, 'email': user['email'],
+                          'error': f"User with email {user['email']} already exists"}
+    valid = [(i, user) for i, user in valid if user['email'].lower() not in existing]
+    
+    # Resolve each distinct plant once (local DB, Firestore cache or Gemini)
+    plant_names = {}
+    for _, user in valid:
+        for plant in user['plants']:
+            plant_names.setdefault(plant['name'].lower(), plant['name'])
+    
+    def resolve(name):
+        try:
+            return get_plant_features(name, None, gemini_model), None
+        except Exception as e:
+            return None, str(e)
+    
+    with ThreadPoolExecutor(max_workers=max(1, BULK_PLANT_WORKERS)) as pool:
+        resolved = dict(zip(plant_names, pool.map(resolve, plant_names.values())))
+    features = {key: plant for key, (plant, error) in resolved.items() if error is None}
     
-    user_ref.set(user_data)
+    resolvable = []
+    for i, user in valid:
+        failed = [p['name'] for p in user['plants'] if p['name'].lower() not in features]
+        if failed:
+            results[i] = {'row': i + 1, 'success': False, 'email': user['email'],
+                          'error': f"Plant {failed[0]}: {resolved[failed[0].lower()][1]}"}
+        else:
+            resolvable.append((i, user))
+    valid = resolvable
     
+    documents = []
+    for _, user in valid:
+        user_id = users.new_id()
+        plants_with_features = [
+            {'name': p['name'], 'area_sqm': p['area_sqm'], 'features': features[p['name'].lower()]}
+            for p in user['plants']
+        ]
+        documents.append((user_id, _build_user(user_id, user['email'], user['name'], user['location'],
+                                               user['soil_properties'], plants_with_features)))
+    
+    for (i, user), (user_id, _), error in zip(valid, documents, users.create_many(documents)):
+        if error:
+            results[i] = {'row': i + 1, 'success': False, 'email': user['email'], 'error': error}
+        else:
+            results[i] = {'row': i + 1, 'success': True, 'email': user['email'], 'user_id': user_id,
+                          'plants_processed': len(user['plants'])}
+    
+    created = sum(1 for r in results if r['success'])
     return {
         'success': True,
-        'user_id': user_id,
-        'message': f'User {name} added successfully',
-        'plants_processed': len(plants_with_features)
+        'created': created,
+        'failed': len(results) - created,
+        'plants_resolved': len(features),
+        'results': results
     }
 
 
@@ -93,12 +296,10 @@ def update_user(user_id: str, updates: Dict) -> Dict:
     Returns:
         Success status
     """
-    db = get_db()
-    user_ref = db.collection('users').document(user_id)
+    users = get_user_repository()
     
     # Check if user exists
-    user_doc = user_ref.get()
-    if not user_doc.exists:
+    if not users.exists(user_id):
         return {
             'success': False,
             'error': f'User {user_id} not found'
@@ -107,7 +308,7 @@ def update_user(user_id: str, updates: Dict) -> Dict:
     # Update timestamp
     updates['updated_at'] = datetime.now().isoformat()
     
-    user_ref.update(updates)
+    users.update(user_id, updates)
     
     return {
         'success': True,
@@ -117,18 +318,16 @@ def update_user(user_id: str, updates: Dict) -> Dict:
 
 def delete_user(user_id: str) -> Dict:
     """Delete a user"""
-    db = get_db()
-    user_ref = db.collection('users').document(user_id)
+    users = get_user_repository()
     
     # Check if user exists
-    user_doc = user_ref.get()
-    if not user_doc.exists:
+    if not users.exists(user_id):
         return {
             'success': False,
             'error': f'User {user_id} not found'
         }
     
-    user_ref.delete()
+    users.delete(user_id)
     
     return {
         'success': True,
@@ -138,11 +337,9 @@ def delete_user(user_id: str) -> Dict:
 
 def get_user(user_id: str) -> Dict:
     """Get user profile"""
-    db = get_db()
-    user_ref = db.collection('users').document(user_id)
-    user_doc = user_ref.get()
+    user_data = get_user_repository().get(user_id)
     
-    if not user_doc.exists:
+    if user_data is None:
         return {
             'success': False,
             'error': f'User {user_id} not found'
@@ -150,37 +347,72 @@ def get_user(user_id: str) -> Dict:
     
     return {
         'success': True,
-        'user': user_doc.to_dict()
+        'user': user_data
     }
 
 
+def _list_view(user_data: Dict) -> Dict:
+    """Don't return full plant features in list view"""
+    if 'plants' in user_data:
+        user_data['plants'] = [
+            {'name': p['name'], 'area_sqm': p.get('area_sqm')} 
+            for p in user_data['plants']
+        ]
+    return user_data
+
+
+def list_users_page(role: Optional[str] = None, limit: int = DEFAULT_USER_PAGE_SIZE,
+                    cursor: Optional[str] = None) -> Dict:
+    """
+    One page of users, ordered by user ID (admin function)
+    
+    Args:
+        role: Filter by role ('farmer', 'admin'), None for all
+        limit: Page size (capped at MAX_USER_PAGE_SIZE)
+        cursor: next_cursor from the previous page
+        
+    Returns:
+        Users plus next_cursor (None on the last page)
+    """
+    limit = max(1, min(int(limit), MAX_USER_PAGE_SIZE))
+    page = get_user_repository().page(limit, after=cursor, role=role)
+    
+    return {
+        'success': True,
+        'count': len(page),
+        'users': [_list_view(user_data) for _, user_data in page],
+        'next_cursor': page[-1][0] if len(page) == limit else None
+    }
+
+
+def iter_users(role: Optional[str] = None, page_size: int = MAX_USER_PAGE_SIZE) -> Iterator[List[Dict]]:
+    """
+    Every user in list view, one page at a time (bounded memory)
+    
+    Args:
+        role: Filter by role ('farmer', 'admin'), None for all
+        page_size: Users read per query
+        
+    Yields:
+        Lists of users
+    """
+    for page in get_user_repository().iter_pages(page_size, role=role):
+        yield [_list_view(user_data) for _, user_data in page]
+
+
 def list_all_users(role: Optional[str] = None) -> Dict:
     """
     List all users (admin function)
     
+    Holds every user in memory; GET /api/admin/users streams iter_users instead.
+    
     Args:
         role: Filter by role ('farmer', 'admin'), None for all
         
     Returns:
         List of users
     """
-    db = get_db()
-    
-    if role:
-        users_ref = db.collection('users').where('role', '==', role)
-    else:
-        users_ref = db.collection('users')
-    
-    users = []
-    for doc in users_ref.stream():
-        user_data = doc.to_dict()
-        # Don't return full plant features in list view
-        if 'plants' in user_data:
-            user_data['plants'] = [
-                {'name': p['name'], 'area_sqm': p.get('area_sqm')} 
-                for p in user_data['plants']
-            ]
-        users.append(user_data)
+    users = [user for page in iter_users(role) for user in page]
     
     return {
         'success': True,
@@ -191,8 +423,6 @@ def list_all_users(role: Optional[str] = None) -> Dict:
 
 def add_plant_to_user(user_id: str, plant_name: str, area_sqm: float, gemini_model=None) -> Dict:
     """Add a plant to a user's profile"""
-    db = get_db()
-    
     # Get plant features
     plant_features = get_plant_features(plant_name, user_id, gemini_model)
     
@@ -203,10 +433,7 @@ def add_plant_to_user(user_id: str, plant_name: str, area_sqm: float, gemini_mod
     }
     
     # Update user document
-    user_ref = db.collection('users').document(user_id)
-    user_ref.update({
-        'plants': firestore.ArrayUnion([new_plant])
-    })
+    get_user_repository().add_plant(user_id, new_plant)
     
     return {
         'success': True,
@@ -217,17 +444,15 @@ def add_plant_to_user(user_id: str, plant_name: str, area_sqm: float, gemini_mod
 
 def remove_plant_from_user(user_id: str, plant_name: str) -> Dict:
     """Remove a plant from user's profile"""
-    db = get_db()
-    user_ref = db.collection('users').document(user_id)
-    user_doc = user_ref.get()
+    users = get_user_repository()
+    user_data = users.get(user_id, fields=['plants'])
     
-    if not user_doc.exists:
+    if user_data is None:
         return {
             'success': False,
             'error': f'User {user_id} not found'
         }
     
-    user_data = user_doc.to_dict()
     plants = user_data.get('plants', [])
     
     # Filter out the plant
@@ -239,7 +464,7 @@ def remove_plant_from_user(user_id: str, plant_name: str) -> Dict:
             'error': f'Plant {plant_name} not found in user profile'
         }
     
-    user_ref.update({'plants': updated_plants})
+    users.update(user_id, {'plants': updated_plants})
     
     return {
         'success': True,
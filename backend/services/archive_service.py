@@ -0,0 +1,341 @@
+"""
+Irrigation Log Archive Service
+Moves old irrigation logs out of the hot irrigation_logs collection
+
+Logs older than the retention window are packed into per-user, per-month
+archive chunks, either:
+  - Firestore documents: irrigation_log_archives/<user>_<YYYY-MM>_<first_log_id>
+    holding up to MAX_LOGS_PER_ARCHIVE_DOC logs each, or
+  - local Parquet files: data/archive/<user>/<YYYY-MM>.parquet
+
+read_archived_logs() reads both (whichever backend a run used) so history
+reads stay transparent. Logs without a user_id are archived under
+UNKNOWN_USER rather than dropped.
+"""
+
+import json
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from firebase_admin import firestore
+
+# Handle imports for running from backend/ or parent directory
+try:
+    from utils.firebase_client import get_db
+except ImportError:
+    from backend.utils.firebase_client import get_db
+
+# Parquet archives are optional (needs pyarrow)
+try:
+    import pandas as pd
+    import pyarrow  # noqa: F401
+except ImportError:
+    pd = None
+
+ARCHIVE_COLLECTION = 'irrigation_log_archives'
+ARCHIVE_BACKEND = os.environ.get('LOG_ARCHIVE_BACKEND', 'firestore')  # 'firestore' or 'parquet'
+ARCHIVE_DIR = os.environ.get(
+    'LOG_ARCHIVE_DIR',
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'archive')
+)
+RETENTION_DAYS = int(os.environ.get('LOG_RETENTION_DAYS', 90))
+
+# Archive owner of logs written without a user_id
+UNKNOWN_USER = '_unknown'
+
+# ~1.5 KB per log with Arabic reasoning keeps a chunk far below Firestore's 1 MiB
+MAX_LOGS_PER_ARCHIVE_DOC = 200
+# Each page deletes N logs and writes at most N archive chunks: stay under 500 writes
+ARCHIVE_PAGE_SIZE = 200
+
+# Nested fields stored as JSON strings in Parquet
+PARQUET_JSON_COLUMNS = ['sensor_data', 'decision', 'reasoning']
+
+
+def _month_of(log_data: Dict) -> str:
+    return log_data.get('timestamp', '')[:7] or 'unknown'
+
+
+def _compact_log(log_id: str, log_data: Dict) -> Dict:
+    """Archive entry: the log without its (per-document redundant) user_id"""
+    entry = {k: v for k, v in log_data.items() if k != 'user_id'}
+    entry['log_id'] = log_id
+    return entry
+
+
+def _user_archive_dir(user_id: str) -> str:
+    return os.path.join(ARCHIVE_DIR, user_id)
+
+
+# ----------------------------------------------------------------------
+# Writing archives
+# ----------------------------------------------------------------------
+
+def _write_firestore_chunks(db, batch, user_id: str, month: str, entries: List[Dict]):
+    """Add archive chunk documents for one (user, month) group to a batch"""
+    entries.sort(key=lambda e: e['timestamp'])
+    for i in range(0, len(entries), MAX_LOGS_PER_ARCHIVE_DOC):
+        chunk = entries[i:i + MAX_LOGS_PER_ARCHIVE_DOC]
+        # ID derived from content: re-archiving the same logs overwrites, never duplicates
+        chunk_ref = db.collection(ARCHIVE_COLLECTION).document(f"{user_id}_{month}_{chunk[0]['log_id']}")
+        batch.set(chunk_ref, {
+            'user_id': user_id,
+            'month': month,
+            'first_timestamp': chunk[0]['timestamp'],
+            'last_timestamp': chunk[-1]['timestamp'],
+            'count': len(chunk),
+            'logs': chunk,
+            'archived_at': datetime.now().isoformat()
+        })
+
+
+def _write_parquet(user_id: str, month: str, entries: List[Dict]):
+    """Append entries to the user's monthly Parquet file (rewrite, de-duplicated)"""
+    rows = []
+    for entry in entries:
+        row = dict(entry)
+        for column in PARQUET_JSON_COLUMNS:
+            if column in row:
+                row[column] = json.dumps(row[column], ensure_ascii=False)
+        rows.append(row)
+
+    os.makedirs(_user_archive_dir(user_id), exist_ok=True)
+    path = os.path.join(_user_archive_dir(user_id), f'{month}.parquet')
+
+    frame = pd.DataFrame(rows)
+    if os.path.exists(path):
+        frame = pd.concat([pd.read_parquet(path), frame], ignore_index=True)
+    frame = frame.drop_duplicates(subset='log_id', keep='last').sort_values('timestamp')
+
+    tmp_path = path + '.tmp'
+    frame.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def archive_old_logs(retention_days: int = RETENTION_DAYS, backend: str = ARCHIVE_BACKEND,
+                     dry_run: bool = False, max_logs: Optional[int] = None,
+                     verbose: bool = True) -> Dict:
+    """
+    Move logs older than the retention window into archives
+
+    Each page of logs is archived and deleted in one atomic batch
+    (Firestore backend), or written to Parquet before being deleted. The
+    cutoff is a day boundary, so a day's logs are never split between
+    irrigation_logs and the archive once a run completes.
+
+    Args:
+        retention_days: Logs newer than this stay in irrigation_logs
+        backend: 'firestore' or 'parquet'
+        dry_run: Only count what would be archived
+        max_logs: Stop after archiving this many logs (None = all)
+        verbose: Print progress
+
+    Returns:
+        Counts of archived logs and (user, month) groups
+    """
+    if backend not in ('firestore', 'parquet'):
+        return {'success': False, 'error': f'Unknown archive backend: {backend}'}
+    if backend == 'parquet' and pd is None:
+        return {'success': False, 'error': 'Parquet archives require pandas and pyarrow'}
+
+    db = get_db()
+    # Midnight: 'YYYY-MM-DD' sorts before every timestamp of that day
+    cutoff = (date.today() - timedelta(days=retention_days)).isoformat()
+    archived = 0
+    groups_seen = set()
+    last_doc = None
+
+    while max_logs is None or archived < max_logs:
+        page_size = ARCHIVE_PAGE_SIZE if max_logs is None else min(ARCHIVE_PAGE_SIZE, max_logs - archived)
+        query = db.collection('irrigation_logs')\
+                  .where('timestamp', '<', cutoff)\
+                  .order_by('timestamp')\
+                  .limit(page_size)
+        if dry_run and last_doc is not None:
+            # Nothing is deleted in a dry run, so page with a cursor
+            query = query.start_after(last_doc)
+
+        docs = list(query.stream())
+        if not docs:
+            break
+
+        groups = defaultdict(list)
+        for doc in docs:
+            log_data = doc.to_dict()
+            owner = log_data.get('user_id') or UNKNOWN_USER
+            groups[(owner, _month_of(log_data))].append(_compact_log(doc.id, log_data))
+        groups_seen.update(groups)
+        archived_ids = {entry['log_id'] for entries in groups.values() for entry in entries}
+
+        if not dry_run:
+            batch = db.batch()
+            if backend == 'firestore':
+                for (user_id, month), entries in groups.items():
+                    _write_firestore_chunks(db, batch, user_id, month, entries)
+            else:
+                for (user_id, month), entries in groups.items():
+                    _write_parquet(user_id, month, entries)
+            # Only logs written to an archive above are deleted
+            for doc in docs:
+                if doc.id in archived_ids:
+                    batch.delete(doc.reference)
+            batch.commit()
+
+        archived += len(docs)
+        last_doc = docs[-1]
+        if verbose:
+            print(f"   {'Found' if dry_run else 'Archived'} {archived} logs (up to {docs[-1].to_dict().get('timestamp')})")
+
+    return {
+        'success': True,
+        'dry_run': dry_run,
+        'backend': backend,
+        'cutoff': cutoff,
+        'logs_archived': archived,
+        'user_months': len(groups_seen)
+    }
+
+
+# ----------------------------------------------------------------------
+# Reading archives
+# ----------------------------------------------------------------------
+
+def _log_key(log: Dict) -> Tuple[str, str]:
+    """History order: timestamp, then log ID (both descending when newest first)"""
+    return log['timestamp'], log.get('log_id') or ''
+
+
+def _is_before(log: Dict, before: Optional[str], before_id: Optional[str]) -> bool:
+    """True if the log comes after the (before, before_id) cursor, newest first"""
+    if not before:
+        return True
+    if before_id:
+        return _log_key(log) < (before, before_id)
+    return log['timestamp'] < before
+
+
+def _read_parquet_logs(user_id: str, before: Optional[str], limit: int,
+                       before_id: Optional[str] = None) -> List[Dict]:
+    """Newest-first archived logs from the user's Parquet files"""
+    user_dir = _user_archive_dir(user_id)
+    if pd is None or not os.path.isdir(user_dir):
+        return []
+
+    logs = []
+    months = sorted((f for f in os.listdir(user_dir) if f.endswith('.parquet')), reverse=True)
+    for filename in months:
+        if before and filename[:7] > before[:7]:
+            continue
+        frame = pd.read_parquet(os.path.join(user_dir, filename))
+        if before and before_id:
+            frame = frame[(frame['timestamp'] < before) |
+                          ((frame['timestamp'] == before) & (frame['log_id'] < before_id))]
+        elif before:
+            frame = frame[frame['timestamp'] < before]
+        frame = frame.sort_values(['timestamp', 'log_id'], ascending=False)
+
+        for row in frame.to_dict('records'):
+            log = {k: v for k, v in row.items() if not (isinstance(v, float) and v != v)}  # drop NaN
+            for column in PARQUET_JSON_COLUMNS:
+                if isinstance(log.get(column), str):
+                    log[column] = json.loads(log[column])
+            log['user_id'] = user_id
+            log['archived'] = True
+            logs.append(log)
+            if len(logs) >= limit:
+                return logs
+    return logs
+
+
+def _read_firestore_logs(user_id: str, before: Optional[str], limit: int,
+                         before_id: Optional[str] = None) -> List[Dict]:
+    """Newest-first archived logs from the user's archive chunk documents"""
+    db = get_db()
+    query = db.collection(ARCHIVE_COLLECTION).where('user_id', '==', user_id)
+    if before:
+        query = query.where('first_timestamp', '<=' if before_id else '<', before)
+    query = query.order_by('first_timestamp', direction=firestore.Query.DESCENDING)
+
+    logs = []
+    for chunk_doc in query.stream():
+        chunk = chunk_doc.to_dict()
+        # Chunks are near-disjoint in time; stop once this one is entirely older
+        # than everything we would still return
+        if len(logs) >= limit and chunk['last_timestamp'] < logs[limit - 1]['timestamp']:
+            break
+        for entry in chunk.get('logs', []):
+            if not _is_before(entry, before, before_id):
+                continue
+            logs.append(dict(entry, user_id=user_id, archived=True))
+        logs.sort(key=_log_key, reverse=True)
+
+    return logs[:limit]
+
+
+def iter_archived_logs(page_size: int = 100) -> Iterator[Tuple[str, Dict]]:
+    """
+    Every archived log in both backends, as (user_id, log) pairs
+
+    Used to rebuild rollups: archived logs were counted when they were
+    written, so a rebuild must count them too. Logs archived under
+    UNKNOWN_USER are yielded with user_id None, as they were written.
+    """
+    db = get_db()
+    last_doc = None
+    while True:
+        query = db.collection(ARCHIVE_COLLECTION).order_by('__name__').limit(page_size)
+        if last_doc is not None:
+            query = query.start_after(last_doc)
+        docs = list(query.stream())
+        if not docs:
+            break
+        for chunk_doc in docs:
+            chunk = chunk_doc.to_dict()
+            owner = None if chunk['user_id'] == UNKNOWN_USER else chunk['user_id']
+            for entry in chunk.get('logs', []):
+                yield owner, entry
+        last_doc = docs[-1]
+
+    if pd is None or not os.path.isdir(ARCHIVE_DIR):
+        return
+    for user_id in sorted(os.listdir(ARCHIVE_DIR)):
+        owner = None if user_id == UNKNOWN_USER else user_id
+        for log in _read_parquet_logs(user_id, None, float('inf')):
+            yield owner, log
+
+
+def read_archived_logs(user_id: str, before: Optional[str] = None, limit: int = 50,
+                       backend: Optional[str] = None, before_id: Optional[str] = None) -> List[Dict]:
+    """
+    Get archived logs for a user, newest first
+
+    Reads both backends by default: archive_logs.py --backend can differ
+    from this server's LOG_ARCHIVE_BACKEND, and a user's logs may have been
+    archived to each by different runs.
+
+    Args:
+        user_id: User ID
+        before: Only logs with timestamp strictly before this ISO timestamp
+        limit: Maximum number of logs
+        backend: 'firestore' or 'parquet' to read only one (None = both)
+        before_id: With before, also logs at exactly `before` with a smaller
+                   log_id (the (timestamp, log_id) history cursor)
+
+    Returns:
+        Logs (with log_id and archived=True)
+    """
+    if limit <= 0:
+        return []
+    logs = []
+    if backend in (None, 'firestore'):
+        logs += _read_firestore_logs(user_id, before, limit, before_id)
+    if backend in (None, 'parquet'):
+        logs += _read_parquet_logs(user_id, before, limit, before_id)
+    if backend is None:
+        # A log archived to both (re-run after a crash) is returned once
+        seen = set()
+        logs = [log for log in logs if not (log['log_id'] in seen or seen.add(log['log_id']))]
+        logs.sort(key=_log_key, reverse=True)
+    return logs[:limit]
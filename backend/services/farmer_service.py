@@ -8,14 +8,19 @@ from typing import Dict
 
 # Handle imports for running from backend/ or parent directory
 try:
-    from utils.firebase_client import get_db
-    from services.valve_service import get_valve_status
+    from utils.repositories import get_log_repository, get_user_repository
+    from utils.log_writer import get_pending_logs, merge_pending_logs
+    from services.valve_service import VALVE_STATUS_FIELDS, valve_status_from_profile
     from services.weather_service import get_weather_summary
 except ImportError:
-    from backend.utils.firebase_client import get_db
-    from backend.services.valve_service import get_valve_status
+    from backend.utils.repositories import get_log_repository, get_user_repository
+    from backend.utils.log_writer import get_pending_logs, merge_pending_logs
+    from backend.services.valve_service import VALVE_STATUS_FIELDS, valve_status_from_profile
     from backend.services.weather_service import get_weather_summary
 
+# Plants are read whole: field masks cannot select inside arrays
+FARM_STATE_FIELDS = ['name', 'location', 'email', 'plants'] + VALVE_STATUS_FIELDS
+
 
 def get_farm_state(user_id: str) -> Dict:
     """
@@ -28,22 +33,17 @@ def get_farm_state(user_id: str) -> Dict:
         - AI mode status
         - Recent activity
     """
-    db = get_db()
-    
     # Get user profile
-    user_ref = db.collection('users').document(user_id)
-    user_doc = user_ref.get()
+    user_data = get_user_repository().get(user_id, fields=FARM_STATE_FIELDS)
     
-    if not user_doc.exists:
+    if user_data is None:
         return {
             'success': False,
             'error': f'User {user_id} not found'
         }
     
-    user_data = user_doc.to_dict()
-    
-    # Get valve status
-    valve_status = get_valve_status(user_id)
+    # Get valve status (from the same read)
+    valve_status = valve_status_from_profile(user_id, user_data)
     
     # Get weather
     location = user_data.get('location', 'Tunis')
@@ -51,21 +51,18 @@ def get_farm_state(user_id: str) -> Dict:
     
     # Get recent logs (last 5)
     try:
-        from firebase_admin import firestore
-        logs_ref = db.collection('irrigation_logs')\
-                     .where('user_id', '==', user_id)\
-                     .order_by('timestamp', direction=firestore.Query.DESCENDING)\
-                     .limit(5)
+        pending = get_pending_logs(user_id)
+        logs = get_log_repository().recent_for_user(user_id, 5)
         
-        recent_logs = []
-        for doc in logs_ref.stream():
-            log = doc.to_dict()
-            recent_logs.append({
+        recent_logs = [
+            {
                 'timestamp': log['timestamp'],
                 'plant_name': log.get('plant_name'),
                 'action': log.get('action', 'decision'),
                 'should_water': log.get('decision', {}).get('should_water', False)
-            })
+            }
+            for log in merge_pending_logs(logs, pending, 5)
+        ]
     except Exception:
         recent_logs = []
     
@@ -101,17 +98,14 @@ def get_farm_state(user_id: str) -> Dict:
 
 def get_user_plants(user_id: str) -> Dict:
     """Get list of user's plants"""
-    db = get_db()
-    user_ref = db.collection('users').document(user_id)
-    user_doc = user_ref.get()
+    user_data = get_user_repository().get(user_id, fields=['plants'])
     
-    if not user_doc.exists:
+    if user_data is None:
         return {
             'success': False,
             'error': f'User {user_id} not found'
         }
     
-    user_data = user_doc.to_dict()
     plants = user_data.get('plants', [])
     
     return {
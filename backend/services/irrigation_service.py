@@ -5,24 +5,40 @@ Handles AI-powered irrigation decisions using XGBoost + Gemini
 
 import sys
 import os
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 # Add parent directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
 # Handle imports for running from backend/ or parent directory
 try:
-    from utils.firebase_client import get_db
+    from utils.repositories import get_log_repository, get_user_repository
+    from utils.log_writer import enqueue_irrigation_log, get_pending_logs, merge_pending_logs
+    from utils.telemetry import get_latest_reading
+    from utils.timeseries import get_timeseries_store
+    from utils.moisture_trend import schedule_next_check
     from services.weather_service import get_weather_forecast
+    from services.archive_service import read_archived_logs
+    from services import rollup_service  # noqa: F401 (registers the log writer's rollup hook)
 except ImportError:
-    from backend.utils.firebase_client import get_db
+    from backend.utils.repositories import get_log_repository, get_user_repository
+    from backend.utils.log_writer import enqueue_irrigation_log, get_pending_logs, merge_pending_logs
+    from backend.utils.telemetry import get_latest_reading
+    from backend.utils.timeseries import get_timeseries_store
+    from backend.utils.moisture_trend import schedule_next_check
     from backend.services.weather_service import get_weather_forecast
+    from backend.services.archive_service import read_archived_logs
+    from backend.services import rollup_service  # noqa: F401
 
-from firebase_admin import firestore
+# Profile fields make_irrigation_decision reads
+DECISION_FIELDS = ['ai_mode', 'watering_state', 'plants', 'location', 'last_watering', 'soil_properties']
 
 # Import decision maker
 _decision_maker = None
+_decision_maker_lock = threading.Lock()
 
 try:
     from utils.gemini_decision import GeminiIrrigationDecision
@@ -33,12 +49,15 @@ except ImportError:
         GeminiIrrigationDecision = None
 
 def get_decision_maker():
+    """Shared decision maker (models load once, usually during startup warmup)"""
     global _decision_maker
     if _decision_maker is None and GeminiIrrigationDecision is not None:
-        try:
-            _decision_maker = GeminiIrrigationDecision()
-        except Exception as e:
-            print(f"Warning: Could not initialize GeminiIrrigationDecision: {e}")
+        with _decision_maker_lock:
+            if _decision_maker is None:
+                try:
+                    _decision_maker = GeminiIrrigationDecision()
+                except Exception as e:
+                    print(f"Warning: Could not initialize GeminiIrrigationDecision: {e}")
     return _decision_maker
 
 
@@ -54,7 +73,7 @@ def calculate_season(day_of_year: int) -> int:
         return 4  # winter
 
 
-def get_irrigation_decision(user_id: str, plant_name: str, soil_moisture: float,
+def get_irrigation_decision(user_id: str, plant_name: str, soil_moisture: Optional[float] = None,
                            sensor_temperature: Optional[float] = None,
                            sensor_humidity: Optional[float] = None) -> Dict:
     """
@@ -63,26 +82,58 @@ def get_irrigation_decision(user_id: str, plant_name: str, soil_moisture: float,
     Args:
         user_id: User ID
         plant_name: Plant to water
-        soil_moisture: Current soil moisture (%)
+        soil_moisture: Current soil moisture (%). If None, the latest
+                       reading ingested through /telemetry is used.
         sensor_temperature: Optional temperature override
         sensor_humidity: Optional humidity override
         
     Returns:
         Decision with reasoning
     """
-    db = get_db()
+    sensor_source = 'request'
+    if soil_moisture is None:
+        reading = get_latest_reading(user_id, plant_name)
+        if reading is None:
+            return {
+                'success': False,
+                'error': 'No soil_moisture provided and no recent telemetry for this plant',
+                'retryable': True
+            }
+        sensor_source = 'telemetry'
+        soil_moisture = reading['soil_moisture']
+        sensor_temperature = sensor_temperature or reading['temperature']
+        sensor_humidity = sensor_humidity or reading['humidity']
+    
+    users = get_user_repository()
     
     # Get user profile
-    user_ref = db.collection('users').document(user_id)
-    user_doc = user_ref.get()
+    user_profile = users.get(user_id, fields=DECISION_FIELDS)
     
-    if not user_doc.exists:
+    if user_profile is None:
         return {
             'success': False,
             'error': f'User {user_id} not found'
         }
     
-    user_profile = user_doc.to_dict()
+    # Get plant features
+    plant_features = None
+    for plant in user_profile.get('plants', []):
+        if plant['name'].lower() == plant_name.lower():
+            plant_features = plant['features']
+            break
+    
+    if not plant_features:
+        return {
+            'success': False,
+            'error': f'Plant {plant_name} not found in user profile'
+        }
+    
+    if sensor_source == 'request':
+        # Keep the reading so Pis that do not stream telemetry still get a drying trend
+        # (only once the user and plant are known: unknown ones must not create series)
+        get_timeseries_store().append(user_id, plant_name, [int(time.time())], [soil_moisture],
+                                      [float('nan') if sensor_temperature is None else sensor_temperature],
+                                      [float('nan') if sensor_humidity is None else sensor_humidity])
     
     # Check AI mode
     if not user_profile.get('ai_mode', True):
@@ -106,32 +157,22 @@ def get_irrigation_decision(user_id: str, plant_name: str, soil_moisture: float,
         if expected_end_dt and expected_end_dt > now_dt:
             # Watering in progress
             remaining_min = int((expected_end_dt - now_dt).total_seconds() / 60) + 1
+            next_check = schedule_next_check(user_id, plant_name, soil_moisture, 0,
+                                             watering_minutes=remaining_min)
             return {
                 'success': True,
                 'watering_in_progress': True,
                 'remaining_minutes': remaining_min,
+                'next_check_after': next_check['next_check_after'],
                 'message': f"Watering already in progress for '{watering_state.get('plant_name')}'."
             }
         else:
             # Expired - clear it
             try:
-                user_ref.update({'watering_state': firestore.DELETE_FIELD})
+                users.clear_watering_state(user_id)
             except Exception:
                 pass
     
-    # Get plant features
-    plant_features = None
-    for plant in user_profile.get('plants', []):
-        if plant['name'].lower() == plant_name.lower():
-            plant_features = plant['features']
-            break
-    
-    if not plant_features:
-        return {
-            'success': False,
-            'error': f'Plant {plant_name} not found in user profile'
-        }
-    
     # Get weather forecast
     location = user_profile.get('location', 'Tunis')
     weather_data = get_weather_forecast(location)
@@ -139,7 +180,8 @@ def get_irrigation_decision(user_id: str, plant_name: str, soil_moisture: float,
     if not weather_data['success']:
         return {
             'success': False,
-            'error': 'Failed to get weather forecast'
+            'error': 'Failed to get weather forecast',
+            'retryable': True
         }
     
     # Get last watering time
@@ -167,7 +209,9 @@ def get_irrigation_decision(user_id: str, plant_name: str, soil_moisture: float,
         'slope_degrees': user_profile['soil_properties']['slope_degrees'],
         'hour_of_day': now_dt.hour,
         'day_of_year': day_of_year,
-        'season': calculate_season(day_of_year)
+        'season': calculate_season(day_of_year),
+        # Forecast water demand (reference ET0) for the next 24 hours, for the LLM prompt
+        'et0_24h_mm': weather_data.get('et0_24h_mm')
     }
     
     # Get irrigation decision
@@ -207,14 +251,22 @@ def get_irrigation_decision(user_id: str, plant_name: str, soil_moisture: float,
             'duration_minutes': duration_minutes
         }
         
-        user_ref.update({
+        users.update(user_id, {
             'last_watering': start_time.isoformat(),
             'watering_state': new_watering_state
         })
     
-    # Log decision
-    log_ref = db.collection('irrigation_logs').document()
-    log_ref.set({
+    # When the Pi should ask again
+    next_check = schedule_next_check(
+        user_id, plant_name, soil_moisture,
+        plant_features.get('critical_moisture_threshold', 30),
+        weather_data,
+        watering_minutes=int(decision['final_decision'].get('duration_minutes', 0))
+        if decision['final_decision']['should_water'] else 0
+    )
+    
+    # Log decision (write-behind, off the request path)
+    enqueue_irrigation_log({
         'user_id': user_id,
         'plant_name': plant_name,
         'timestamp': datetime.now().isoformat(),
@@ -228,33 +280,135 @@ def get_irrigation_decision(user_id: str, plant_name: str, soil_moisture: float,
         'success': True,
         'decision': decision['final_decision'],
         'reasoning': decision['reasoning'],
+        'sensor_source': sensor_source,
+        'next_check_after': next_check['next_check_after'],
+        'next_check': next_check,
         'weather': {
             'current': weather_data['current'],
-            'total_rain_24h': sum(weather_data['hourly_precipitation_mm']),
-            'max_rain_probability': max(weather_data['hourly_rain_probability'])
+            'total_rain_24h': weather_data['total_rainfall_24h'],
+            'max_rain_probability': weather_data['max_rain_probability_24h'],
+            'et0_24h_mm': weather_data.get('et0_24h_mm'),
+            # True when WeatherAPI was down and a stored forecast was used
+            'degraded': weather_data.get('degraded', False),
+            **({'staleness': weather_data['staleness']} if weather_data.get('degraded') else {})
         }
     }
 
 
-def get_irrigation_history(user_id: str, limit: int = 50) -> Dict:
-    """Get irrigation history for a user"""
-    db = get_db()
+# History projection: public field name -> Firestore field path
+HISTORY_FIELD_PATHS = {
+    'log_id': None,  # Document ID, always available
+    'timestamp': 'timestamp',
+    'plant_name': 'plant_name',
+    'action': 'action',
+    'mode': 'mode',
+    'should_water': 'decision.should_water',
+    'duration_minutes': 'decision.duration_minutes',
+    'intensity_percent': 'decision.intensity_percent',
+    'decision': 'decision',
+    'sensor_data': 'sensor_data',
+    'reasoning': 'reasoning'
+}
+HISTORY_FIELD_DEFAULTS = {'action': 'decision'}
+MAX_HISTORY_PAGE_SIZE = 500
+
+
+def _get_field_path(data: Dict, path: str):
+    """Read a dotted Firestore field path from a log dict"""
+    value = data
+    for part in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _project_log(log_data: Dict, fields: List[str]) -> Dict:
+    """Flatten a log to just the requested public fields"""
+    projected = {}
+    for field in fields:
+        path = HISTORY_FIELD_PATHS[field]
+        value = log_data.get('log_id') if path is None else _get_field_path(log_data, path)
+        projected[field] = value if value is not None else HISTORY_FIELD_DEFAULTS.get(field)
+    return projected
+
+
+def _parse_cursor(cursor: Optional[str]):
+    """(timestamp, log_id) of a history cursor; log_id is None for a bare timestamp"""
+    if not cursor:
+        return None, None
+    timestamp, _, log_id = cursor.partition('|')
+    return timestamp, log_id or None
+
+
+def _after_cursor(log: Dict, before: str, before_id: Optional[str]) -> bool:
+    """True if the log belongs on a page after the cursor (newest first)"""
+    if before_id:
+        return (log.get('timestamp', ''), log.get('log_id') or '') < (before, before_id)
+    return log.get('timestamp', '') < before
+
+
+def get_irrigation_history(user_id: str, limit: int = 50,
+                           start_after: Optional[str] = None,
+                           fields: Optional[List[str]] = None) -> Dict:
+    """
+    Get one page of irrigation history for a user (newest first)
+    
+    Args:
+        user_id: User ID
+        limit: Page size (capped at MAX_HISTORY_PAGE_SIZE)
+        start_after: Cursor - "<timestamp>|<log_id>" of the last log of the
+                     previous page, so logs sharing its timestamp are not
+                     skipped (pages continue from live logs into archived logs)
+        fields: Optional projection, e.g. ['timestamp', 'action', 'should_water'].
+                Only these fields are read from Firestore and returned.
+        
+    Returns:
+        Logs plus next_cursor (None on the last page)
+    """
+    limit = max(1, min(int(limit), MAX_HISTORY_PAGE_SIZE))
+    
+    if fields:
+        unknown = [f for f in fields if f not in HISTORY_FIELD_PATHS]
+        if unknown:
+            return {
+                'success': False,
+                'error': f"Unknown history fields: {', '.join(unknown)}",
+                'invalid_fields': unknown
+            }
     
     try:
-        logs_ref = db.collection('irrigation_logs')\
-                     .where('user_id', '==', user_id)\
-                     .order_by('timestamp', direction=firestore.Query.DESCENDING)\
-                     .limit(limit)
+        # Snapshot queued logs first so nothing slips between queue and Firestore
+        pending = get_pending_logs(user_id)
+        before, before_id = _parse_cursor(start_after)
+        if before:
+            pending = [log for log in pending if _after_cursor(log, before, before_id)]
+        
+        # timestamp (and the document ID) are always read: they build the next cursor
+        paths = sorted({HISTORY_FIELD_PATHS[f] for f in fields if HISTORY_FIELD_PATHS[f]}) if fields else None
+        logs = get_log_repository().recent_for_user(user_id, limit, before=before, fields=paths,
+                                                    before_id=before_id)
+        
+        logs = merge_pending_logs(logs, pending, limit)
+        
+        # Live logs exhausted: continue seamlessly into the archives
+        if len(logs) < limit:
+            if logs:
+                before, before_id = logs[-1]['timestamp'], logs[-1]['log_id']
+            seen = {log.get('log_id') for log in logs}
+            logs += [log for log in read_archived_logs(user_id, before, limit - len(logs), before_id=before_id)
+                     if log.get('log_id') not in seen]
+        
+        next_cursor = f"{logs[-1]['timestamp']}|{logs[-1]['log_id']}" if len(logs) == limit else None
         
-        logs = []
-        for doc in logs_ref.stream():
-            log_data = doc.to_dict()
-            logs.append(log_data)
+        if fields:
+            logs = [_project_log(log, fields) for log in logs]
         
         return {
             'success': True,
             'count': len(logs),
-            'logs': logs
+            'logs': logs,
+            'next_cursor': next_cursor
         }
         
     except Exception as e:
@@ -0,0 +1,273 @@
+"""
+Migration Service
+Runs data migrations over a Firestore collection: paginated, batched,
+parallel and resumable
+
+A migration declares the collection it scans, the fields it reads and a
+transform returning the field-path updates for one document (None when the
+document is already migrated, so re-running is harmless). The runner:
+  - scans the collection in document ID order, one page at a time
+  - commits the updates in batches of up to 500 writes on a pool of workers
+  - checkpoints progress in _migrations/<name> after each page whose
+    updates (and all earlier pages') are committed, so an interrupted run
+    resumes where it stopped
+  - in dry-run mode writes nothing and returns a diff of what would change
+
+Migrations live in backend/migrations/ and run with `python migrate.py`.
+"""
+
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Handle imports for running from backend/ or parent directory
+try:
+    from utils.firebase_client import get_db
+except ImportError:
+    from backend.utils.firebase_client import get_db
+
+MIGRATIONS_COLLECTION = '_migrations'
+DOCUMENT_ID = '__name__'
+FIRESTORE_BATCH_LIMIT = 500
+DEFAULT_PAGE_SIZE = 500
+DEFAULT_WORKERS = 4
+
+_MISSING = object()
+
+
+class Migration(ABC):
+    """
+    A declarative migration
+
+    Subclasses set name, description, collection and fields, and implement
+    transform().
+    """
+
+    name = ''
+    description = ''
+    collection = ''
+    fields: Optional[List[str]] = None  # Field paths to read (None = whole document)
+
+    @abstractmethod
+    def transform(self, doc_id: str, data: Dict) -> Optional[Dict]:
+        """
+        Updates for one document
+
+        Args:
+            doc_id: Document ID
+            data: Document data (only `fields` if set)
+
+        Returns:
+            Field-path updates, or None if the document needs no change
+        """
+
+
+def _get_path(data: Dict, path: str):
+    value = data
+    for part in path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _diff(data: Dict, updates: Dict) -> Dict:
+    """{field_path: [old, new]} for a dry run (old is None when the field is missing)"""
+    changes = {}
+    for path, new in updates.items():
+        old = _get_path(data, path)
+        changes[path] = [None if old is _MISSING else old, new]
+    return changes
+
+
+def get_checkpoint(name: str) -> Optional[Dict]:
+    """Saved progress of a migration, or None if it never ran"""
+    doc = get_db().collection(MIGRATIONS_COLLECTION).document(name).get()
+    return doc.to_dict() if doc.exists else None
+
+
+def _save_checkpoint(name: str, state: Dict):
+    state['updated_at'] = datetime.now().isoformat()
+    get_db().collection(MIGRATIONS_COLLECTION).document(name).set(state)
+
+
+def run_migration(migration: Migration, dry_run: bool = False,
+                  page_size: int = DEFAULT_PAGE_SIZE, workers: int = DEFAULT_WORKERS,
+                  restart: bool = False, max_docs: Optional[int] = None,
+                  diff_limit: int = 20, verbose: bool = True) -> Dict:
+    """
+    Run (or resume) a migration
+
+    Args:
+        migration: Migration to run
+        dry_run: Only compute the changes; nothing (not even the checkpoint) is written
+        page_size: Documents read per query
+        workers: Batches committed in parallel
+        restart: Ignore the checkpoint and scan from the beginning
+        max_docs: Stop after scanning this many documents (resumable)
+        diff_limit: Documents included in the dry-run diff
+        verbose: Print progress
+
+    Returns:
+        Counts of scanned and updated documents, status and (dry run) diff
+    """
+    db = get_db()
+    collection = db.collection(migration.collection)
+
+    checkpoint = None if (dry_run or restart) else get_checkpoint(migration.name)
+    if checkpoint and checkpoint.get('status') == 'done':
+        return {
+            'success': True,
+            'migration': migration.name,
+            'status': 'done',
+            'message': f"Already done on {checkpoint.get('finished_at')} (use restart to run again)",
+            'scanned': checkpoint.get('scanned', 0),
+            'updated': checkpoint.get('updated', 0)
+        }
+
+    resume_after = checkpoint.get('cursor') if checkpoint else None
+    state = {
+        'name': migration.name,
+        'status': 'running',
+        'cursor': resume_after,
+        'scanned': checkpoint.get('scanned', 0) if checkpoint else 0,
+        'updated': checkpoint.get('updated', 0) if checkpoint else 0,
+        'started_at': (checkpoint or {}).get('started_at') or datetime.now().isoformat()
+    }
+    if not dry_run:
+        _save_checkpoint(migration.name, dict(state))
+    if verbose and resume_after:
+        print(f"   Resuming after {resume_after} ({state['scanned']} documents already scanned)")
+
+    # Pages are committed out of order; the checkpoint only moves past a
+    # page once it and every page before it are committed
+    lock = threading.Lock()
+    pages = []           # [cursor, scanned, updated, committed] per page, in scan order
+    checkpointed = 0     # pages[:checkpointed] are in the checkpoint
+
+    def commit_page(index: int, writes: List):
+        for i in range(0, len(writes), FIRESTORE_BATCH_LIMIT):
+            batch = db.batch()
+            for doc_id, updates in writes[i:i + FIRESTORE_BATCH_LIMIT]:
+                batch.update(collection.document(doc_id), updates)
+            batch.commit()
+        with lock:
+            pages[index][3] = True
+
+    def advance_checkpoint():
+        nonlocal checkpointed
+        with lock:
+            start = checkpointed
+            while checkpointed < len(pages) and pages[checkpointed][3]:
+                checkpointed += 1
+            done = pages[start:checkpointed]
+        if done:
+            state['cursor'] = done[-1][0]
+            state['scanned'] += sum(page[1] for page in done)
+            state['updated'] += sum(page[2] for page in done)
+            if not dry_run:
+                _save_checkpoint(migration.name, dict(state))
+
+    diff = []
+    to_update = 0
+    scanned_this_run = 0
+    cursor = resume_after
+    in_flight = set()
+    error = None
+    status = 'done'
+
+    pool = ThreadPoolExecutor(max_workers=max(1, workers))
+    try:
+        while max_docs is None or scanned_this_run < max_docs:
+            limit = page_size if max_docs is None else min(page_size, max_docs - scanned_this_run)
+            query = collection.order_by(DOCUMENT_ID)
+            if migration.fields is not None:
+                query = query.select(migration.fields)
+            if cursor:
+                query = query.start_after({DOCUMENT_ID: cursor})
+            docs = list(query.limit(limit).stream())
+            if not docs:
+                break
+
+            writes = []
+            for doc in docs:
+                data = doc.to_dict() or {}
+                updates = migration.transform(doc.id, data)
+                if updates:
+                    writes.append((doc.id, updates))
+                    if dry_run and len(diff) < diff_limit:
+                        diff.append({'id': doc.id, 'changes': _diff(data, updates)})
+            cursor = docs[-1].id
+            scanned_this_run += len(docs)
+            to_update += len(writes)
+
+            if not dry_run:
+                with lock:
+                    pages.append([cursor, len(docs), len(writes), not writes])
+                    index = len(pages) - 1
+                if writes:
+                    in_flight.add(pool.submit(commit_page, index, writes))
+                # Bounded: at most two batches queued per worker
+                while len(in_flight) >= 2 * max(1, workers):
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        future.result()
+                advance_checkpoint()
+
+            if verbose:
+                print(f"   Scanned {scanned_this_run} documents, {to_update} to update...")
+
+            if len(docs) < limit:
+                break
+        else:
+            status = 'paused'  # max_docs reached
+
+        for future in in_flight:
+            future.result()
+        in_flight = set()
+
+    except KeyboardInterrupt:
+        status = 'interrupted'
+    except Exception as e:
+        status = 'failed'
+        error = str(e)
+    finally:
+        # Let started batches finish so the checkpoint is exact
+        pool.shutdown(wait=True)
+        if not dry_run:
+            for future in in_flight:
+                if future.exception() and not error:
+                    status, error = 'failed', str(future.exception())
+            advance_checkpoint()
+            state['status'] = status
+            if status == 'done':
+                state['finished_at'] = datetime.now().isoformat()
+            if error:
+                state['error'] = error
+            _save_checkpoint(migration.name, dict(state))
+
+    if dry_run:
+        return {
+            'success': error is None,
+            'migration': migration.name,
+            'dry_run': True,
+            'status': status,
+            'scanned': scanned_this_run,
+            'would_update': to_update,
+            'diff': diff,
+            **({'error': error} if error else {})
+        }
+
+    return {
+        'success': status in ('done', 'paused'),
+        'migration': migration.name,
+        'dry_run': False,
+        'status': status,
+        'resumed_after': resume_after,
+        'scanned': state['scanned'],
+        'updated': state['updated'],
+        'cursor': state['cursor'],
+        **({'error': error} if error else {})
+    }
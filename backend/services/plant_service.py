@@ -10,9 +10,9 @@ from typing import Dict, Optional
 
 # Handle imports based on whether running from backend/ or parent directory
 try:
-    from utils.firebase_client import get_db
+    from utils.repositories import get_plant_repository
 except ImportError:
-    from backend.utils.firebase_client import get_db
+    from backend.utils.repositories import get_plant_repository
 
 # Load plant database
 _plant_database = None
@@ -40,7 +40,6 @@ def get_plant_features(plant_name: str, user_id: str = None, gemini_model=None)
         Dictionary with plant features
     """
     plant_name_lower = plant_name.lower().strip()
-    db = get_db()
     
     # 1. Check local database first
     plant_db = get_plant_database()
@@ -49,10 +48,10 @@ def get_plant_features(plant_name: str, user_id: str = None, gemini_model=None)
             return crop_data
     
     # 2. Check Firebase cache
-    plant_ref = db.collection('plant_database').document(plant_name_lower)
-    cached_plant = plant_ref.get()
-    if cached_plant.exists:
-        return cached_plant.to_dict()
+    plants = get_plant_repository()
+    cached_plant = plants.get(plant_name_lower)
+    if cached_plant is not None:
+        return cached_plant
     
     # 3. Generate with Gemini if available
     if gemini_model:
@@ -86,7 +85,7 @@ Base your answer on agricultural knowledge. Be realistic for Tunisia's Mediterra
             plant_data = json.loads(response_text)
             
             # Save to Firebase for future use
-            plant_ref.set(plant_data)
+            plants.save(plant_name_lower, plant_data)
             
             print(f"✅ Generated and cached features for {plant_name}")
             return plant_data
@@ -108,7 +107,6 @@ Base your answer on agricultural knowledge. Be realistic for Tunisia's Mediterra
 
 def list_all_plants() -> list:
     """Get all plants from local database and Firebase"""
-    db = get_db()
     plants = []
     
     # Local database
@@ -124,12 +122,10 @@ def list_all_plants() -> list:
     
     # Custom plants from Firebase
     try:
-        custom_plants_ref = db.collection('plant_database').stream()
-        for doc in custom_plants_ref:
-            plant_data = doc.to_dict()
+        for plant_id, plant_data in get_plant_repository().stream():
             plants.append({
-                'id': doc.id,
-                'name': plant_data.get('name', doc.id),
+                'id': plant_id,
+                'name': plant_data.get('name', plant_id),
                 'water_requirement_level': plant_data.get('water_requirement_level'),
                 'drought_tolerance': plant_data.get('drought_tolerance'),
                 'source': 'custom'
@@ -0,0 +1,304 @@
+"""
+Irrigation Rollup Service
+Per-user and per-day irrigation counters, maintained incrementally
+
+Every irrigation log committed by the log writer also increments two
+rollup documents in the same Firestore batch:
+  - irrigation_rollups/<user_id>_<YYYY-MM-DD>   (per user, per day)
+  - irrigation_rollups_daily/<YYYY-MM-DD>       (whole system, per day)
+
+Dashboards, /usage and /stats read these instead of scanning irrigation_logs.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from firebase_admin import firestore
+
+# Handle imports for running from backend/ or parent directory
+try:
+    from utils.firebase_client import get_db
+    from utils.log_writer import set_rollup_hook
+except ImportError:
+    from backend.utils.firebase_client import get_db
+    from backend.utils.log_writer import set_rollup_hook
+
+USER_ROLLUPS_COLLECTION = 'irrigation_rollups'
+DAILY_ROLLUPS_COLLECTION = 'irrigation_rollups_daily'
+
+COUNTER_FIELDS = [
+    'events',               # every log (decisions + manual actions)
+    'ai_decisions',         # AI decision requests
+    'waterings',            # logs that started watering
+    'ai_waterings',
+    'manual_waterings',
+    'manual_closes',
+    'total_minutes',        # sum of watering duration
+    'minutes_x_intensity'   # sum of duration * intensity_percent
+]
+
+# Manual valve opening has no intensity control: the valve is fully open
+MANUAL_INTENSITY_PERCENT = 100
+MAX_QUERY_DAYS = 366
+FIRESTORE_BATCH_LIMIT = 500
+
+
+def rollup_increments(log_data: Dict) -> Dict[str, int]:
+    """
+    Compute the counter increments contributed by one irrigation log
+
+    Returns:
+        Dictionary of non-zero counter increments
+    """
+    decision = log_data.get('decision') or {}
+    action = log_data.get('action')
+    is_manual = decision.get('mode') == 'manual' or (action or '').startswith('manual')
+
+    increments = {'events': 1}
+
+    if not is_manual:
+        increments['ai_decisions'] = 1
+    if action == 'manual_close':
+        increments['manual_closes'] = 1
+
+    if decision.get('should_water'):
+        minutes = int(decision.get('duration_minutes') or 0)
+        if is_manual:
+            intensity = MANUAL_INTENSITY_PERCENT
+        else:
+            intensity = int(decision.get('intensity_percent') or 0)
+
+        increments['waterings'] = 1
+        increments['manual_waterings' if is_manual else 'ai_waterings'] = 1
+        increments['total_minutes'] = minutes
+        increments['minutes_x_intensity'] = minutes * intensity
+
+    return increments
+
+
+def _rollup_date(log_data: Dict) -> Optional[str]:
+    """Day (YYYY-MM-DD) a log is counted in, from its ISO timestamp"""
+    timestamp = log_data.get('timestamp')
+    return timestamp[:10] if timestamp else None
+
+
+def rollup_doc_paths(log_data: Dict) -> List[str]:
+    """Rollup documents one log increments (none if it has no user or timestamp)"""
+    day = _rollup_date(log_data)
+    user_id = log_data.get('user_id')
+    if not day or not user_id:
+        return []
+    return [f'{USER_ROLLUPS_COLLECTION}/{user_id}_{day}', f'{DAILY_ROLLUPS_COLLECTION}/{day}']
+
+
+def _accumulate(logs: List[Dict]):
+    """Sum increments per (user, day) and per day"""
+    per_user = defaultdict(lambda: defaultdict(int))
+    per_day = defaultdict(lambda: defaultdict(int))
+
+    for log_data in logs:
+        day = _rollup_date(log_data)
+        user_id = log_data.get('user_id')
+        if not day or not user_id:
+            continue
+        for field, value in rollup_increments(log_data).items():
+            per_user[(user_id, day)][field] += value
+            per_day[day][field] += value
+
+    return per_user, per_day
+
+
+def add_rollup_writes(db, batch, logs: List[Dict]) -> int:
+    """
+    Add rollup increments for a group of logs to a write batch
+
+    Increments are merged per document first, so a batch of N logs adds at
+    most N + (distinct days) writes.
+
+    Returns:
+        Number of writes added to the batch
+    """
+    per_user, per_day = _accumulate(logs)
+    now = datetime.now().isoformat()
+
+    for (user_id, day), counters in per_user.items():
+        update = {field: firestore.Increment(value) for field, value in counters.items()}
+        update.update({'user_id': user_id, 'date': day, 'updated_at': now})
+        batch.set(db.collection(USER_ROLLUPS_COLLECTION).document(f'{user_id}_{day}'), update, merge=True)
+
+    for day, counters in per_day.items():
+        update = {field: firestore.Increment(value) for field, value in counters.items()}
+        update.update({'date': day, 'updated_at': now})
+        batch.set(db.collection(DAILY_ROLLUPS_COLLECTION).document(day), update, merge=True)
+
+    return len(per_user) + len(per_day)
+
+
+# The log writer commits every batch of logs with their increments
+set_rollup_hook(rollup_doc_paths, add_rollup_writes)
+
+
+def _date_range(start_date: date, end_date: date) -> List[str]:
+    days = (end_date - start_date).days + 1
+    return [(start_date + timedelta(days=i)).isoformat() for i in range(days)]
+
+
+def summarize_rollups(rollups: List[Dict]) -> Dict:
+    """Total a list of daily rollup documents"""
+    totals = {field: sum(r.get(field, 0) for r in rollups) for field in COUNTER_FIELDS}
+    # Equivalent minutes at 100% valve opening - multiply by flow rate for litres
+    totals['full_flow_minutes'] = round(totals['minutes_x_intensity'] / 100, 1)
+    return totals
+
+
+def _read_rollups(collection: str, doc_ids: List[str], dates: List[str]) -> List[Dict]:
+    """Read rollup documents by ID (no query, no index); missing days are zero"""
+    db = get_db()
+    refs = [db.collection(collection).document(doc_id) for doc_id in doc_ids]
+    found = {snap.id: snap.to_dict() for snap in db.get_all(refs) if snap.exists}
+
+    rollups = []
+    for doc_id, day in zip(doc_ids, dates):
+        data = found.get(doc_id) or {}
+        rollups.append({'date': day, **{field: data.get(field, 0) for field in COUNTER_FIELDS}})
+    return rollups
+
+
+def _resolve_range(days: int, end_date: Optional[date]):
+    days = max(1, min(int(days), MAX_QUERY_DAYS))
+    end_date = end_date or date.today()
+    return _date_range(end_date - timedelta(days=days - 1), end_date)
+
+
+def get_user_rollups(user_id: str, days: int = 30, end_date: Optional[date] = None) -> Dict:
+    """
+    Get a user's daily irrigation counters
+
+    Args:
+        user_id: User ID
+        days: Number of days ending at end_date (max 366)
+        end_date: Last day included (default: today)
+
+    Returns:
+        Daily rollups (oldest first) and totals
+    """
+    dates = _resolve_range(days, end_date)
+    rollups = _read_rollups(USER_ROLLUPS_COLLECTION, [f'{user_id}_{d}' for d in dates], dates)
+    return {
+        'success': True,
+        'user_id': user_id,
+        'days': rollups,
+        'totals': summarize_rollups(rollups)
+    }
+
+
+def get_daily_rollups(days: int = 30, end_date: Optional[date] = None) -> Dict:
+    """Get system-wide daily irrigation counters (all users)"""
+    dates = _resolve_range(days, end_date)
+    rollups = _read_rollups(DAILY_ROLLUPS_COLLECTION, dates, dates)
+    return {
+        'success': True,
+        'days': rollups,
+        'totals': summarize_rollups(rollups)
+    }
+
+
+def backfill_rollups(page_size: int = 500, verbose: bool = True) -> Dict:
+    """
+    Rebuild every rollup document from irrigation_logs and the log archives
+
+    Scans the logs in pages, then every archived log (Firestore chunks and
+    Parquet files), recomputes the counters in memory and overwrites the
+    rollup documents. Rollup documents no recomputed day covers (their logs
+    were deleted) are deleted. Run it while no decisions are being logged:
+    increments committed during the scan would be overwritten.
+
+    Returns:
+        Counts of logs scanned and rollup documents written and deleted
+    """
+    try:
+        from services.archive_service import iter_archived_logs
+    except ImportError:
+        from backend.services.archive_service import iter_archived_logs
+
+    db = get_db()
+    per_user = defaultdict(lambda: defaultdict(int))
+    per_day = defaultdict(lambda: defaultdict(int))
+    scanned = 0
+    last_doc = None
+
+    def add(logs):
+        page_user, page_day = _accumulate(logs)
+        for key, counters in page_user.items():
+            for field, value in counters.items():
+                per_user[key][field] += value
+        for key, counters in page_day.items():
+            for field, value in counters.items():
+                per_day[key][field] += value
+
+    while True:
+        query = db.collection('irrigation_logs').order_by('__name__').limit(page_size)
+        if last_doc is not None:
+            query = query.start_after(last_doc)
+
+        docs = list(query.stream())
+        if not docs:
+            break
+
+        add([doc.to_dict() for doc in docs])
+        scanned += len(docs)
+        last_doc = docs[-1]
+        if verbose:
+            print(f"   Scanned {scanned} logs...")
+
+    # Archived logs stay counted (archive_old_logs may stop mid-day with max_logs)
+    archived = 0
+    page = []
+    for user_id, log in iter_archived_logs():
+        page.append(dict(log, user_id=user_id))
+        if len(page) >= page_size:
+            add(page)
+            archived += len(page)
+            page = []
+            if verbose:
+                print(f"   Scanned {archived} archived logs...")
+    add(page)
+    archived += len(page)
+
+    now = datetime.now().isoformat()
+    writes = []
+    for (user_id, day), counters in per_user.items():
+        data = {field: counters.get(field, 0) for field in COUNTER_FIELDS}
+        data.update({'user_id': user_id, 'date': day, 'updated_at': now})
+        writes.append((db.collection(USER_ROLLUPS_COLLECTION).document(f'{user_id}_{day}'), data))
+    for day, counters in per_day.items():
+        data = {field: counters.get(field, 0) for field in COUNTER_FIELDS}
+        data.update({'date': day, 'updated_at': now})
+        writes.append((db.collection(DAILY_ROLLUPS_COLLECTION).document(day), data))
+
+    # Every log was scanned: any other rollup document counts logs that no longer exist
+    written = {ref.path for ref, _ in writes}
+    for collection in (USER_ROLLUPS_COLLECTION, DAILY_ROLLUPS_COLLECTION):
+        for doc in db.collection(collection).select([]).stream():
+            if doc.reference.path not in written:
+                writes.append((doc.reference, None))
+    stale = len(writes) - len(per_user) - len(per_day)
+
+    for i in range(0, len(writes), FIRESTORE_BATCH_LIMIT):
+        batch = db.batch()
+        for ref, data in writes[i:i + FIRESTORE_BATCH_LIMIT]:
+            if data is None:
+                batch.delete(ref)
+            else:
+                batch.set(ref, data)
+        batch.commit()
+
+    return {
+        'success': True,
+        'logs_scanned': scanned,
+        'archived_logs_scanned': archived,
+        'user_day_rollups': len(per_user),
+        'daily_rollups': len(per_day),
+        'stale_rollups_deleted': stale
+    }
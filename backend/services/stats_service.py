@@ -0,0 +1,146 @@
+"""
+User Stats Service
+System-wide user counters for /api/admin/stats, maintained incrementally
+
+Every user write that changes a counted field (create/delete, plants,
+ai_mode) also increments one randomly chosen shard in the same Firestore
+transaction:
+  - stats_counters/users_<n>   n = 0 .. USER_STATS_SHARDS-1
+
+Sharding spreads concurrent increments over several documents (one
+document sustains about one write per second). Reading the stats is one
+get_all of the shards, whatever the number of users. reconcile_user_stats()
+recounts from the users collection to correct drift.
+"""
+
+import os
+import random
+from datetime import datetime
+from typing import Dict, Optional
+
+from firebase_admin import firestore
+
+# Handle imports for running from backend/ or parent directory
+try:
+    from utils.firebase_client import get_db
+except ImportError:
+    from backend.utils.firebase_client import get_db
+
+STATS_COLLECTION = 'stats_counters'
+USER_STATS_SHARDS = int(os.environ.get('USER_STATS_SHARDS', '10'))
+
+USER_STAT_FIELDS = [
+    'total_users',
+    'active_ai_users',   # ai_mode on (users without the field count as on)
+    'total_plants'
+]
+
+# Top-level user fields the counters depend on
+COUNTED_USER_FIELDS = ['ai_mode', 'plants']
+
+FIRESTORE_BATCH_LIMIT = 500
+
+
+def user_contribution(user_data: Optional[Dict]) -> Dict[str, int]:
+    """Counter values one user document accounts for (zero if it does not exist)"""
+    if user_data is None:
+        return {field: 0 for field in USER_STAT_FIELDS}
+    return {
+        'total_users': 1,
+        'active_ai_users': 1 if user_data.get('ai_mode', True) else 0,
+        'total_plants': len(user_data.get('plants') or [])
+    }
+
+
+def user_stats_delta(before: Optional[Dict], after: Optional[Dict]) -> Dict[str, int]:
+    """
+    Counter changes for a user going from `before` to `after`
+
+    Args:
+        before: User data before the write (None if it did not exist)
+        after: User data after the write (None if deleted)
+
+    Returns:
+        Dictionary of non-zero counter increments
+    """
+    old, new = user_contribution(before), user_contribution(after)
+    return {field: new[field] - old[field] for field in USER_STAT_FIELDS if new[field] != old[field]}
+
+
+def _shard_ref(db, shard: int):
+    return db.collection(STATS_COLLECTION).document(f'users_{shard}')
+
+
+def add_stats_increment(db, writer, delta: Dict[str, int]) -> int:
+    """
+    Add counter increments to a transaction or write batch
+
+    Returns:
+        Number of writes added (0 or 1)
+    """
+    if not delta:
+        return 0
+    update = {field: firestore.Increment(value) for field, value in delta.items()}
+    update['updated_at'] = datetime.now().isoformat()
+    writer.set(_shard_ref(db, random.randrange(USER_STATS_SHARDS)), update, merge=True)
+    return 1
+
+
+def get_user_stats() -> Dict[str, int]:
+    """Sum the counter shards (USER_STATS_SHARDS reads, independent of user count)"""
+    db = get_db()
+    totals = {field: 0 for field in USER_STAT_FIELDS}
+    for snap in db.get_all([_shard_ref(db, shard) for shard in range(USER_STATS_SHARDS)]):
+        if snap.exists:
+            data = snap.to_dict()
+            for field in USER_STAT_FIELDS:
+                totals[field] += data.get(field, 0)
+    return totals
+
+
+def reconcile_user_stats(page_size: int = 500, verbose: bool = True) -> Dict:
+    """
+    Recount the user counters from the users collection
+
+    Scans users in pages (ai_mode and plants only), then adds the drift
+    (recounted totals minus the counters read before the scan) to shard 0
+    as one Increment per counter. Increments committed by user writes
+    during the scan are kept; a write racing the scan can leave the
+    counters off by that write's own change, which the next run corrects.
+
+    Returns:
+        Recounted totals, the counters they replaced and the drift
+    """
+    # Imported here: repositories writes through this module
+    try:
+        from utils.repositories import get_user_repository
+    except ImportError:
+        from backend.utils.repositories import get_user_repository
+
+    db = get_db()
+    before = get_user_stats()
+    totals = {field: 0 for field in USER_STAT_FIELDS}
+    scanned = 0
+
+    for page in get_user_repository().iter_pages(page_size, fields=COUNTED_USER_FIELDS):
+        for _, user_data in page:
+            for field, value in user_contribution(user_data).items():
+                totals[field] += value
+        scanned += len(page)
+        if verbose:
+            print(f"   Scanned {scanned} users...")
+
+    correction = {field: totals[field] - before[field] for field in USER_STAT_FIELDS
+                  if totals[field] != before[field]}
+    now = datetime.now().isoformat()
+    update = {field: firestore.Increment(value) for field, value in correction.items()}
+    update.update({'updated_at': now, 'reconciled_at': now})
+    _shard_ref(db, 0).set(update, merge=True)
+
+    return {
+        'success': True,
+        'users_scanned': scanned,
+        'stats': totals,
+        'previous': before,
+        'drift': {field: before[field] - totals[field] for field in USER_STAT_FIELDS}
+    }
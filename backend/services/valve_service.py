@@ -8,10 +8,17 @@ from typing import Dict
 
 # Handle imports for running from backend/ or parent directory
 try:
-    from utils.firebase_client import get_db
+    from utils.log_writer import enqueue_irrigation_log
+    from utils.repositories import get_user_repository
+    from services import rollup_service  # noqa: F401 (registers the log writer's rollup hook)
 except ImportError:
-    from backend.utils.firebase_client import get_db
-from firebase_admin import firestore
+    from backend.utils.log_writer import enqueue_irrigation_log
+    from backend.utils.repositories import get_user_repository
+    from backend.services import rollup_service  # noqa: F401
+
+# Fields each read needs (profiles embed every plant's features, so never read them all)
+OPEN_VALVE_FIELDS = ['watering_state']
+VALVE_STATUS_FIELDS = ['watering_state', 'ai_mode', 'last_watering']
 
 
 def open_valve_manual(user_id: str, plant_name: str, duration_minutes: int) -> Dict:
@@ -26,19 +33,17 @@ def open_valve_manual(user_id: str, plant_name: str, duration_minutes: int) -> D
     Returns:
         Status and watering_state
     """
-    db = get_db()
-    user_ref = db.collection('users').document(user_id)
+    users = get_user_repository()
     
     # Check if user exists
-    user_doc = user_ref.get()
-    if not user_doc.exists:
+    user_data = users.get(user_id, fields=OPEN_VALVE_FIELDS)
+    if user_data is None:
         return {
             'success': False,
             'error': f'User {user_id} not found'
         }
     
     # Check if already watering
-    user_data = user_doc.to_dict()
     watering_state = user_data.get('watering_state', {})
     
     if watering_state.get('is_watering'):
@@ -67,14 +72,13 @@ def open_valve_manual(user_id: str, plant_name: str, duration_minutes: int) -> D
         'duration_minutes': duration_minutes
     }
     
-    user_ref.update({
+    users.update(user_id, {
         'last_watering': start_time.isoformat(),
         'watering_state': new_watering_state
     })
     
     # Log the manual action
-    log_ref = db.collection('irrigation_logs').document()
-    log_ref.set({
+    enqueue_irrigation_log({
         'user_id': user_id,
         'plant_name': plant_name,
         'timestamp': start_time.isoformat(),
@@ -105,23 +109,20 @@ def close_valve_manual(user_id: str) -> Dict:
     Returns:
         Status
     """
-    db = get_db()
-    user_ref = db.collection('users').document(user_id)
+    users = get_user_repository()
     
     # Check if user exists
-    user_doc = user_ref.get()
-    if not user_doc.exists:
+    if not users.exists(user_id):
         return {
             'success': False,
             'error': f'User {user_id} not found'
         }
     
     # Clear watering state
-    user_ref.update({'watering_state': firestore.DELETE_FIELD})
+    users.clear_watering_state(user_id)
     
     # Log the manual action
-    log_ref = db.collection('irrigation_logs').document()
-    log_ref.set({
+    enqueue_irrigation_log({
         'user_id': user_id,
         'timestamp': datetime.now().isoformat(),
         'action': 'manual_close',
@@ -149,18 +150,16 @@ def set_ai_mode(user_id: str, ai_mode: bool) -> Dict:
     Returns:
         Status
     """
-    db = get_db()
-    user_ref = db.collection('users').document(user_id)
+    users = get_user_repository()
     
     # Check if user exists
-    user_doc = user_ref.get()
-    if not user_doc.exists:
+    if not users.exists(user_id):
         return {
             'success': False,
             'error': f'User {user_id} not found'
         }
     
-    user_ref.update({
+    users.update(user_id, {
         'ai_mode': ai_mode,
         'ai_mode_updated_at': datetime.now().isoformat()
     })
@@ -181,17 +180,23 @@ def get_valve_status(user_id: str) -> Dict:
     Returns:
         Valve state, AI mode, remaining time if watering
     """
-    db = get_db()
-    user_ref = db.collection('users').document(user_id)
-    user_doc = user_ref.get()
+    user_data = get_user_repository().get(user_id, fields=VALVE_STATUS_FIELDS)
     
-    if not user_doc.exists:
+    if user_data is None:
         return {
             'success': False,
             'error': f'User {user_id} not found'
         }
     
-    user_data = user_doc.to_dict()
+    return valve_status_from_profile(user_id, user_data)
+
+
+def valve_status_from_profile(user_id: str, user_data: Dict) -> Dict:
+    """
+    Valve status from an already-read profile (needs VALVE_STATUS_FIELDS)
+    
+    Clears an expired watering_state like get_valve_status does.
+    """
     watering_state = user_data.get('watering_state', {})
     ai_mode = user_data.get('ai_mode', True)
     
@@ -208,7 +213,7 @@ def get_valve_status(user_id: str) -> Dict:
                 remaining_minutes = int((expected_end_dt - datetime.now()).total_seconds() / 60) + 1
             else:
                 # Expired - clear it
-                user_ref.update({'watering_state': firestore.DELETE_FIELD})
+                get_user_repository().clear_watering_state(user_id)
         except Exception:
             pass
     
@@ -11,9 +11,13 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
 # Handle imports for running from backend/ or parent directory
 try:
-    from utils.forecast import get_weather_forecast as _get_forecast
+    from utils.repositories import get_user_repository
+    from utils.forecast import (get_weather_forecast as _get_forecast, get_forecast_cache,
+                                get_http_stats, get_quota_stats, prefetch_forecasts, PREFETCH_WORKERS)
 except ImportError:
-    from backend.utils.forecast import get_weather_forecast as _get_forecast
+    from backend.utils.repositories import get_user_repository
+    from backend.utils.forecast import (get_weather_forecast as _get_forecast, get_forecast_cache,
+                                        get_http_stats, get_quota_stats, prefetch_forecasts, PREFETCH_WORKERS)
 
 
 def get_weather_forecast(location: str = "Tunis"):
@@ -42,5 +46,42 @@ def get_weather_summary(location: str = "Tunis"):
         'humidity': weather['current']['humidity'],
         'condition': weather['current']['condition'],
         'total_rain_24h': weather['total_rainfall_24h'],
-        'max_rain_probability': max(weather['hourly_rain_probability']) if weather['hourly_rain_probability'] else 0
+        'max_rain_probability': weather['max_rain_probability_24h'],
+        'et0_24h_mm': weather.get('et0_24h_mm'),
+        'degraded': weather.get('degraded', False),
+        **({'staleness': weather['staleness']} if weather.get('degraded') else {})
     }
+
+
+def get_weather_cache_stats():
+    """Forecast cache hit rate, fetch counts and HTTP client metrics"""
+    return {
+        'success': True,
+        'cache': get_forecast_cache().get_stats(),
+        'http': get_http_stats(),
+        'quota': get_quota_stats()
+    }
+
+
+def prefetch_user_forecasts(max_workers: int = PREFETCH_WORKERS):
+    """
+    Warm forecasts for every distinct user location before a decision cycle
+    
+    Args:
+        max_workers: Concurrent WeatherAPI calls
+        
+    Returns:
+        Prefetch counts, elapsed time and per-location failures
+    """
+    try:
+        users = get_user_repository().stream(fields=['location'])
+        locations = {user.get('location') for _, user in users}
+    except Exception as e:
+        return {'success': False, 'error': f'Could not list user locations: {e}'}
+    
+    locations.discard(None)
+    result = prefetch_forecasts(locations, max_workers=max_workers)
+    result['user_locations'] = len(locations)
+    print(f"🌦️  Prefetched forecasts: {result['fetched']} fetched, {result['cached']} cached, "
+          f"{result['failed']} failed in {result['elapsed_seconds']}s")
+    return result
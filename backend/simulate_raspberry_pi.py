@@ -20,10 +20,16 @@ import requests
 import json
 import time
 import random
+import uuid
 from datetime import datetime
 
 # Backend server configuration
 BACKEND_URL = "http://localhost:5000"
+MAX_DECISION_ATTEMPTS = 3
+# Used when the backend gives no next_check_after (e.g. decision failed)
+DEFAULT_CHECK_INTERVAL_SECONDS = 30 * 60
+# Continuous monitoring demo: 1 real second per simulated minute
+SIMULATED_SECONDS_PER_MINUTE = 1
 
 # Simulated sensor data
 class RaspberryPiSensor:
@@ -55,6 +61,7 @@ class RaspberryPiSensor:
         try:
             response = requests.get(
                 f"{BACKEND_URL}/api/farmer/{self.user_id}/history",
+                params={'limit': 1, 'fields': 'timestamp'},
                 timeout=10
             )
             
@@ -64,7 +71,7 @@ class RaspberryPiSensor:
                 if is_new:
                     print(f"   ⚠️  NEW USER - No watering history found")
                 else:
-                    print(f"   ✓ Existing user - {history.get('count')} past waterings")
+                    print(f"   ✓ Existing user - watering history found")
                 return is_new
             return True  # Assume new if can't check
             
@@ -143,14 +150,28 @@ class RaspberryPiSensor:
         print(f"   URL: {BACKEND_URL}/api/farmer/{self.user_id}/decision")
         print(f"   Data: {json.dumps(payload, indent=6)}")
         
+        # One key per cycle: a retry after a timeout replays the same decision
+        # instead of running the AI (and logging) a second time
+        headers = {'Idempotency-Key': str(uuid.uuid4())}
+        
         try:
-            response = requests.post(
-                f"{BACKEND_URL}/api/farmer/{self.user_id}/decision",
-                json=payload,
-                timeout=30  # AI decision can take time
-            )
+            for attempt in range(1, MAX_DECISION_ATTEMPTS + 1):
+                try:
+                    response = requests.post(
+                        f"{BACKEND_URL}/api/farmer/{self.user_id}/decision",
+                        json=payload,
+                        headers=headers,
+                        timeout=30  # AI decision can take time
+                    )
+                    break
+                except requests.exceptions.Timeout:
+                    if attempt == MAX_DECISION_ATTEMPTS:
+                        raise
+                    print(f"   ⏱️  Timeout - retrying with the same Idempotency-Key ({attempt}/{MAX_DECISION_ATTEMPTS})")
             
             print(f"\n📥 Backend Response:")
+            if response.headers.get('Idempotent-Replayed'):
+                print(f"   ♻️  Replayed stored decision")
             print(f"   Status Code: {response.status_code}")
             
             if response.status_code == 200:
@@ -188,10 +209,12 @@ class RaspberryPiSensor:
         
         print(f"\n   ✅ Watering complete!")
     
-    def run_cycle(self):
+    def run_cycle(self) -> int:
         """
         Run one complete irrigation decision cycle
-        This simulates what the Pi does periodically (e.g., every 30 minutes)
+        
+        Returns:
+            Seconds to wait before the next cycle (the backend's next_check_after)
         """
         print("\n" + "="*70)
         print("🌱 IRRIGATION CYCLE STARTED")
@@ -206,14 +229,16 @@ class RaspberryPiSensor:
         
         if not decision.get('success'):
             print("\n❌ Decision failed - no action taken")
-            return
+            return DEFAULT_CHECK_INTERVAL_SECONDS
+        
+        next_check_after = decision.get('next_check_after', DEFAULT_CHECK_INTERVAL_SECONDS)
         
         # Step 3: Check if watering in progress
         if decision.get('watering_in_progress'):
             print(f"\n⏳ WATERING ALREADY IN PROGRESS")
             print(f"   Remaining: {decision.get('remaining_minutes')} minutes")
             print(f"   Message: {decision.get('message')}")
-            return
+            return next_check_after
         
         # Step 4: Process AI decision
         final_decision = decision.get('decision', {})
@@ -250,9 +275,15 @@ class RaspberryPiSensor:
             print(f"   Expected rain (24h): {weather.get('total_rain_24h', 0):.1f}mm")
             print(f"   Max rain probability: {weather.get('max_rain_probability', 0):.0f}%")
         
+        next_check = decision.get('next_check', {})
+        print(f"\n⏰ Next check in {next_check_after // 60} minutes")
+        if next_check.get('reason'):
+            print(f"   Reason: {next_check['reason']}")
+        
         print("\n" + "="*70)
         print("✅ IRRIGATION CYCLE COMPLETE")
         print("="*70)
+        return next_check_after
 
 
 def test_new_user_scenario():
@@ -304,14 +335,14 @@ def test_existing_user_scenario():
 def test_continuous_monitoring():
     """
     Test Scenario 3: CONTINUOUS MONITORING
-    - Simulate Pi checking every 30 minutes
+    - Pi waits the backend's next_check_after between cycles
     - Shows how system handles repeated cycles
     """
     print("\n")
     print("="*70)
     print("TEST SCENARIO 3: CONTINUOUS MONITORING (3 CYCLES)")
     print("="*70)
-    print("\nSimulating: Pi checking soil every 30 minutes")
+    print("\nSimulating: Pi checking soil when the backend asks it to")
     
     pi = RaspberryPiSensor(
         user_id="mabrouka_zaghouan",
@@ -324,11 +355,12 @@ def test_continuous_monitoring():
         print(f"CYCLE {cycle_num}/{num_cycles}")
         print(f"{'='*70}")
         
-        pi.run_cycle()
+        next_check_after = pi.run_cycle()
         
         if cycle_num < num_cycles:
-            print(f"\n⏰ Waiting 30 seconds (simulating 30 minutes)...")
-            time.sleep(30)  # In real scenario: time.sleep(30 * 60)
+            minutes = next_check_after // 60
+            print(f"\n⏰ Waiting {minutes} seconds (simulating {minutes} minutes)...")
+            time.sleep(minutes * SIMULATED_SECONDS_PER_MINUTE)  # In real scenario: time.sleep(next_check_after)
 
 
 def test_backend_health():
@@ -0,0 +1,334 @@
+"""
+Regression tests for the Firestore data paths
+Runs against the in-memory Firestore: no credentials or network needed
+
+Covers the log writer's spool recovery, rollup increments and backfill,
+log archiving and read-back, the user stats counters, migration
+checkpoints and the profile cache listeners.
+
+Run from backend/ directory:
+  python test_firestore_regressions.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.firebase_client import get_db, set_db
+from utils.memory_firestore import MemoryFirestore
+from utils.log_writer import IrrigationLogWriter, _write_logs
+from utils.profile_cache import UserProfileCache
+from utils.repositories import USERS_COLLECTION, get_user_repository
+from services import archive_service, rollup_service
+from services.migration_service import Migration, get_checkpoint, run_migration
+from services.stats_service import STATS_COLLECTION, get_user_stats, reconcile_user_stats
+
+
+def _decision_log(user_id, timestamp, minutes=10, intensity=50):
+    return {
+        'user_id': user_id,
+        'plant_name': 'tomato',
+        'timestamp': timestamp,
+        'action': 'ai_decision',
+        'decision': {'should_water': True, 'duration_minutes': minutes, 'intensity_percent': intensity}
+    }
+
+
+def _doc(collection, doc_id):
+    snap = get_db().collection(collection).document(doc_id).get()
+    return snap.to_dict() if snap.exists else None
+
+
+# ----------------------------------------------------------------------
+# Log writer (spool recovery)
+# ----------------------------------------------------------------------
+
+def test_spool_replay_counts_rollups_once():
+    """A batch committed before the crash but never acked is not counted twice"""
+    db = MemoryFirestore()
+    set_db(db)
+    today = date.today().isoformat()
+    committed = ('log_committed_0000000', _decision_log('u1', f'{today}T08:00:00'))
+    unsent = ('log_unsent_000000000', _decision_log('u1', f'{today}T09:00:00'))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        spool_path = os.path.join(tmp, 'spool.jsonl')
+        with open(spool_path, 'w', encoding='utf-8') as f:
+            for log_id, data in (committed, unsent):
+                f.write(json.dumps({'id': log_id, 'data': data}) + '\n')
+        # The crash: the first log's batch committed, its ack never reached the spool
+        _write_logs([committed])
+
+        writer = IrrigationLogWriter(spool_path=spool_path, flush_interval=0.05)
+        assert writer.get_stats()['recovered_from_spool'] == 2
+        assert writer.flush(timeout=5.0), 'spool did not drain'
+        writer.stop()
+        stats = writer.get_stats()
+
+    assert stats['rejected_logs'] == 0 and stats['flush_failures'] == 0, stats
+    assert _doc('irrigation_logs', committed[0]) and _doc('irrigation_logs', unsent[0])
+    user_day = _doc(rollup_service.USER_ROLLUPS_COLLECTION, f'u1_{today}') or {}
+    assert user_day.get('events') == 2, f"user rollup counted {user_day.get('events')} events"
+    assert user_day.get('total_minutes') == 20
+    assert (_doc(rollup_service.DAILY_ROLLUPS_COLLECTION, today) or {}).get('events') == 2
+
+
+# ----------------------------------------------------------------------
+# Rollups
+# ----------------------------------------------------------------------
+
+def test_rollup_increments_match_logs():
+    """Each committed log increments its user-day and daily rollups"""
+    set_db(MemoryFirestore())
+    day = date(2026, 3, 1)
+    _write_logs([
+        ('a1', _decision_log('u1', '2026-03-01T08:00:00', minutes=10, intensity=50)),
+        ('a2', _decision_log('u1', '2026-03-01T18:00:00', minutes=20, intensity=100)),
+        ('a3', {'user_id': 'u1', 'timestamp': '2026-03-01T19:00:00', 'action': 'manual_close',
+                'decision': {'mode': 'manual'}}),
+        ('b1', _decision_log('u2', '2026-03-01T09:00:00', minutes=5, intensity=40)),
+    ])
+
+    totals = rollup_service.get_user_rollups('u1', days=1, end_date=day)['totals']
+    assert totals['events'] == 3 and totals['ai_decisions'] == 2 and totals['manual_closes'] == 1
+    assert totals['waterings'] == 2 and totals['total_minutes'] == 30
+    assert totals['minutes_x_intensity'] == 10 * 50 + 20 * 100
+
+    daily = rollup_service.get_daily_rollups(days=1, end_date=day)['totals']
+    assert daily['events'] == 4 and daily['total_minutes'] == 35
+
+
+def test_backfill_rebuilds_and_deletes_stale_rollups():
+    """backfill_rollups recomputes drifted counters and deletes days with no logs"""
+    db = MemoryFirestore()
+    set_db(db)
+    _write_logs([
+        ('a1', _decision_log('u1', '2026-03-01T08:00:00')),
+        ('a2', _decision_log('u1', '2026-03-02T08:00:00')),
+    ])
+    expected = _doc(rollup_service.USER_ROLLUPS_COLLECTION, 'u1_2026-03-01') or {}
+
+    # Drift: a counter off by one, and a day whose logs were deleted
+    db.collection(rollup_service.USER_ROLLUPS_COLLECTION).document('u1_2026-03-01').update({'events': 7})
+    db.collection('irrigation_logs').document('a2').delete()
+
+    result = rollup_service.backfill_rollups(page_size=1, verbose=False)
+    assert result['logs_scanned'] == 1 and result['stale_rollups_deleted'] == 2, result
+
+    rebuilt = _doc(rollup_service.USER_ROLLUPS_COLLECTION, 'u1_2026-03-01') or {}
+    for field in rollup_service.COUNTER_FIELDS:
+        assert rebuilt.get(field, 0) == expected.get(field, 0), f'{field}: {rebuilt.get(field)}'
+    assert _doc(rollup_service.USER_ROLLUPS_COLLECTION, 'u1_2026-03-02') is None
+    assert _doc(rollup_service.DAILY_ROLLUPS_COLLECTION, '2026-03-02') is None
+
+
+# ----------------------------------------------------------------------
+# Archives
+# ----------------------------------------------------------------------
+
+def test_archive_and_read_back():
+    """Archived logs leave irrigation_logs and read back in history order"""
+    db = MemoryFirestore()
+    set_db(db)
+    old_day = (date.today() - timedelta(days=archive_service.RETENTION_DAYS + 30)).isoformat()
+    recent = datetime.now().isoformat()
+    logs = db.collection('irrigation_logs')
+    # Two logs share a timestamp: the cursor must split them by log_id
+    logs.document('old_a').set(_decision_log('u1', f'{old_day}T08:00:00'))
+    logs.document('old_b').set(_decision_log('u1', f'{old_day}T08:00:00'))
+    logs.document('old_c').set(_decision_log('u1', f'{old_day}T07:00:00'))
+    logs.document('orphan').set({'timestamp': f'{old_day}T06:00:00', 'action': 'ai_decision'})
+    logs.document('new').set(_decision_log('u1', recent))
+
+    saved_dir = archive_service.ARCHIVE_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        archive_service.ARCHIVE_DIR = tmp  # No Parquet archives from other runs
+        try:
+            result = archive_service.archive_old_logs(backend='firestore', verbose=False)
+            archived = list(archive_service.iter_archived_logs())
+        finally:
+            archive_service.ARCHIVE_DIR = saved_dir
+
+    assert result['success'] and result['logs_archived'] == 4, result
+    assert [doc.id for doc in logs.stream()] == ['new']
+    # The log with no user is archived (under UNKNOWN_USER), not just deleted
+    assert (None, 'orphan') in [(owner, log['log_id']) for owner, log in archived]
+
+    first = archive_service.read_archived_logs('u1', limit=2, backend='firestore')
+    assert [log['log_id'] for log in first] == ['old_b', 'old_a']
+    assert all(log['archived'] and log['user_id'] == 'u1' for log in first)
+    rest = archive_service.read_archived_logs('u1', before=first[-1]['timestamp'], limit=2,
+                                              backend='firestore', before_id=first[-1]['log_id'])
+    assert [log['log_id'] for log in rest] == ['old_c']
+    assert rest[0]['decision']['duration_minutes'] == 10
+
+
+# ----------------------------------------------------------------------
+# User stats counters
+# ----------------------------------------------------------------------
+
+def test_user_writes_update_stats_counters():
+    """Creating, updating and deleting users moves the counters by their delta"""
+    set_db(MemoryFirestore())
+    users = get_user_repository()
+    users.set('u1', {'name': 'A', 'ai_mode': True, 'plants': [{'name': 'tomato'}]})
+    users.set('u2', {'name': 'B', 'ai_mode': False, 'plants': []})
+    assert get_user_stats() == {'total_users': 2, 'active_ai_users': 1, 'total_plants': 1}
+
+    users.add_plant('u2', {'name': 'pepper'})
+    users.update('u2', {'ai_mode': True})
+    users.update('u1', {'name': 'A2'})  # Not counted: no stats write
+    assert get_user_stats() == {'total_users': 2, 'active_ai_users': 2, 'total_plants': 2}
+
+    users.delete('u1')
+    users.delete('missing')  # Nothing to subtract
+    assert get_user_stats() == {'total_users': 1, 'active_ai_users': 1, 'total_plants': 1}
+
+
+def test_reconcile_corrects_drift():
+    """reconcile_user_stats brings drifted counters back to the recounted totals"""
+    db = MemoryFirestore()
+    set_db(db)
+    users = get_user_repository()
+    for i in range(5):
+        users.set(f'u{i}', {'ai_mode': i % 2 == 0, 'plants': [{'name': 'tomato'}] * i})
+    # Drift: a user written around the counters, and a corrupted shard
+    db.collection(USERS_COLLECTION).document('u9').set({'ai_mode': True, 'plants': []})
+    db.collection(STATS_COLLECTION).document('users_3').set({'total_plants': 100}, merge=True)
+
+    result = reconcile_user_stats(page_size=2, verbose=False)
+    expected = {'total_users': 6, 'active_ai_users': 4, 'total_plants': 10}
+    assert result['users_scanned'] == 6 and result['stats'] == expected, result
+    assert get_user_stats() == expected
+    assert reconcile_user_stats(verbose=False)['drift'] == {field: 0 for field in expected}
+
+
+# ----------------------------------------------------------------------
+# Migrations
+# ----------------------------------------------------------------------
+
+class _TagMigration(Migration):
+    name = 'test_tag'
+    description = 'Set migrated=True'
+    collection = 'things'
+    fields = ['migrated']
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.seen = []
+
+    def transform(self, doc_id, data):
+        if doc_id == self.fail_on:
+            raise RuntimeError(f'cannot migrate {doc_id}')
+        self.seen.append(doc_id)
+        return None if data.get('migrated') else {'migrated': True}
+
+
+def _things(db, count):
+    for i in range(count):
+        db.collection('things').document(f't{i:02d}').set({'n': i})
+
+
+def test_migration_pauses_and_resumes_from_checkpoint():
+    """max_docs pauses at a checkpoint; the next run scans only the rest"""
+    db = MemoryFirestore()
+    set_db(db)
+    _things(db, 10)
+
+    first = _TagMigration()
+    result = run_migration(first, page_size=2, workers=2, max_docs=4, verbose=False)
+    assert result['status'] == 'paused', result
+    checkpoint = get_checkpoint('test_tag')
+    assert checkpoint['cursor'] == 't03' and checkpoint['scanned'] == 4
+
+    second = _TagMigration()
+    result = run_migration(second, page_size=3, workers=2, verbose=False)
+    assert result['status'] == 'done', result
+    assert second.seen == [f't{i:02d}' for i in range(4, 10)]
+    assert get_checkpoint('test_tag')['scanned'] == 10 and get_checkpoint('test_tag')['updated'] == 10
+    assert all(doc.to_dict()['migrated'] for doc in db.collection('things').stream())
+
+    # Done migrations do not run again
+    third = _TagMigration()
+    assert run_migration(third, verbose=False)['status'] == 'done' and third.seen == []
+
+
+def test_failed_migration_resumes_after_last_committed_page():
+    """A failure keeps the checkpoint at the last page that committed"""
+    db = MemoryFirestore()
+    set_db(db)
+    _things(db, 6)
+
+    result = run_migration(_TagMigration(fail_on='t04'), page_size=2, workers=1, verbose=False)
+    assert result['status'] == 'failed' and 'cannot migrate t04' in result.get('error', ''), result
+    assert get_checkpoint('test_tag')['cursor'] == 't03'
+
+    retry = _TagMigration()
+    assert run_migration(retry, page_size=2, verbose=False)['status'] == 'done'
+    assert retry.seen == ['t04', 't05']
+    assert all(doc.to_dict()['migrated'] for doc in db.collection('things').stream())
+
+
+# ----------------------------------------------------------------------
+# Profile cache
+# ----------------------------------------------------------------------
+
+def test_profile_cache_listener_invalidates_remote_writes():
+    """A write by another worker (not through this cache) evicts the cached profile"""
+    db = MemoryFirestore()
+    set_db(db)
+    cache = UserProfileCache(USERS_COLLECTION, max_size=10)
+    users = db.collection(USERS_COLLECTION)
+    users.document('u1').set({'name': 'A', 'ai_mode': True})
+
+    assert cache.get('u1') == {'name': 'A', 'ai_mode': True}
+    with db.measure() as ops:
+        assert cache.get('u1', ['ai_mode']) == {'ai_mode': True}
+    assert ops['reads'] == 0, 'cached profile was read again'
+
+    users.document('u1').update({'ai_mode': False})  # Another worker's write
+    assert cache.get_stats()['listener_invalidations'] == 1
+    assert cache.get('u1', ['ai_mode']) == {'ai_mode': False}
+
+    users.document('u1').delete()
+    assert cache.get('u1') is None
+    assert cache.get_stats()['listeners'] == 0, 'listener left open for a deleted user'
+    cache.clear()
+
+
+def test_profile_cache_holds_no_listener_for_unknown_users():
+    """Misses on unknown users take no slot and leave no listener behind"""
+    db = MemoryFirestore()
+    set_db(db)
+    cache = UserProfileCache(USERS_COLLECTION, max_size=2)
+    for i in range(3):
+        db.collection(USERS_COLLECTION).document(f'u{i}').set({'name': str(i)})
+
+    assert cache.get('nobody') is None
+    for i in range(3):
+        cache.get(f'u{i}')
+    stats = cache.get_stats()
+    assert stats['listeners'] == 2 and stats['evictions'] == 1, stats
+    cache.clear()
+    assert cache.get_stats()['listeners'] == 0
+
+
+if __name__ == "__main__":
+    print("="*70)
+    print("🧪 TESTING FIRESTORE DATA PATHS")
+    print("="*70)
+    failed = 0
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            try:
+                test()
+                print(f"   ✅ {name}")
+            except AssertionError as e:
+                failed += 1
+                print(f"   ❌ {name}: {e}")
+    print("="*70)
+    sys.exit(1 if failed else 0)
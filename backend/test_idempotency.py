@@ -0,0 +1,92 @@
+"""
+Regression tests for the idempotency store (utils/idempotency.py)
+Runs against the in-memory Firestore: no credentials or network needed
+
+Two IdempotencyStore instances sharing one database stand in for two workers.
+
+Run from backend/ directory:
+  python test_idempotency.py
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.firebase_client import set_db
+from utils.memory_firestore import MemoryFirestore
+from utils.idempotency import IdempotencyStore
+
+
+def _compute(calls, delay=0.0):
+    def compute():
+        calls.append(threading.current_thread().name)
+        time.sleep(delay)
+        return 200, b'{"should_water": true}'
+    return compute
+
+
+def test_replay_loaded_from_firestore_does_not_wait():
+    """A key loaded from Firestore must not leave its local entry pending"""
+    set_db(MemoryFirestore())
+    worker_a, worker_b = IdempotencyStore(), IdempotencyStore()
+    calls = []
+
+    worker_a.run('decision:u1', 'k1', b'body', _compute(calls))
+    # Worker B loads the response from Firestore, then replays it locally
+    for _ in range(2):
+        start = time.monotonic()
+        status, body, replayed = worker_b.run('decision:u1', 'k1', b'body', _compute(calls))
+        assert replayed and status == 200 and body == b'{"should_water": true}'
+        assert time.monotonic() - start < 1.0, 'replay waited for a request that was never in flight'
+    assert len(calls) == 1
+
+
+def test_concurrent_duplicates_on_two_workers_compute_once():
+    """The duplicate on the other worker waits for the claim instead of computing"""
+    set_db(MemoryFirestore())
+    worker_a, worker_b = IdempotencyStore(), IdempotencyStore()
+    calls, results = [], []
+
+    def request(store):
+        results.append(store.run('decision:u1', 'k2', b'body', _compute(calls, delay=0.5)))
+
+    threads = [threading.Thread(target=request, args=(store,)) for store in (worker_a, worker_b)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1, f'computed {len(calls)} times'
+    assert sorted(replayed for _, _, replayed in results) == [False, True]
+    assert len({body for _, body, _ in results}) == 1
+
+
+def test_failed_claim_is_released():
+    """A 5xx on one worker lets the duplicate on another worker compute"""
+    set_db(MemoryFirestore())
+    worker_a, worker_b = IdempotencyStore(), IdempotencyStore()
+
+    status, _, replayed = worker_a.run('decision:u1', 'k3', b'body', lambda: (503, b'{}'))
+    assert status == 503 and not replayed
+    status, _, replayed = worker_b.run('decision:u1', 'k3', b'body', lambda: (200, b'{}'))
+    assert status == 200 and not replayed
+
+
+if __name__ == "__main__":
+    print("="*70)
+    print("🧪 TESTING IDEMPOTENCY STORE")
+    print("="*70)
+    failed = 0
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            try:
+                test()
+                print(f"   ✅ {name}")
+            except AssertionError as e:
+                failed += 1
+                print(f"   ❌ {name}: {e}")
+    print("="*70)
+    sys.exit(1 if failed else 0)
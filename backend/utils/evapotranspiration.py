@@ -0,0 +1,154 @@
+"""
+Reference Evapotranspiration (ET0)
+Hourly crop water demand from a 24-hour forecast, vectorized with NumPy
+
+Uses the FAO-56 hourly Penman-Monteith equation when the forecast has
+radiation and wind, and falls back to Hargreaves (temperature only)
+otherwise. Computed once per forecast refresh and cached with it, so every
+farm in a geohash cell reuses the same result.
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+SOLAR_CONSTANT = 0.0820          # MJ m-2 min-1
+STEFAN_BOLTZMANN_HOURLY = 2.043e-10  # MJ K-4 m-2 h-1
+ALBEDO = 0.23                    # Grass reference crop
+DEFAULT_ELEVATION_M = 100
+DEFAULT_LATITUDE = 36.8065       # Tunis
+# Tunisia keeps UTC+1 all year, standard meridian 15°E
+TZ_MERIDIAN_DEG = 15.0
+# Rs/Rso assumed for night hours, when it cannot be measured (FAO-56 eq 39 note)
+NIGHT_CLOUDINESS_RATIO = 0.8
+
+
+def _solar_geometry(hour_epochs: np.ndarray, latitude: float, longitude: float):
+    """Day of year, solar declination, sunset angle and hour-midpoint solar angles"""
+    local = hour_epochs + 3600  # UTC+1
+    days = (local // 86400).astype('int64').astype('datetime64[D]')
+    doy = (days - days.astype('datetime64[Y]')).astype(np.float64) + 1
+    b = 2 * np.pi * (doy - 81) / 364
+    seasonal_correction = 0.1645 * np.sin(2 * b) - 0.1255 * np.cos(b) - 0.025 * np.sin(b)
+    declination = 0.409 * np.sin(2 * np.pi * doy / 365 - 1.39)
+    inverse_distance = 1 + 0.033 * np.cos(2 * np.pi * doy / 365)
+    phi = np.radians(latitude)
+    sunset = np.arccos(np.clip(-np.tan(phi) * np.tan(declination), -1, 1))
+
+    clock_mid = (local % 86400) / 3600 + 0.5
+    omega = np.pi / 12 * ((clock_mid + 0.06667 * (TZ_MERIDIAN_DEG - longitude) + seasonal_correction) - 12)
+    return doy, declination, inverse_distance, phi, sunset, omega
+
+
+def extraterrestrial_radiation(hour_epochs: np.ndarray, latitude: float,
+                               longitude: float) -> np.ndarray:
+    """Ra for each forecast hour, MJ m-2 h-1 (FAO-56 eq 28)"""
+    _, declination, dr, phi, sunset, omega = _solar_geometry(hour_epochs, latitude, longitude)
+    omega1 = np.clip(omega - np.pi / 24, -sunset, sunset)
+    omega2 = np.clip(omega + np.pi / 24, -sunset, sunset)
+    ra = 12 * 60 / np.pi * SOLAR_CONSTANT * dr * (
+        (omega2 - omega1) * np.sin(phi) * np.sin(declination)
+        + np.cos(phi) * np.cos(declination) * (np.sin(omega2) - np.sin(omega1))
+    )
+    return np.maximum(ra, 0.0)
+
+
+def penman_monteith_hourly(temperature_c: np.ndarray, humidity: np.ndarray, wind_kph: np.ndarray,
+                           radiation_wm2: np.ndarray, hour_epochs: np.ndarray,
+                           latitude: float, longitude: float,
+                           elevation_m: float = DEFAULT_ELEVATION_M) -> np.ndarray:
+    """
+    FAO-56 hourly Penman-Monteith reference ET0 (eq 53)
+
+    Args:
+        temperature_c: Air temperature per hour (°C)
+        humidity: Relative humidity per hour (%)
+        wind_kph: Wind speed per hour at 10 m (km/h)
+        radiation_wm2: Incoming shortwave radiation per hour (W/m²)
+        hour_epochs: Start of each hour (Unix seconds)
+
+    Returns:
+        ET0 per hour (mm)
+    """
+    t = temperature_c
+    # Wind at 10 m -> 2 m (eq 47)
+    u2 = wind_kph / 3.6 * 4.87 / np.log(67.8 * 10 - 5.42)
+
+    pressure = 101.3 * ((293 - 0.0065 * elevation_m) / 293) ** 5.26
+    gamma = 0.000665 * pressure
+    es = 0.6108 * np.exp(17.27 * t / (t + 237.3))
+    ea = es * np.clip(humidity, 0, 100) / 100
+    delta = 4098 * es / (t + 237.3) ** 2
+
+    rs = np.maximum(radiation_wm2, 0) * 0.0036  # W/m² -> MJ m-2 h-1
+    ra = extraterrestrial_radiation(hour_epochs, latitude, longitude)
+    rso = (0.75 + 2e-5 * elevation_m) * ra
+    daytime = rso > 0.01
+    ratio = np.full_like(rs, NIGHT_CLOUDINESS_RATIO)
+    ratio[daytime] = np.clip(rs[daytime] / rso[daytime], 0.25, 1.0)
+
+    rns = (1 - ALBEDO) * rs
+    rnl = STEFAN_BOLTZMANN_HOURLY * (t + 273.16) ** 4 * (0.34 - 0.14 * np.sqrt(ea)) * (1.35 * ratio - 0.35)
+    rn = rns - rnl
+    soil_heat = np.where(daytime, 0.1 * rn, 0.5 * rn)
+
+    et0 = (0.408 * delta * (rn - soil_heat) + gamma * 37 / (t + 273) * u2 * (es - ea)) / \
+        (delta + gamma * (1 + 0.34 * u2))
+    return np.maximum(et0, 0.0)
+
+
+def hargreaves_hourly(temperature_c: np.ndarray, hour_epochs: np.ndarray,
+                      latitude: float, longitude: float) -> np.ndarray:
+    """
+    Hargreaves ET0 for the window, spread over hours in proportion to Ra
+
+    Returns:
+        ET0 per hour (mm)
+    """
+    ra = extraterrestrial_radiation(hour_epochs, latitude, longitude)
+    t_mean = temperature_c.mean()
+    t_range = max(float(temperature_c.max() - temperature_c.min()), 0.0)
+    # 0.408 converts MJ m-2 to mm of water
+    total = 0.0023 * 0.408 * ra.sum() * (t_mean + 17.8) * np.sqrt(t_range)
+    if ra.sum() <= 0:
+        return np.zeros_like(temperature_c)
+    return np.maximum(total, 0.0) * ra / ra.sum()
+
+
+def compute_et0(hourly: Dict[str, np.ndarray], hour_epochs: np.ndarray,
+                latitude: Optional[float] = None, longitude: Optional[float] = None,
+                elevation_m: float = DEFAULT_ELEVATION_M) -> Dict:
+    """
+    Reference ET0 for a 24-hour forecast window
+
+    Args:
+        hourly: 'temperature_c', 'humidity', 'wind_kph', 'radiation_wm2' arrays
+            (radiation or wind may be NaN when the provider omits them)
+        hour_epochs: Start of each hour (Unix seconds)
+        latitude, longitude: Forecast location (defaults to Tunis)
+
+    Returns:
+        Dictionary with:
+        - hourly_et0_mm: NumPy array per hour
+        - et0_24h_mm: float, total water demand for the window
+        - et0_method: 'penman_monteith' or 'hargreaves'
+    """
+    latitude = DEFAULT_LATITUDE if latitude is None else latitude
+    longitude = TZ_MERIDIAN_DEG if longitude is None else longitude
+    hour_epochs = np.asarray(hour_epochs, dtype=np.float64)
+    temperature = hourly['temperature_c']
+
+    if np.isnan(hourly['radiation_wm2']).any() or np.isnan(hourly['wind_kph']).any():
+        et0 = hargreaves_hourly(temperature, hour_epochs, latitude, longitude)
+        method = 'hargreaves'
+    else:
+        et0 = penman_monteith_hourly(temperature, hourly['humidity'], hourly['wind_kph'],
+                                     hourly['radiation_wm2'], hour_epochs, latitude, longitude,
+                                     elevation_m)
+        method = 'penman_monteith'
+
+    return {
+        'hourly_et0_mm': et0,
+        'et0_24h_mm': round(float(et0.sum()), 2),
+        'et0_method': method
+    }
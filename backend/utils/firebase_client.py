@@ -1,12 +1,21 @@
 """
 Firebase initialization and database reference
 Shared across all services
+
+STORAGE_BACKEND selects the database:
+  firestore - Cloud Firestore via the Admin SDK (default)
+  memory    - in-process stand-in (utils/memory_firestore.py), no credentials
+              or network, for benchmarks and load tests. MEMORY_SNAPSHOT
+              names a snapshot file to preload (see generate_fleet.py)
 """
 
 import firebase_admin
 from firebase_admin import credentials, firestore
 import os
 
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'firestore')
+MEMORY_SNAPSHOT = os.environ.get('MEMORY_SNAPSHOT')
+
 # Initialize Firebase (singleton)
 _db = None
 
@@ -14,6 +23,19 @@ def get_db():
     """Get Firestore database instance"""
     global _db
     if _db is None:
+        if STORAGE_BACKEND == 'memory':
+            try:
+                from utils.memory_firestore import MemoryFirestore
+            except ImportError:
+                from backend.utils.memory_firestore import MemoryFirestore
+            db = MemoryFirestore()
+            print("🧪 Using in-memory Firestore (STORAGE_BACKEND=memory)")
+            if MEMORY_SNAPSHOT:
+                loaded = db.load_snapshot(MEMORY_SNAPSHOT)
+                print(f"📦 Loaded {loaded} documents from {MEMORY_SNAPSHOT}")
+            _db = db
+            return _db
+        
         # Initialize Firebase if not already done
         if not firebase_admin._apps:
             cred_path = os.path.join(os.path.dirname(__file__), '..', 
@@ -22,3 +44,9 @@ def get_db():
             firebase_admin.initialize_app(cred)
         _db = firestore.client()
     return _db
+
+
+def set_db(db):
+    """Replace the database instance (e.g. a MemoryFirestore in tests)"""
+    global _db
+    _db = db
@@ -0,0 +1,484 @@
+"""
+Synthetic Fleet Generator
+Deterministic farmers and irrigation history for load and performance tests
+
+Farmer i is generated from its own random stream seeded with
+"<seed>:<i>", so the same seed always gives the same fleet, a larger fleet
+starts with the same farmers, and any range of farmers can be generated on
+its own. Distributions follow the real fleet:
+  - locations from the gazetteer, weighted towards irrigated governorates
+  - crops from the plant database, weighted by Tunisian cultivation area
+  - 1-5 plants per farm, soil sandy/loam/clay with realistic compaction and slope
+  - irrigation logs from a soil moisture model per plant: moisture dries out
+    with the crop's water needs, the season and the soil, AI checks water
+    it back up below the critical threshold, farmers sometimes water by hand
+
+The fleet is written through the storage abstraction (Firestore or the
+in-memory backend) in full 500-write batches on parallel workers, or
+streamed to a snapshot file that STORAGE_BACKEND=memory can preload.
+Users, irrigation logs, rollups and the user stats counters stay
+consistent with each other either way.
+
+Run with `python generate_fleet.py`.
+"""
+
+import json
+import math
+import os
+import random
+import string
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Handle imports for running from backend/ or parent directory
+try:
+    from utils.firebase_client import get_db
+    from utils.memory_firestore import SnapshotWriter
+    from utils.repositories import (
+        LOGS_COLLECTION, USERS_COLLECTION, USER_EXISTS_ERROR, get_user_repository
+    )
+    from services.admin_service import SOIL_TYPE_ENCODING
+    from services.irrigation_service import calculate_season
+    from services.plant_service import get_plant_database
+    from services.rollup_service import (
+        COUNTER_FIELDS, DAILY_ROLLUPS_COLLECTION, USER_ROLLUPS_COLLECTION, rollup_increments
+    )
+    from services.stats_service import STATS_COLLECTION, USER_STAT_FIELDS, user_contribution
+except ImportError:
+    from backend.utils.firebase_client import get_db
+    from backend.utils.memory_firestore import SnapshotWriter
+    from backend.utils.repositories import (
+        LOGS_COLLECTION, USERS_COLLECTION, USER_EXISTS_ERROR, get_user_repository
+    )
+    from backend.services.admin_service import SOIL_TYPE_ENCODING
+    from backend.services.irrigation_service import calculate_season
+    from backend.services.plant_service import get_plant_database
+    from backend.services.rollup_service import (
+        COUNTER_FIELDS, DAILY_ROLLUPS_COLLECTION, USER_ROLLUPS_COLLECTION, rollup_increments
+    )
+    from backend.services.stats_service import STATS_COLLECTION, USER_STAT_FIELDS, user_contribution
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'tunisia_locations.json')
+
+FLEET_PREFIX = 'fleet_'
+DEFAULT_SEED = 42
+FIRESTORE_BATCH_LIMIT = 500
+USERS_PER_CHUNK = 250  # Users generated (with their logs) before writing
+
+# Irrigated farming is concentrated in the centre-west, the Sahel, Cap Bon
+# and the oases; other governorates get weight 2
+GOVERNORATE_WEIGHTS = {
+    'Sidi Bouzid': 14, 'Kairouan': 12, 'Nabeul': 10, 'Kasserine': 8, 'Sfax': 8,
+    'Jendouba': 6, 'Beja': 6, 'Bizerte': 5, 'Sousse': 5, 'Monastir': 5, 'Mahdia': 5,
+    'Kebili': 4, 'Tozeur': 4, 'Gabes': 4, 'Medenine': 3, 'Zaghouan': 3, 'Siliana': 3
+}
+SOIL_TYPE_WEIGHTS = {'sandy': 35, 'loam': 40, 'clay': 25}
+# Moisture lost per day relative to loam
+SOIL_DRYING = {'sandy': 1.3, 'loam': 1.0, 'clay': 0.75}
+PLANTS_PER_FARM_WEIGHTS = [30, 30, 20, 12, 8]  # 1..5 plants
+AI_MODE_RATE = 0.8
+MANUAL_WATERING_RATE = 0.04  # Checks where the farmer opens the valve instead
+
+FIRST_NAMES = [
+    'Mabrouka', 'Fatma', 'Mohamed', 'Ahmed', 'Ali', 'Salah', 'Hedi', 'Amel', 'Leila', 'Sonia',
+    'Khaled', 'Nabil', 'Mounir', 'Habib', 'Samia', 'Najet', 'Youssef', 'Karim', 'Rim', 'Hela',
+    'Sami', 'Imed', 'Moncef', 'Zohra', 'Aicha', 'Hamza', 'Walid', 'Nadia', 'Slim', 'Ines'
+]
+LAST_NAMES = [
+    'Ben Ali', 'Trabelsi', 'Gharbi', 'Hammami', 'Jebali', 'Mejri', 'Ayari', 'Dridi', 'Sassi',
+    'Bouazizi', 'Chaabane', 'Khelifi', 'Mansouri', 'Saidi', 'Jlassi', 'Hamdi', 'Zouari', 'Riahi'
+]
+
+_ID_ALPHABET = string.ascii_letters + string.digits
+
+
+def _weighted(rng: random.Random, choices: List, weights: List):
+    return rng.choices(choices, weights)[0]
+
+
+class FleetGenerator:
+    """
+    Generates farmer i (profile + irrigation logs) deterministically
+
+    Args:
+        seed: Random seed; the same seed gives the same fleet
+        days: Days of irrigation history, ending at end_date
+        checks_per_day: Average AI checks per plant per day (0 = no logs)
+        end_date: Last day of history (default today; pass it to reproduce a fleet later)
+        prefix: User ID prefix (user IDs are <prefix><i:07d>)
+    """
+
+    def __init__(self, seed: int = DEFAULT_SEED, days: int = 90, checks_per_day: float = 1.0,
+                 end_date: Optional[date] = None, prefix: str = FLEET_PREFIX):
+        self.seed = seed
+        self.days = days
+        self.checks_per_day = checks_per_day
+        self.end_date = end_date or date.today()
+        self.end = datetime.combine(self.end_date, time.min)
+        self.start = self.end - timedelta(days=days)
+        self.prefix = prefix
+
+        # Sorted so the order (and the fleet) does not depend on file order
+        self._crops = sorted(get_plant_database().items())
+        # Square root: olive and cereals dominate by area but far less among irrigated farms
+        self._crop_weights = [math.sqrt(features.get('cultivation_area_ha', 1000))
+                              for _, features in self._crops]
+        with open(GAZETTEER_PATH, encoding='utf-8') as f:
+            locations = json.load(f)['locations']
+        self._locations = [location['name'] for location in locations]
+        self._location_weights = [GOVERNORATE_WEIGHTS.get(location['governorate'], 2)
+                                  for location in locations]
+
+    def user_id(self, index: int) -> str:
+        return f'{self.prefix}{index:07d}'
+
+    def farm(self, index: int) -> Tuple[str, Dict, List[Tuple[str, Dict]]]:
+        """
+        Generate one farmer
+
+        Returns:
+            (user_id, user document, [(log_id, log document), ...] in time order)
+        """
+        rng = random.Random(f'{self.seed}:{index}')
+        user_id = self.user_id(index)
+
+        soil_type = _weighted(rng, list(SOIL_TYPE_WEIGHTS), list(SOIL_TYPE_WEIGHTS.values()))
+        soil = {
+            'soil_type': soil_type,
+            'soil_type_encoded': SOIL_TYPE_ENCODING[soil_type],
+            'soil_compaction': round(min(85, max(30, rng.gauss(55, 9))), 1),
+            'slope_degrees': round(min(20, rng.expovariate(1 / 3)), 1)
+        }
+
+        plant_count = _weighted(rng, range(1, 6), PLANTS_PER_FARM_WEIGHTS)
+        plants = []
+        names = set()
+        while len(plants) < plant_count:
+            name, features = _weighted(rng, self._crops, self._crop_weights)
+            if name in names:
+                continue
+            names.add(name)
+            plants.append({
+                'name': name,
+                # Smallholdings: median ~2,000 m²
+                'area_sqm': int(min(200000, max(100, rng.lognormvariate(7.6, 0.9)))),
+                'features': dict(features)
+            })
+
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        ai_mode = rng.random() < AI_MODE_RATE
+        created_at = self.start - timedelta(days=rng.uniform(0, 365), seconds=rng.uniform(0, 86400))
+
+        logs = []
+        for plant in plants:
+            logs += self._plant_logs(rng, user_id, plant, soil, ai_mode)
+        logs.sort(key=lambda log: log[1]['timestamp'])
+        waterings = [data['timestamp'] for _, data in logs if data['decision'].get('should_water')]
+
+        user = {
+            'user_id': user_id,
+            'email': f'{first.lower()}.{last.lower().replace(" ", "")}.{index}@fleet.example',
+            'name': f'{first} {last}',
+            'location': _weighted(rng, self._locations, self._location_weights),
+            'soil_properties': soil,
+            'plants': plants,
+            'created_at': created_at.isoformat(),
+            'last_watering': waterings[-1] if waterings else None,
+            'ai_mode': ai_mode,
+            'role': 'farmer'
+        }
+        return user_id, user, logs
+
+    def _plant_logs(self, rng: random.Random, user_id: str, plant: Dict, soil: Dict,
+                    ai_mode: bool) -> List[Tuple[str, Dict]]:
+        """Irrigation logs of one plant from a simple soil moisture model"""
+        if self.checks_per_day <= 0:
+            return []
+        features = plant['features']
+        low, high = features.get('optimal_moisture_range', [45, 65])
+        critical = features.get('critical_moisture_threshold', 30)
+        water_level = features.get('water_requirement_level', 3)
+        soil_drying = SOIL_DRYING[soil['soil_type']]
+
+        logs = []
+        moisture = rng.uniform(low, high)
+        t = self.start
+        last_watering = None
+        while True:
+            step_days = rng.expovariate(self.checks_per_day)
+            t += timedelta(days=step_days)
+            if t >= self.end:
+                break
+            day_of_year = t.timetuple().tm_yday
+            # 0.4 in mid-January .. 1.6 in mid-July
+            season_factor = 1 + 0.6 * math.sin(2 * math.pi * (day_of_year - 105) / 365)
+            moisture -= step_days * (2 + 1.5 * water_level) * season_factor * soil_drying
+            if season_factor < 0.8 and rng.random() < 0.08 * step_days:
+                moisture += rng.uniform(5, 20)  # Winter rain
+            moisture = min(95.0, max(5.0, moisture))
+
+            temperature = 12 + 10 * season_factor + 6 * math.sin(2 * math.pi * (t.hour - 9) / 24)
+            minutes_since = int((t - last_watering).total_seconds() / 60) if last_watering else 1440
+            if ai_mode:
+                manual = rng.random() < MANUAL_WATERING_RATE
+            else:
+                # Without AI mode only the farmer's waterings are logged
+                manual = moisture < critical + 10 and rng.random() < 0.7
+                if not manual:
+                    continue
+
+            if manual:
+                duration = rng.choice([10, 15, 20, 30, 45])
+                moisture = min(high + 5, moisture + duration * 0.6)
+                last_watering = t
+                logs.append((self._log_id(rng), {
+                    'user_id': user_id,
+                    'plant_name': plant['name'],
+                    'timestamp': t.isoformat(),
+                    'action': 'manual_open',
+                    'duration_minutes': duration,
+                    'decision': {'should_water': True, 'duration_minutes': duration, 'mode': 'manual'},
+                    'reasoning': 'Manual valve control by farmer'
+                }))
+                continue
+
+            should_water = moisture < critical + 5
+            deficit = max(0.0, high - moisture)
+            duration = min(90, max(5, int(deficit * 1.5))) if should_water else 0
+            intensity = min(100, max(20, int(40 + deficit * 2))) if should_water else 0
+            if should_water:
+                moisture = min(high + 5, moisture + duration * intensity / 100 * 0.8)
+                last_watering = t
+            logs.append((self._log_id(rng), {
+                'user_id': user_id,
+                'plant_name': plant['name'],
+                'timestamp': t.isoformat(),
+                'sensor_data': {
+                    'soil_moisture': round(moisture, 1),
+                    'current_temperature': round(temperature + rng.gauss(0, 1.5), 1),
+                    'current_humidity': round(min(95, max(15, 70 - 20 * season_factor + rng.gauss(0, 8)))),
+                    'minutes_since_last_watering': minutes_since,
+                    'water_requirement_level': water_level,
+                    'root_depth_cm': features.get('root_depth_cm'),
+                    'drought_tolerance': features.get('drought_tolerance'),
+                    'soil_type_encoded': soil['soil_type_encoded'],
+                    'soil_type': soil['soil_type'],
+                    'soil_compaction': soil['soil_compaction'],
+                    'slope_degrees': soil['slope_degrees'],
+                    'hour_of_day': t.hour,
+                    'day_of_year': day_of_year,
+                    'season': calculate_season(day_of_year),
+                    'et0_24h_mm': round(1.5 + 4 * season_factor, 2)
+                },
+                'decision': {
+                    'should_water': should_water,
+                    'duration_minutes': duration,
+                    'intensity_percent': intensity
+                },
+                'reasoning': {
+                    'decision_rationale': (f'Soil moisture {moisture:.0f}% below threshold' if should_water
+                                           else f'Soil moisture {moisture:.0f}% is adequate'),
+                    'confidence_level': 'medium',
+                    'synthetic': True
+                },
+                'mode': 'ai'
+            }))
+        return logs
+
+    @staticmethod
+    def _log_id(rng: random.Random) -> str:
+        return ''.join(rng.choices(_ID_ALPHABET, k=20))
+
+    def farms(self, count: int, first: int = 0) -> Iterator[Tuple[str, Dict, List[Tuple[str, Dict]]]]:
+        """Farmers first .. first+count-1"""
+        for index in range(first, first + count):
+            yield self.farm(index)
+
+
+def _user_rollups(user_id: str, logs: List[Tuple[str, Dict]], now: str) -> List[Tuple[str, Dict]]:
+    """Per-user daily rollup documents for one user's logs (written whole, not incremented)"""
+    per_day = defaultdict(lambda: defaultdict(int))
+    for _, data in logs:
+        for field, value in rollup_increments(data).items():
+            per_day[data['timestamp'][:10]][field] += value
+    return [(f'{user_id}_{day}', {**counters, 'user_id': user_id, 'date': day, 'updated_at': now})
+            for day, counters in per_day.items()]
+
+
+def _add_daily(daily: Dict, user_rollups: List[Tuple[str, Dict]]):
+    for _, rollup in user_rollups:
+        for field in COUNTER_FIELDS:
+            if rollup.get(field):
+                daily[rollup['date']][field] += rollup[field]
+
+
+def _set_daily_rollups(db, days: List[str], now: str):
+    """Set each day's system rollup to the sum of its per-user rollups (idempotent)"""
+    for i in range(0, len(days), FIRESTORE_BATCH_LIMIT):
+        batch = db.batch()
+        for day in days[i:i + FIRESTORE_BATCH_LIMIT]:
+            totals = {field: 0 for field in COUNTER_FIELDS}
+            query = db.collection(USER_ROLLUPS_COLLECTION).where('date', '==', day).select(COUNTER_FIELDS)
+            for doc in query.stream():
+                for field, value in doc.to_dict().items():
+                    totals[field] += value or 0
+            batch.set(db.collection(DAILY_ROLLUPS_COLLECTION).document(day),
+                      {**totals, 'date': day, 'updated_at': now})
+        batch.commit()
+
+
+def write_fleet(generator: FleetGenerator, count: int, first: int = 0,
+                workers: int = 4, verbose: bool = True) -> Dict:
+    """
+    Write farmers first .. first+count-1 through the configured storage
+
+    Users are created with UserRepository.create_many (so the stats counters
+    follow); users that already exist are skipped, users whose batch failed
+    are counted as failed. Logs and per-user rollups (of created and skipped
+    users) are set under deterministic IDs and committed in full batches on
+    `workers` threads, so re-running a range, e.g. after a run died between
+    a user batch and its logs, completes it without duplicates. System daily
+    rollups of the days written are then set to the sum of that day's
+    per-user rollups.
+
+    Returns:
+        Counts of users created, skipped and failed, logs and rollups written
+    """
+    db = get_db()
+    users_repo = get_user_repository()
+    now = datetime.now().isoformat()
+    days = set()
+    counts = {'users_created': 0, 'users_skipped': 0, 'users_failed': 0, 'logs': 0, 'user_rollups': 0}
+    in_flight = set()
+    pending = []  # (collection, doc_id, data) not yet in a submitted batch
+
+    def commit(writes):
+        batch = db.batch()
+        for collection, doc_id, data in writes:
+            batch.set(db.collection(collection).document(doc_id), data)
+        batch.commit()
+
+    def flush(final: bool = False):
+        nonlocal in_flight, pending
+        while len(pending) >= FIRESTORE_BATCH_LIMIT or (final and pending):
+            in_flight.add(pool.submit(commit, pending[:FIRESTORE_BATCH_LIMIT]))
+            pending = pending[FIRESTORE_BATCH_LIMIT:]
+            while len(in_flight) >= 2 * workers:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    future.result()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for chunk_start in range(first, first + count, USERS_PER_CHUNK):
+            chunk = list(generator.farms(min(USERS_PER_CHUNK, first + count - chunk_start), chunk_start))
+            errors = users_repo.create_many([(user_id, user) for user_id, user, _ in chunk])
+            for (user_id, _, logs), error in zip(chunk, errors):
+                if error == USER_EXISTS_ERROR:
+                    counts['users_skipped'] += 1
+                elif error:
+                    counts['users_failed'] += 1
+                    continue
+                else:
+                    counts['users_created'] += 1
+                # Also for existing users: a previous run may have died before their logs
+                rollups = _user_rollups(user_id, logs, now)
+                days.update(data['date'] for _, data in rollups)
+                pending += [(LOGS_COLLECTION, log_id, data) for log_id, data in logs]
+                pending += [(USER_ROLLUPS_COLLECTION, doc_id, data) for doc_id, data in rollups]
+                counts['logs'] += len(logs)
+                counts['user_rollups'] += len(rollups)
+            flush()
+            if verbose:
+                print(f"   👤 {chunk_start + len(chunk) - first}/{count} users, 📄 {counts['logs']} logs")
+        flush(final=True)
+        for future in in_flight:
+            future.result()
+
+    _set_daily_rollups(db, sorted(days), now)
+    return {'success': True, **counts, 'daily_rollups': len(days)}
+
+
+def write_fleet_snapshot(generator: FleetGenerator, count: int, path: str,
+                         first: int = 0, verbose: bool = True) -> Dict:
+    """
+    Stream farmers first .. first+count-1 to a snapshot file
+
+    The snapshot also holds the rollups and user stats counters of the
+    fleet, so it loads (MEMORY_SNAPSHOT) as a consistent database.
+
+    Returns:
+        Counts of users, logs and documents written
+    """
+    now = datetime.now().isoformat()
+    daily = defaultdict(lambda: defaultdict(int))
+    totals = {field: 0 for field in USER_STAT_FIELDS}
+    counts = {'users_created': 0, 'logs': 0, 'user_rollups': 0}
+
+    with SnapshotWriter(path) as snapshot:
+        for user_id, user, logs in generator.farms(count, first):
+            snapshot.write(USERS_COLLECTION, user_id, user)
+            for log_id, data in logs:
+                snapshot.write(LOGS_COLLECTION, log_id, data)
+            rollups = _user_rollups(user_id, logs, now)
+            for doc_id, data in rollups:
+                snapshot.write(USER_ROLLUPS_COLLECTION, doc_id, data)
+            _add_daily(daily, rollups)
+            for field, value in user_contribution(user).items():
+                totals[field] += value
+            counts['users_created'] += 1
+            counts['logs'] += len(logs)
+            counts['user_rollups'] += len(rollups)
+            if verbose and counts['users_created'] % 10000 == 0:
+                print(f"   👤 {counts['users_created']}/{count} users, 📄 {counts['logs']} logs")
+
+        for day in sorted(daily):
+            snapshot.write(DAILY_ROLLUPS_COLLECTION, day, {**daily[day], 'date': day, 'updated_at': now})
+        snapshot.write(STATS_COLLECTION, 'users_0', {**totals, 'updated_at': now, 'reconciled_at': now})
+
+    return {'success': True, **counts, 'daily_rollups': len(daily),
+            'documents': snapshot.documents, 'path': path}
+
+
+def delete_fleet(prefix: str = FLEET_PREFIX, verbose: bool = True) -> Dict:
+    """
+    Delete generated users, their logs and their per-user rollups
+
+    Written directly, not through the repository: run reconcile_user_stats.py
+    and backfill_rollups.py afterwards to fix the counters and daily rollups.
+    """
+    db = get_db()
+    deleted = {}
+    end = prefix + '~'
+    users = db.collection(USERS_COLLECTION)
+    rollups = db.collection(USER_ROLLUPS_COLLECTION)
+    queries = {
+        USERS_COLLECTION: users.where('__name__', '>=', users.document(prefix))
+                               .where('__name__', '<', users.document(end)).order_by('__name__'),
+        LOGS_COLLECTION: db.collection(LOGS_COLLECTION).where('user_id', '>=', prefix)
+                           .where('user_id', '<', end).order_by('user_id'),
+        USER_ROLLUPS_COLLECTION: rollups.where('__name__', '>=', rollups.document(prefix))
+                                        .where('__name__', '<', rollups.document(end)).order_by('__name__'),
+    }
+    for collection, query in queries.items():
+        deleted[collection] = 0
+        last = None
+        while True:
+            # Continue after the last page instead of re-running the query
+            # over documents just deleted
+            page = query.select(['user_id']).start_after(last) if last else query.select(['user_id'])
+            docs = list(page.limit(FIRESTORE_BATCH_LIMIT * 10).stream())
+            if not docs:
+                break
+            for i in range(0, len(docs), FIRESTORE_BATCH_LIMIT):
+                batch = db.batch()
+                for doc in docs[i:i + FIRESTORE_BATCH_LIMIT]:
+                    batch.delete(doc.reference)
+                batch.commit()
+            deleted[collection] += len(docs)
+            last = docs[-1]
+        if verbose:
+            print(f"   🧹 {collection}: {deleted[collection]} deleted")
+    return {'success': True, 'deleted': deleted}
@@ -1,22 +1,59 @@
 """
 WEATHER FORECAST MODULE
-Uses WeatherAPI.com to get current weather and 24-hour forecast for Tunisia
+Current weather and 24-hour forecast for Tunisia, from the configured
+provider (WeatherAPI.com by default, see utils/weather_providers.py)
 """
 
-import requests
+import numpy as np
 import json
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Allow running this module directly (python utils/forecast.py)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# Handle imports for running from backend/ or parent directory
+try:
+    from utils.evapotranspiration import compute_et0
+    from utils.forecast_cache import ForecastCache, normalize_location
+    from utils.geo import resolve_location
+    from utils.weather_providers import (
+        WeatherProviderError, get_http_stats, get_quota_stats, get_weather_provider
+    )
+    from utils.weather_store import get_weather_store
+except ImportError:
+    from backend.utils.evapotranspiration import compute_et0
+    from backend.utils.forecast_cache import ForecastCache, normalize_location
+    from backend.utils.geo import resolve_location
+    from backend.utils.weather_providers import (
+        WeatherProviderError, get_http_stats, get_quota_stats, get_weather_provider
+    )
+    from backend.utils.weather_store import get_weather_store
 
-# WeatherAPI.com API key
-API_KEY = os.environ.get('WEATHER_API_KEY', '2df98185da8e47e8940212529250111')
 DEFAULT_LOCATION = 'Zaghouan'
+FORECAST_HOURS = 24
+PREFETCH_WORKERS = int(os.environ.get('WEATHER_PREFETCH_WORKERS', 8))
+# Hourly weather series: result name -> WeatherAPI hour field
+HOURLY_FIELDS = {
+    'temperature_c': 'temp_c',
+    'humidity': 'humidity',
+    'wind_kph': 'wind_kph',
+    'radiation_wm2': 'short_rad'
+}
 
 
 def get_weather_forecast(location=DEFAULT_LOCATION):
     """
     Get weather forecast for next 24 hours
     
+    Served from the shared cache (refreshed hourly). Known town names and
+    coordinates are resolved to a geohash cell, and all farms in one cell
+    share the forecast fetched for the cell center.
+    
     Args:
         location: City name or coordinates (e.g., "Tunis" or "36.8065,10.1815")
         
@@ -24,65 +61,69 @@ def get_weather_forecast(location=DEFAULT_LOCATION):
         Dictionary with:
         - success: bool
         - current: {temperature, humidity, condition}
-        - hourly_rain_probability: list of 24 floats (0-100%)
-        - hourly_precipitation_mm: list of 24 floats (mm)
+        - hourly_rain_probability: NumPy array of 24 floats (0-100%)
+        - hourly_precipitation_mm: NumPy array of 24 floats (mm)
         - total_rainfall_24h: float (mm)
+        - max_rain_probability_24h: float (%)
+        - hourly_temperature_c, hourly_humidity, hourly_wind_kph,
+          hourly_radiation_wm2: NumPy arrays of 24 floats
+        - hourly_et0_mm: NumPy array of 24 floats, et0_24h_mm: float (mm),
+          et0_method (absent on degraded results from the offline store)
+    """
+    query, key = forecast_cache_key(location)
+    result = get_forecast_cache().get(query, key)
+    if result.get('success'):
+        result['location'] = location
+        result['forecast_location'] = query
+    return result
+
+
+def forecast_cache_key(location):
+    """(provider query, cache key) for a location"""
+    resolved = resolve_location(location)
+    if resolved['cell']:
+        return resolved['query'], f"cell:{resolved['cell']}"
+    return resolved['query'], f"name:{normalize_location(location)}"
+
+
+def _fetch_weather_forecast(location):
+    """
+    Fetch a forecast (uncached), falling back to the offline store
+    
+    If WeatherAPI fails, the last stored forecast for the coming hours is
+    returned with 'degraded': True and 'staleness' metadata.
     """
+    result = _fetch_from_provider(location)
+    if result['success']:
+        return result
+    
     try:
-        url = f"https://api.weatherapi.com/v1/forecast.json?key={API_KEY}&q={location}&days=2&aqi=no"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Extract current weather
-        current = data['current']
-        current_weather = {
-            'temperature': current['temp_c'],
-            'humidity': current['humidity'],
-            'condition': current['condition']['text'],
-            'wind_kph': current.get('wind_kph', 0),
-            'feels_like': current.get('feelslike_c', current['temp_c'])
-        }
-        
-        # Get current time from API
-        current_time = datetime.strptime(data["location"]["localtime"], "%Y-%m-%d %H:%M")
-        
-        # Extract hourly forecast for next 24 hours
-        hourly_rain_probability = []
-        hourly_precipitation_mm = []
-        
-        for day in data["forecast"]["forecastday"]:
-            for hour in day["hour"]:
-                hour_time = datetime.strptime(hour["time"], "%Y-%m-%d %H:%M")
-                if current_time <= hour_time < current_time + timedelta(hours=24):
-                    # Rain probability (0-100%)
-                    hourly_rain_probability.append(float(hour["chance_of_rain"]))
-                    # Precipitation in mm
-                    hourly_precipitation_mm.append(float(hour["precip_mm"]))
-        
-        # Ensure we have exactly 24 hours (pad with zeros if needed)
-        while len(hourly_rain_probability) < 24:
-            hourly_rain_probability.append(0.0)
-            hourly_precipitation_mm.append(0.0)
-        
-        # Truncate to 24 hours if we have more
-        hourly_rain_probability = hourly_rain_probability[:24]
-        hourly_precipitation_mm = hourly_precipitation_mm[:24]
-        
-        # Calculate total rainfall
-        total_rainfall_24h = sum(hourly_precipitation_mm)
+        offline = get_weather_store().load(normalize_location(location), location)
+    except Exception as e:
+        print(f"⚠️  Offline weather store unavailable: {e}")
+        offline = None
+    if offline is None:
+        return result
+    
+    offline['provider_error'] = result.get('error')
+    print(f"⚠️  Weather provider failed for {location}, serving forecast stored "
+          f"{offline['staleness']['age_minutes']} min ago")
+    return offline
+
+
+def _fetch_from_provider(location):
+    """Fetch and parse a forecast from the weather provider, storing it offline"""
+    try:
+        data = get_weather_provider().fetch(location)
         
-        return {
-            'success': True,
-            'location': location,
-            'current': current_weather,
-            'hourly_rain_probability': hourly_rain_probability,
-            'hourly_precipitation_mm': hourly_precipitation_mm,
-            'total_rainfall_24h': total_rainfall_24h,
-            'timestamp': datetime.now().isoformat()
-        }
+        result = parse_forecast(data, location)
+        try:
+            get_weather_store().save(normalize_location(location), data, result['current'])
+        except Exception as e:
+            print(f"⚠️  Could not store forecast offline: {e}")
+        return result
         
-    except requests.exceptions.RequestException as e:
+    except WeatherProviderError as e:
         print(f"Error fetching weather data: {e}")
         return {
             'success': False,
@@ -98,6 +139,124 @@ def get_weather_forecast(location=DEFAULT_LOCATION):
         }
 
 
+def parse_forecast(data: dict, location: str) -> dict:
+    """
+    Parse a WeatherAPI forecast.json payload
+    
+    The 24-hour window is found by index arithmetic on the epoch fields
+    (hours are consecutive, 3600 s apart) instead of parsing every hour's
+    time string. Rain series are float64 NumPy arrays, zero-padded to 24 hours;
+    temperature, humidity, wind and radiation series are NaN-padded. Reference
+    evapotranspiration (ET0) is computed from them (utils/evapotranspiration.py).
+    """
+    current = data['current']
+    current_weather = {
+        'temperature': current['temp_c'],
+        'humidity': current['humidity'],
+        'condition': current['condition']['text'],
+        'wind_kph': current.get('wind_kph', 0),
+        'feels_like': current.get('feelslike_c', current['temp_c'])
+    }
+    
+    hours = [hour for day in data['forecast']['forecastday'] for hour in day['hour']]
+    # First hour at or after local time (minute precision, like the provider's localtime)
+    now_epoch = data['location']['localtime_epoch'] // 60 * 60
+    start = max(0, -(-(now_epoch - hours[0]['time_epoch']) // 3600)) if hours else 0
+    window = hours[start:start + FORECAST_HOURS]
+    
+    hourly_rain_probability = np.zeros(FORECAST_HOURS)
+    hourly_precipitation_mm = np.zeros(FORECAST_HOURS)
+    n = len(window)
+    hourly_rain_probability[:n] = [hour['chance_of_rain'] for hour in window]
+    hourly_precipitation_mm[:n] = [hour['precip_mm'] for hour in window]
+    
+    # Weather series for ET0; NaN where the provider has no value
+    series = np.full((len(HOURLY_FIELDS), FORECAST_HOURS), np.nan)
+    series[:, :n] = np.array([[hour.get(field, np.nan) for field in HOURLY_FIELDS.values()]
+                              for hour in window], dtype=np.float64).T.reshape(len(HOURLY_FIELDS), n)
+    hourly = dict(zip(HOURLY_FIELDS, series))
+    
+    result = {
+        'success': True,
+        'location': location,
+        'current': current_weather,
+        'hourly_rain_probability': hourly_rain_probability,
+        'hourly_precipitation_mm': hourly_precipitation_mm,
+        'total_rainfall_24h': float(hourly_precipitation_mm.sum()),
+        'max_rain_probability_24h': float(hourly_rain_probability.max()),
+        **{f'hourly_{name}': values for name, values in hourly.items()},
+        'timestamp': datetime.now().isoformat()
+    }
+    
+    # Water demand for the window, computed once per refresh and cached with it
+    if n:
+        hour_epochs = window[0]['time_epoch'] + 3600 * np.arange(n)
+        et0 = compute_et0({name: values[:n] for name, values in hourly.items()}, hour_epochs,
+                          data['location'].get('lat'), data['location'].get('lon'))
+        result['hourly_et0_mm'] = np.zeros(FORECAST_HOURS)
+        result['hourly_et0_mm'][:n] = et0['hourly_et0_mm']
+        result['et0_24h_mm'] = et0['et0_24h_mm']
+        result['et0_method'] = et0['et0_method']
+    return result
+
+
+def prefetch_forecasts(locations, max_workers: int = PREFETCH_WORKERS) -> dict:
+    """
+    Warm the forecast cache for many locations in parallel
+    
+    Locations are de-duplicated by cache key (geohash cell) first, and every
+    fetch goes through the shared quota limiter.
+    
+    Args:
+        locations: Iterable of user location strings
+        max_workers: Concurrent WeatherAPI calls
+        
+    Returns:
+        Counts of cached/fetched/failed cells and the error per failed location
+    """
+    cells = {}
+    for location in locations:
+        if location:
+            query, key = forecast_cache_key(location)
+            cells.setdefault(key, (query, location))
+    
+    cache = get_forecast_cache()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='forecast-prefetch') as pool:
+        futures = {key: pool.submit(cache.warm, query, key) for key, (query, _) in cells.items()}
+        outcomes = {key: future.result() for key, future in futures.items()}
+    
+    counts = {'cached': 0, 'fetched': 0, 'degraded': 0, 'failed': 0}
+    failures = {}
+    for key, outcome in outcomes.items():
+        counts[outcome['status']] += 1
+        if outcome['status'] in ('failed', 'degraded'):
+            failures[cells[key][1]] = outcome.get('error')
+    
+    return {
+        'success': True,
+        'locations': len(cells),
+        **counts,
+        'failures': failures,
+        'elapsed_seconds': round(time.perf_counter() - t0, 3)
+    }
+
+
+# Singleton cache
+_forecast_cache = None
+_forecast_cache_lock = threading.Lock()
+
+
+def get_forecast_cache() -> ForecastCache:
+    """Get the process-wide forecast cache"""
+    global _forecast_cache
+    if _forecast_cache is None:
+        with _forecast_cache_lock:
+            if _forecast_cache is None:
+                _forecast_cache = ForecastCache(_fetch_weather_forecast)
+    return _forecast_cache
+
+
 def get_weather_json(location=DEFAULT_LOCATION):
     """
     Legacy function for backward compatibility
@@ -109,8 +268,8 @@ def get_weather_json(location=DEFAULT_LOCATION):
         legacy_format = {
             "Temperature": f"{result['current']['temperature']}°C",
             "Humidity": f"{result['current']['humidity']}%",
-            "Hourly forecast (chance of rain)": result['hourly_rain_probability'],
-            "Total rainfall (24h)": result['hourly_precipitation_mm']
+            "Hourly forecast (chance of rain)": result['hourly_rain_probability'].tolist(),
+            "Total rainfall (24h)": result['hourly_precipitation_mm'].tolist()
         }
         return json.dumps(legacy_format, ensure_ascii=False)
     else:
@@ -137,7 +296,7 @@ def get_simple_forecast_summary(location=DEFAULT_LOCATION):
     
     Next 24 hours:
     🌧️ Total rainfall: {weather['total_rainfall_24h']:.1f}mm
-    📊 Max rain probability: {max(weather['hourly_rain_probability']):.0f}%
+    📊 Max rain probability: {weather['max_rain_probability_24h']:.0f}%
     
     Hourly breakdown (next 6 hours):
     """
@@ -166,7 +325,7 @@ if __name__ == "__main__":
         print(f"   Temperature: {result['current']['temperature']}°C")
         print(f"   Humidity: {result['current']['humidity']}%")
         print(f"   Total rain (24h): {result['total_rainfall_24h']:.1f}mm")
-        print(f"   Max rain probability: {max(result['hourly_rain_probability']):.0f}%")
+        print(f"   Max rain probability: {result['max_rain_probability_24h']:.0f}%")
         print(f"   Hours of data: {len(result['hourly_rain_probability'])}")
     else:
         print(f"❌ Failed: {result.get('error', 'Unknown error')}")
@@ -0,0 +1,194 @@
+"""
+Forecast Cache
+Shared per-location weather forecast cache
+
+WeatherAPI updates its forecasts hourly, so a forecast fetched at 10:12 is
+served to every farmer at the same location until shortly after 11:00.
+After that it is still served (stale) for a grace period while a single
+background refresh fetches the new hour. Concurrent misses for the same
+location wait for one fetch instead of each calling the API, and share its
+result even when it failed.
+"""
+
+import copy
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+# Provider publishes the new hour a little after the top of the hour
+REFRESH_DELAY_SECONDS = 120
+# Serve an expired forecast this long while it is refreshed in the background
+STALE_WHILE_REVALIDATE_SECONDS = 30 * 60
+# Concurrent misses wait at most this long for the in-flight fetch
+FETCH_WAIT_TIMEOUT_SECONDS = 30
+# A degraded (offline store) forecast is retried against the provider this soon
+DEGRADED_TTL_SECONDS = 5 * 60
+
+
+def next_refresh_time(now: Optional[float] = None) -> float:
+    """Epoch seconds at which a forecast fetched now should be refreshed"""
+    now = time.time() if now is None else now
+    return (now // 3600 + 1) * 3600 + REFRESH_DELAY_SECONDS
+
+
+def normalize_location(location: str) -> str:
+    """Cache key for a location string"""
+    return ' '.join(str(location).split()).lower()
+
+
+class _Entry:
+    def __init__(self):
+        self.forecast = None
+        self.expires_at = 0.0
+        self.refreshing = False
+        self.fetched = threading.Event()
+        self.result = None          # Outcome of the last fetch, for its waiters
+
+
+class ForecastCache:
+    """
+    Thread-safe location -> forecast cache
+
+    Only successful forecasts are cached; a failed fetch is returned to its
+    caller and the requests waiting on it, and the next request tries again. Degraded forecasts served from
+    the offline store are cached for a few minutes only.
+    """
+
+    def __init__(self, fetch: Callable[[str], Dict],
+                 stale_seconds: int = STALE_WHILE_REVALIDATE_SECONDS):
+        self._fetch = fetch
+        self.stale_seconds = stale_seconds
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _Entry] = {}
+        self._stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'waits': 0,
+                       'fetches': 0, 'fetch_failures': 0, 'background_refreshes': 0}
+
+    def get(self, location: str, key: Optional[str] = None) -> Dict:
+        """
+        Forecast for a location, from cache when possible
+
+        Args:
+            location: What to fetch from the provider
+            key: Cache key (default: the normalized location)
+        """
+        key = key or normalize_location(location)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+
+            if entry.forecast is not None and now < entry.expires_at:
+                self._stats['hits'] += 1
+                return copy.deepcopy(entry.forecast)
+
+            if entry.forecast is not None and now < entry.expires_at + self.stale_seconds:
+                self._stats['stale_hits'] += 1
+                if not entry.refreshing:
+                    entry.refreshing = True
+                    entry.fetched.clear()
+                    self._stats['background_refreshes'] += 1
+                    threading.Thread(target=self._refresh, args=(key, location, entry),
+                                     name='forecast-refresh', daemon=True).start()
+                return copy.deepcopy(entry.forecast)
+
+            if entry.refreshing:
+                # Single flight: someone is already fetching this location
+                self._stats['waits'] += 1
+                leader = False
+            else:
+                self._stats['misses'] += 1
+                entry.refreshing = True
+                entry.fetched.clear()
+                leader = True
+
+        if leader:
+            return self._refresh(key, location, entry)
+
+        finished = entry.fetched.wait(FETCH_WAIT_TIMEOUT_SECONDS)
+        with self._lock:
+            if entry.forecast is not None and time.time() < entry.expires_at + self.stale_seconds:
+                return copy.deepcopy(entry.forecast)
+            if finished and entry.result is not None:
+                # The fetch we waited for failed: share its failure rather
+                # than stampede a provider that is already failing
+                return copy.deepcopy(entry.result)
+        return {'success': False, 'error': 'Timed out waiting for the weather fetch',
+                'message': 'Error fetching weather data'}
+
+    def warm(self, location: str, key: Optional[str] = None) -> Dict:
+        """
+        Make sure a fresh forecast is cached, fetching synchronously if needed
+
+        Used by bulk prefetch: unlike get(), an expired entry is refreshed in
+        the calling thread rather than in a new background thread.
+
+        Returns:
+            {'status': 'cached' | 'fetched' | 'degraded' | 'failed', 'error': ...}
+        """
+        key = key or normalize_location(location)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+            if entry.forecast is not None and time.time() < entry.expires_at:
+                return {'status': 'cached'}
+            leader = not entry.refreshing
+            if leader:
+                entry.refreshing = True
+                entry.fetched.clear()
+
+        if leader:
+            result = self._refresh(key, location, entry)
+        else:
+            entry.fetched.wait(FETCH_WAIT_TIMEOUT_SECONDS)
+            with self._lock:
+                fresh = entry.forecast is not None and time.time() < entry.expires_at
+            return {'status': 'cached'} if fresh else {'status': 'failed', 'error': 'Concurrent fetch failed'}
+
+        if result.get('degraded'):
+            return {'status': 'degraded', 'error': result.get('provider_error')}
+        if result.get('success'):
+            return {'status': 'fetched'}
+        return {'status': 'failed', 'error': result.get('error', 'Unknown error')}
+
+    def _fetch_counted(self, location: str) -> Dict:
+        result = self._fetch(location)
+        with self._lock:
+            self._stats['fetches'] += 1
+            if not result.get('success'):
+                self._stats['fetch_failures'] += 1
+        return result
+
+    def _refresh(self, key: str, location: str, entry: _Entry) -> Dict:
+        try:
+            result = self._fetch_counted(location)
+        except Exception as e:
+            result = {'success': False, 'error': str(e), 'message': 'Error fetching weather data'}
+        with self._lock:
+            if result.get('success'):
+                entry.forecast = result
+                entry.expires_at = time.time() + DEGRADED_TTL_SECONDS if result.get('degraded') \
+                    else next_refresh_time()
+            entry.result = result
+            entry.refreshing = False
+            entry.fetched.set()
+        return copy.deepcopy(result)
+
+    def invalidate(self, key: Optional[str] = None):
+        """Drop one cache key, or everything"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['locations'] = sum(1 for e in self._entries.values() if e.forecast is not None)
+        served = stats['hits'] + stats['stale_hits'] + stats['misses'] + stats['waits']
+        stats['hit_rate'] = round((stats['hits'] + stats['stale_hits'] + stats['waits']) / served, 3) \
+            if served else None
+        return stats
@@ -364,6 +364,11 @@ Hourly Details (showing hours with >30% rain probability):"""
         weather_summary = self.format_weather_summary(rain_probability_24h, precipitation_mm_24h)
         print(weather_summary)
         
+        # Forecast water demand, when the forecast carried the inputs for it
+        et0_24h = sensor_data.get('et0_24h_mm')
+        et0_line = (f"- Reference Evapotranspiration (ET0, next 24h): {et0_24h:.1f}mm "
+                    f"(water the crop loses to heat, sun and wind)\n") if et0_24h is not None else ""
+        
         # Prepare prompt for Gemini
         user_prompt = f"""## STAGE 1: XGBoost Model Predictions
 
@@ -385,7 +390,7 @@ Hourly Details (showing hours with >30% rain probability):"""
 - Soil Type: {sensor_data.get('soil_type', 'unknown')} (encoded: {sensor_data['soil_type_encoded']})
 - Soil Compaction: {sensor_data['soil_compaction']:.1f}%
 - Slope: {sensor_data['slope_degrees']:.1f}°
-
+{et0_line}
 ## {weather_summary}
 
 ## YOUR TASK
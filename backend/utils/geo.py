@@ -0,0 +1,149 @@
+"""
+Location Normalization
+Resolves free-text user locations to canonical geohash cells
+
+User locations are free text ("Tunis", "Ben Arous", "Gabès", "تونس",
+"36.8065,10.1815"). Names are looked up in a bundled gazetteer of Tunisian
+towns (data/tunisia_locations.json, no network) and coordinates are used
+as-is; both map to a geohash cell. Farms in the same cell share one
+forecast, fetched for the first gazetteer town in the cell.
+"""
+
+import json
+import os
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'tunisia_locations.json')
+
+# Geohash precision 4 cells are ~20 km x 30 km at Tunisian latitudes:
+# about the resolution of the forecast model, so farms inside one cell
+# would get the same forecast anyway
+GEOHASH_PRECISION = 4
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_COORDINATES = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*[,;\s]\s*(-?\d+(?:\.\d+)?)\s*$')
+_COUNTRY_WORDS = {'tunisia', 'tunisie', 'tn', 'تونس الجمهورية'}
+_PREFIXES = ('gouvernorat de ', 'governorate of ', 'gouvernorat ', 'wilayat ', 'delegation de ')
+
+
+def geohash_encode(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Standard base32 geohash of a point"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits, bit_count, even = 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+
+def geohash_center(cell: str) -> Tuple[float, float]:
+    """Center (lat, lon) of a geohash cell"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in cell:
+        value = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lon_range[0] + lon_range[1]) / 2
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase, strip accents/diacritics and punctuation, collapse spaces"""
+    text = unicodedata.normalize('NFKD', str(name))
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    text = re.sub(r"[\-_'’`.]", ' ', text)
+    return ' '.join(text.split())
+
+
+@lru_cache(maxsize=1)
+def _gazetteer() -> Tuple[Dict[str, Dict], Dict[str, Dict]]:
+    """(normalized name/alias -> entry, cell -> representative town)"""
+    with open(GAZETTEER_PATH, 'r', encoding='utf-8') as f:
+        locations = json.load(f)['locations']
+    index = {}
+    representatives = {}
+    for entry in locations:
+        for name in [entry['name']] + entry.get('aliases', []):
+            key = normalize_name(name)
+            index.setdefault(key, entry)
+            index.setdefault(key.replace(' ', ''), entry)
+        # First town listed in a cell (governorate capitals come first)
+        representatives.setdefault(geohash_encode(entry['lat'], entry['lon']), entry)
+    return index, representatives
+
+
+def _lookup_name(text: str) -> Optional[Dict]:
+    index = _gazetteer()[0]
+    parts = [normalize_name(p) for p in text.split(',')]
+    parts = [p for p in parts if p and p not in _COUNTRY_WORDS]
+    for candidate in [' '.join(parts)] + parts:
+        for prefix in _PREFIXES:
+            if candidate.startswith(prefix):
+                candidate = candidate[len(prefix):]
+        entry = index.get(candidate) or index.get(candidate.replace(' ', ''))
+        if entry:
+            return entry
+    return None
+
+
+@lru_cache(maxsize=4096)
+def resolve_location(location: str) -> Dict:
+    """
+    Canonical cell for a free-text location
+
+    Args:
+        location: Town name (any spelling in the gazetteer) or "lat,lon"
+
+    Returns:
+        {'cell': geohash or None, 'query': what to ask the weather provider,
+         'name': matched town or None, 'resolved': bool}
+        Unknown names get no cell and are queried as written.
+    """
+    text = str(location or '').strip()
+
+    match = _COORDINATES.match(text)
+    if match:
+        lat, lon = float(match.group(1)), float(match.group(2))
+        if -90 <= lat <= 90 and -180 <= lon <= 180:
+            return _cell_result(lat, lon, None)
+
+    entry = _lookup_name(text)
+    if entry:
+        return _cell_result(entry['lat'], entry['lon'], entry['name'])
+
+    return {'cell': None, 'query': text, 'name': None, 'resolved': False}
+
+
+def _cell_result(lat: float, lon: float, name: Optional[str]) -> Dict:
+    cell = geohash_encode(lat, lon)
+    # Forecast the cell at a known town rather than its center, which may be
+    # offshore or in the mountains
+    town = _gazetteer()[1].get(cell)
+    query_lat, query_lon = (town['lat'], town['lon']) if town else geohash_center(cell)
+    return {
+        'cell': cell,
+        'query': f'{query_lat:.4f},{query_lon:.4f}',
+        'name': name,
+        'resolved': True
+    }
@@ -0,0 +1,292 @@
+"""
+Idempotency Store
+Replays stored responses for retried requests carrying the same key
+
+A Pi whose request times out retries /decision with the same Idempotency-Key.
+The first request computes the response; concurrent duplicates wait for it,
+later duplicates get the stored bytes back. Completed responses are kept in
+memory and in Firestore (idempotency_keys) so every worker can replay them.
+
+Before computing, a worker claims the key by creating its document as an
+"in progress" marker. A duplicate on another worker finds the marker and
+polls until the response is stored; if the claiming worker dies, the claim
+lapses after WAIT_TIMEOUT_SECONDS and the duplicate takes over.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional, Tuple
+
+from google.api_core.exceptions import AlreadyExists
+
+# Handle imports for running from backend/ or parent directory
+try:
+    from utils.firebase_client import get_db
+except ImportError:
+    from backend.utils.firebase_client import get_db
+
+IDEMPOTENCY_COLLECTION = 'idempotency_keys'
+TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 24 * 3600))
+# A duplicate waits at most this long for the in-flight request (Gemini can be slow)
+WAIT_TIMEOUT_SECONDS = 90
+# Polling for a response another worker is computing (backs off to the max)
+POLL_INTERVAL_SECONDS = 0.1
+MAX_POLL_INTERVAL_SECONDS = 1.0
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyKeyConflict(Exception):
+    """The key was already used with a different request body"""
+
+
+class _Entry:
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        self.status = None
+        self.body = None
+        self.expires_at = None
+        self.claimed = False    # This worker holds the Firestore "in progress" marker
+
+
+class IdempotencyStore:
+    """
+    Maps (scope, key) to a stored (status, body) response
+
+    Only responses with status < 500 are stored: a server error is worth
+    retrying for real.
+    """
+
+    def __init__(self, ttl_seconds: int = TTL_SECONDS, persist: bool = True):
+        self.ttl_seconds = ttl_seconds
+        self.persist = persist
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _Entry] = {}
+        self._stats = {'computed': 0, 'replayed': 0, 'waited': 0, 'conflicts': 0}
+
+    def run(self, scope: str, key: str, request_body: bytes,
+            compute: Callable[[], Tuple[int, bytes]]) -> Tuple[int, bytes, bool]:
+        """
+        Compute a response once per key
+
+        Args:
+            scope: Namespace, e.g. "decision:<user_id>"
+            key: Client-supplied idempotency key
+            request_body: Raw request body (a reused key must carry the same body)
+            compute: Produces (status, body bytes) for the first request
+
+        Returns:
+            (status, body, replayed)
+
+        Raises:
+            IdempotencyKeyConflict: key reused with a different body
+        """
+        entry_id = hashlib.sha256(f'{scope}:{key}'.encode('utf-8')).hexdigest()
+        fingerprint = hashlib.sha256(request_body or b'').hexdigest()
+
+        while True:
+            with self._lock:
+                self._purge_expired()
+                entry = self._entries.get(entry_id)
+                if entry is None:
+                    entry = _Entry(fingerprint)
+                    self._entries[entry_id] = entry
+                    leader = True
+                else:
+                    leader = False
+
+            if leader:
+                return self._lead(entry_id, entry, compute)
+
+            if entry.fingerprint != fingerprint:
+                self._count('conflicts')
+                raise IdempotencyKeyConflict(f'Idempotency key {key!r} was used with a different request')
+
+            if not entry.done.is_set():
+                self._count('waited')
+                entry.done.wait(WAIT_TIMEOUT_SECONDS)
+
+            if entry.body is not None:
+                self._count('replayed')
+                return entry.status, entry.body, True
+            # The first attempt failed or timed out without a storable result:
+            # loop and compute it ourselves
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), ttl_seconds=self.ttl_seconds)
+
+    # ------------------------------------------------------------------
+
+    def _lead(self, entry_id: str, entry: _Entry, compute) -> Tuple[int, bytes, bool]:
+        try:
+            stored = self._claim(entry_id, entry)
+            if stored is not None:
+                entry.status, entry.body = stored['status'], stored['body']
+                entry.expires_at = stored['expires_at']
+                entry.done.set()
+                self._count('replayed')
+                return entry.status, entry.body, True
+
+            status, body = compute()
+            self._count('computed')
+        except BaseException:
+            self._discard(entry_id, entry)
+            raise
+
+        if status >= 500:
+            self._discard(entry_id, entry)
+            return status, body, False
+
+        entry.status, entry.body = status, body
+        entry.expires_at = time.time() + self.ttl_seconds
+        entry.done.set()
+        self._save(entry_id, entry)
+        return status, body, False
+
+    def _claim(self, entry_id: str, entry: _Entry) -> Optional[Dict]:
+        """
+        Claim the key across workers, or wait for the worker that holds it
+
+        Returns:
+            The stored response, or None once this worker should compute it
+
+        Raises:
+            IdempotencyKeyConflict: key reused with a different body
+        """
+        if not self.persist:
+            return None
+        ref = get_db().collection(IDEMPOTENCY_COLLECTION).document(entry_id)
+        delay = POLL_INTERVAL_SECONDS
+        waited = False
+        # Bounded even if Firestore keeps failing between create() and get()
+        deadline = time.monotonic() + 2 * WAIT_TIMEOUT_SECONDS
+
+        while time.monotonic() < deadline:
+            try:
+                ref.create(self._marker(entry))
+                entry.claimed = True
+                return None
+            except AlreadyExists:
+                pass
+            except Exception as e:
+                # Compute anyway: retries hitting this worker are still de-duplicated
+                print(f"⚠️  Could not claim idempotency key: {e}")
+                return None
+
+            stored = self._load(entry_id)
+            if stored is None:
+                continue  # Released (the holder failed) or unreadable: try to claim again
+
+            now = time.time()
+            if stored['status'] is not None and stored['expires_at'] >= now:
+                if stored['fingerprint'] != entry.fingerprint:
+                    self._count('conflicts')
+                    raise IdempotencyKeyConflict('Idempotency key was used with a different request')
+                return stored
+            if stored['status'] is None and stored['claim_expires_at'] >= now:
+                if stored['fingerprint'] != entry.fingerprint:
+                    self._count('conflicts')
+                    raise IdempotencyKeyConflict('Idempotency key was used with a different request')
+                if not waited:
+                    self._count('waited')
+                    waited = True
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_POLL_INTERVAL_SECONDS)
+                continue
+
+            # Expired response (Firestore TTL deletion is lazy) or abandoned claim
+            try:
+                ref.set(self._marker(entry))
+                entry.claimed = True
+            except Exception as e:
+                print(f"⚠️  Could not claim idempotency key: {e}")
+            return None
+
+        return None
+
+    def _marker(self, entry: _Entry) -> Dict:
+        """"In progress" document: the claim lapses if the worker dies"""
+        now = datetime.now(timezone.utc)
+        return {
+            'fingerprint': entry.fingerprint,
+            'status': None,
+            'claim_expires_at': now + timedelta(seconds=WAIT_TIMEOUT_SECONDS),
+            'expires_at': now + timedelta(seconds=self.ttl_seconds)
+        }
+
+    def _discard(self, entry_id: str, entry: _Entry):
+        with self._lock:
+            if self._entries.get(entry_id) is entry:
+                del self._entries[entry_id]
+        if entry.claimed:
+            # Release the claim so a duplicate on another worker computes it
+            entry.claimed = False
+            try:
+                get_db().collection(IDEMPOTENCY_COLLECTION).document(entry_id).delete()
+            except Exception as e:
+                print(f"⚠️  Could not release idempotency key: {e}")
+        entry.done.set()
+
+    def _purge_expired(self):
+        now = time.time()
+        expired = [k for k, e in self._entries.items() if e.expires_at is not None and e.expires_at < now]
+        for k in expired:
+            del self._entries[k]
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _load(self, entry_id: str) -> Optional[Dict]:
+        """Read the key's document: a stored response, or a claim (status None)"""
+        try:
+            doc = get_db().collection(IDEMPOTENCY_COLLECTION).document(entry_id).get()
+        except Exception as e:
+            print(f"⚠️  Idempotency lookup failed: {e}")
+            return None
+        if not doc.exists:
+            return None
+        data = doc.to_dict()
+        claim_expires_at = data.get('claim_expires_at')
+        return {
+            'fingerprint': data['fingerprint'],
+            'status': data.get('status'),
+            'body': data.get('body'),
+            'expires_at': data['expires_at'].timestamp(),
+            'claim_expires_at': claim_expires_at.timestamp() if claim_expires_at else 0.0
+        }
+
+    def _save(self, entry_id: str, entry: _Entry):
+        if not self.persist:
+            return
+        try:
+            get_db().collection(IDEMPOTENCY_COLLECTION).document(entry_id).set({
+                'fingerprint': entry.fingerprint,
+                'status': entry.status,
+                'body': entry.body,
+                # Timestamp field so a Firestore TTL policy can expire the document
+                'expires_at': datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds)
+            })
+            entry.claimed = False
+        except Exception as e:
+            # The in-memory copy still de-duplicates retries hitting this worker
+            print(f"⚠️  Could not persist idempotency key: {e}")
+
+
+# Singleton store
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """Get the process-wide idempotency store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = IdempotencyStore()
+    return _store
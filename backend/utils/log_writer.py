@@ -0,0 +1,464 @@
+"""
+Irrigation Log Writer
+Write-behind queue for irrigation_logs persistence
+
+Decisions and valve actions enqueue their log document and return immediately.
+A background thread flushes the queue to Firestore in batches. Every queued
+log is also appended to a local spool file so logs survive a process restart,
+and logs that are queued but not yet committed are visible to history reads.
+
+Each batch also carries the rollup increments of its logs. How a log maps
+to rollups belongs to the service layer: services/rollup_service.py
+registers it with set_rollup_hook(), and nothing is flushed until it has.
+"""
+
+import atexit
+import json
+import os
+import secrets
+import string
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional
+
+# Handle imports for running from backend/ or parent directory
+try:
+    from utils.firebase_client import get_db
+except ImportError:
+    from backend.utils.firebase_client import get_db
+
+from google.api_core.exceptions import AlreadyExists, InvalidArgument
+
+LOGS_COLLECTION = 'irrigation_logs'
+FIRESTORE_BATCH_LIMIT = 500
+
+SPOOL_PATH = os.environ.get(
+    'LOG_SPOOL_PATH',
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'spool', 'irrigation_logs.jsonl')
+)
+# Logs Firestore rejected (invalid data), kept for inspection instead of retried
+REJECTED_PATH = os.environ.get('LOG_REJECTED_PATH', os.path.splitext(SPOOL_PATH)[0] + '.rejected.jsonl')
+MAX_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_MAX_SIZE', 10000))
+# Logs per batch. Each batch also carries one rollup write per distinct
+# user-day and day, and is cut short to stay within Firestore's 500 writes
+BATCH_SIZE = min(int(os.environ.get('LOG_QUEUE_BATCH_SIZE', 200)), 240)
+FLUSH_INTERVAL_SECONDS = float(os.environ.get('LOG_QUEUE_FLUSH_INTERVAL', 1.0))
+ENQUEUE_TIMEOUT_SECONDS = 2.0
+RETRY_BACKOFF_SECONDS = 5.0
+
+_ID_ALPHABET = string.ascii_letters + string.digits
+
+# (doc_paths, add_writes) registered by services/rollup_service.py
+_rollup_hook = None
+
+
+def set_rollup_hook(doc_paths: Callable[[Dict], List[str]], add_writes: Callable):
+    """
+    Register how committed logs update the rollups
+
+    Args:
+        doc_paths: log_data -> paths of the rollup documents it increments
+        add_writes: (db, batch, logs) -> adds the logs' increments to batch
+    """
+    global _rollup_hook
+    _rollup_hook = (doc_paths, add_writes)
+
+
+def new_log_id() -> str:
+    """Generate a Firestore-style 20 character document ID locally (no RPC)"""
+    return ''.join(secrets.choice(_ID_ALPHABET) for _ in range(20))
+
+
+def _json_default(value):
+    """Serialize numpy scalars and other odd values found in decision payloads"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class IrrigationLogWriter:
+    """
+    Bounded write-behind queue for irrigation log documents
+
+    - enqueue() appends to the spool and returns without any Firestore RPC
+    - A daemon thread commits queued logs in batches of BATCH_SIZE
+    - Committed IDs are acknowledged in the spool; the spool is truncated
+      whenever the queue drains
+    - Logs Firestore rejects as invalid are moved to the rejected file
+      (and acknowledged) instead of blocking the queue
+    - Unacknowledged spool entries are re-queued on startup
+    """
+
+    def __init__(self, spool_path: str = SPOOL_PATH, max_queue_size: int = MAX_QUEUE_SIZE,
+                 batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL_SECONDS,
+                 rejected_path: Optional[str] = None):
+        self.spool_path = os.path.abspath(spool_path)
+        if rejected_path is None:
+            rejected_path = REJECTED_PATH if spool_path == SPOOL_PATH \
+                else os.path.splitext(spool_path)[0] + '.rejected.jsonl'
+        self.rejected_path = os.path.abspath(rejected_path)
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._wakeup = threading.Event()
+        self._stopped = False
+
+        # log_id -> log data, for every log not yet committed (queued or in flight)
+        self._pending: "OrderedDict[str, Dict]" = OrderedDict()
+        # log_ids waiting to be picked up by the flush thread
+        self._queue: deque = deque()
+
+        self._stats = {
+            'total_enqueued': 0,
+            'total_flushed': 0,
+            'total_sync_writes': 0,
+            'flush_count': 0,
+            'flush_failures': 0,
+            'last_flush_latency_ms': None,
+            'total_flush_latency_ms': 0.0,
+            'max_flush_latency_ms': 0.0,
+            'last_flush_at': None,
+            'last_error': None,
+            'rejected_logs': 0,
+            'recovered_from_spool': 0
+        }
+
+        os.makedirs(os.path.dirname(self.spool_path), exist_ok=True)
+        self._recover_spool()
+        self._spool = open(self.spool_path, 'a', encoding='utf-8')
+
+        self._thread = threading.Thread(target=self._run, name='irrigation-log-writer', daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def enqueue(self, log_data: Dict, log_id: Optional[str] = None) -> str:
+        """
+        Queue a log document for asynchronous persistence
+
+        Blocks for at most ENQUEUE_TIMEOUT_SECONDS when the queue is full,
+        then falls back to a synchronous write so no log is ever dropped.
+
+        Returns:
+            Document ID the log will be stored under
+        """
+        log_id = log_id or new_log_id()
+
+        with self._not_full:
+            if len(self._pending) >= self.max_queue_size:
+                self._not_full.wait_for(lambda: len(self._pending) < self.max_queue_size,
+                                        timeout=ENQUEUE_TIMEOUT_SECONDS)
+
+            if len(self._pending) >= self.max_queue_size:
+                queue_full = True
+            else:
+                queue_full = False
+                self._append_spool({'id': log_id, 'data': log_data})
+                self._pending[log_id] = log_data
+                self._queue.append(log_id)
+                self._stats['total_enqueued'] += 1
+
+        if queue_full:
+            # Backpressure exhausted: write inline rather than lose the log
+            _write_logs([(log_id, log_data)])
+            with self._lock:
+                self._stats['total_sync_writes'] += 1
+        elif len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+        return log_id
+
+    def get_pending_logs(self, user_id: str) -> List[Dict]:
+        """
+        Get uncommitted logs for a user (newest first)
+
+        Each log carries its document ID under 'log_id' so callers can
+        de-duplicate against what they read from Firestore.
+        """
+        with self._lock:
+            pending = [
+                dict(data, log_id=log_id)
+                for log_id, data in self._pending.items()
+                if data.get('user_id') == user_id
+            ]
+        pending.sort(key=lambda log: (log.get('timestamp', ''), log['log_id']), reverse=True)
+        return pending
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Block until every queued log is committed (or timeout). Returns True if drained."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not self._pending:
+                    return True
+            self._wakeup.set()
+            time.sleep(0.05)
+        return False
+
+    def get_stats(self) -> Dict:
+        """Queue depth and flush latency metrics"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['queue_depth'] = len(self._pending)
+            stats['max_queue_size'] = self.max_queue_size
+            stats['batch_size'] = self.batch_size
+            stats['spool_path'] = self.spool_path
+            stats['rejected_path'] = self.rejected_path
+
+        if stats['flush_count']:
+            stats['avg_flush_latency_ms'] = round(stats['total_flush_latency_ms'] / stats['flush_count'], 2)
+        else:
+            stats['avg_flush_latency_ms'] = None
+        del stats['total_flush_latency_ms']
+        return stats
+
+    def stop(self, timeout: float = 10.0):
+        """Drain the queue and stop the flush thread"""
+        self.flush(timeout)
+        self._stopped = True
+        self._wakeup.set()
+        self._thread.join(timeout=timeout)
+
+    # ------------------------------------------------------------------
+    # Flush loop
+    # ------------------------------------------------------------------
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if _rollup_hook is None:
+                continue  # Logs committed now would miss their rollups
+
+            while True:
+                with self._lock:
+                    batch = self._next_batch()
+                if not batch:
+                    break
+                if not self._commit_batch(batch):
+                    time.sleep(RETRY_BACKOFF_SECONDS)
+                    break
+
+    def _next_batch(self):
+        """
+        Pop up to batch_size logs whose writes (logs + rollups) fit in one
+        Firestore batch (call with self._lock held)
+        """
+        doc_paths = _rollup_hook[0]
+        batch = []
+        rollup_docs = set()
+        while self._queue and len(batch) < self.batch_size:
+            log_id = self._queue[0]
+            data = self._pending[log_id]
+            new_docs = [path for path in doc_paths(data) if path not in rollup_docs]
+            if batch and len(batch) + 1 + len(rollup_docs) + len(new_docs) > FIRESTORE_BATCH_LIMIT:
+                break
+            self._queue.popleft()
+            rollup_docs.update(new_docs)
+            batch.append((log_id, data))
+        return batch
+
+    def _commit_batch(self, batch) -> bool:
+        start = time.perf_counter()
+        try:
+            _write_logs(batch)
+        except (InvalidArgument, TypeError, ValueError) as e:
+            # Retrying cannot help: commit what is valid, set the rest aside
+            print(f"⚠️  Irrigation log flush rejected ({len(batch)} logs): {e}")
+            return self._commit_valid(batch)
+        except Exception as e:
+            print(f"⚠️  Irrigation log flush failed ({len(batch)} logs), will retry: {e}")
+            with self._lock:
+                # Put the batch back at the front, preserving order
+                self._queue.extendleft(reversed([log_id for log_id, _ in batch]))
+                self._stats['flush_failures'] += 1
+                self._stats['last_error'] = str(e)
+            return False
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        with self._not_full:
+            for log_id, _ in batch:
+                self._pending.pop(log_id, None)
+            self._append_spool({'ack': [log_id for log_id, _ in batch]})
+            if not self._pending:
+                self._truncate_spool()
+
+            self._stats['total_flushed'] += len(batch)
+            self._stats['flush_count'] += 1
+            self._stats['last_flush_latency_ms'] = round(latency_ms, 2)
+            self._stats['total_flush_latency_ms'] += latency_ms
+            self._stats['max_flush_latency_ms'] = round(max(self._stats['max_flush_latency_ms'], latency_ms), 2)
+            self._stats['last_flush_at'] = time.time()
+            self._not_full.notify_all()
+        return True
+
+    def _commit_valid(self, batch) -> bool:
+        """
+        Commit a rejected batch one log at a time; move invalid logs to the rejected file
+
+        Returns:
+            False if a transient error left logs queued for the next flush
+        """
+        committed, rejected = [], []
+        requeued = False
+        for log_id, data in batch:
+            try:
+                _write_logs([(log_id, data)])
+                committed.append(log_id)
+            except (InvalidArgument, TypeError, ValueError) as e:
+                rejected.append({'id': log_id, 'data': data, 'error': str(e)})
+            except Exception as e:
+                # Transient: leave it (and everything after it) for the next flush
+                with self._lock:
+                    done = len(committed) + len(rejected)
+                    self._queue.extendleft(reversed([log_id for log_id, _ in batch[done:]]))
+                    self._stats['flush_failures'] += 1
+                    self._stats['last_error'] = str(e)
+                requeued = True
+                break
+
+        with self._not_full:
+            if rejected:
+                with open(self.rejected_path, 'a', encoding='utf-8') as f:
+                    for record in rejected:
+                        f.write(json.dumps(record, ensure_ascii=False, default=_json_default) + '\n')
+                self._stats['rejected_logs'] += len(rejected)
+                self._stats['last_error'] = rejected[-1]['error']
+            done_ids = committed + [record['id'] for record in rejected]
+            for log_id in done_ids:
+                self._pending.pop(log_id, None)
+            if done_ids:
+                self._append_spool({'ack': done_ids})
+            if not self._pending:
+                self._truncate_spool()
+            self._stats['total_flushed'] += len(committed)
+            self._not_full.notify_all()
+        return not requeued
+
+    # ------------------------------------------------------------------
+    # Spool (must be called with self._lock held, except during __init__)
+    # ------------------------------------------------------------------
+
+    def _append_spool(self, record: Dict):
+        self._spool.write(json.dumps(record, ensure_ascii=False, default=_json_default) + '\n')
+        self._spool.flush()
+
+    def _truncate_spool(self):
+        self._spool.seek(0)
+        self._spool.truncate()
+
+    def _recover_spool(self):
+        """Re-queue logs that were spooled but never acknowledged"""
+        if not os.path.exists(self.spool_path):
+            return
+
+        entries: "OrderedDict[str, Dict]" = OrderedDict()
+        with open(self.spool_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn write from a crash
+                if 'ack' in record:
+                    for log_id in record['ack']:
+                        entries.pop(log_id, None)
+                elif 'id' in record:
+                    entries[record['id']] = record['data']
+
+        # Rewrite the spool with only the live entries
+        with open(self.spool_path, 'w', encoding='utf-8') as f:
+            for log_id, data in entries.items():
+                f.write(json.dumps({'id': log_id, 'data': data}, ensure_ascii=False) + '\n')
+
+        for log_id, data in entries.items():
+            self._pending[log_id] = data
+            self._queue.append(log_id)
+
+        if entries:
+            self._stats['recovered_from_spool'] = len(entries)
+            print(f"📦 Recovered {len(entries)} unflushed irrigation logs from spool")
+
+
+def _write_logs(logs):
+    """
+    Commit (log_id, data) pairs and their rollup increments in one atomic batch
+
+    Logs are created, never overwritten. If some already exist (a batch
+    replayed from the spool after a crash between commit and ack), they are
+    dropped and the rest committed again, so every log's increments apply
+    exactly once.
+    """
+    db = get_db()
+    add_writes = _rollup_hook[1]
+    logs = list(logs)
+    while logs:
+        write_batch = db.batch()
+        for log_id, data in logs:
+            write_batch.create(db.collection(LOGS_COLLECTION).document(log_id), data)
+        add_writes(db, write_batch, [data for _, data in logs])
+        try:
+            write_batch.commit()
+            return
+        except AlreadyExists:
+            refs = [db.collection(LOGS_COLLECTION).document(log_id) for log_id, _ in logs]
+            committed = {snap.id for snap in db.get_all(refs, field_paths=[]) if snap.exists}
+            if not committed:
+                raise
+            logs = [(log_id, data) for log_id, data in logs if log_id not in committed]
+
+
+# Singleton writer (started lazily)
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_log_writer() -> IrrigationLogWriter:
+    """Get the process-wide irrigation log writer"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = IrrigationLogWriter()
+                atexit.register(_writer.stop)
+    return _writer
+
+
+def enqueue_irrigation_log(log_data: Dict) -> str:
+    """Queue an irrigation log document for write-behind persistence"""
+    return get_log_writer().enqueue(log_data)
+
+
+def get_pending_logs(user_id: str) -> List[Dict]:
+    """Get a user's queued-but-uncommitted logs, newest first"""
+    return get_log_writer().get_pending_logs(user_id)
+
+
+def merge_pending_logs(committed: List[Dict], pending: List[Dict], limit: int) -> List[Dict]:
+    """
+    Merge uncommitted logs into logs read from Firestore (read-your-writes)
+
+    Take the pending snapshot BEFORE querying Firestore: a log committed in
+    between then shows up in both lists and is de-duplicated by log_id,
+    instead of being missing from both.
+
+    Args:
+        committed: Logs read from Firestore, newest first, each with 'log_id'
+        pending: Result of get_pending_logs() for the same user
+        limit: Maximum number of logs to return
+
+    Returns:
+        Merged list, newest first
+    """
+    if not pending:
+        return committed[:limit]
+
+    seen = {log.get('log_id') for log in committed}
+    merged = committed + [log for log in pending if log['log_id'] not in seen]
+    merged.sort(key=lambda log: (log.get('timestamp', ''), log.get('log_id') or ''), reverse=True)
+    return merged[:limit]
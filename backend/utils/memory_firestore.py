@@ -0,0 +1,943 @@
+"""
+In-Memory Firestore
+Thread-safe stand-in for the Firestore client, for offline benchmarks and load tests
+
+Implements the part of the google-cloud-firestore API the backend uses:
+collection/document references, get/set(merge)/update/delete, queries with
+where, order_by, limit, offset, start_after, select and count, batched
+writes, transactions (@firestore.transactional), get_all, document
+listeners (on_snapshot, delivered synchronously after each commit: the local
+change feed), and the DELETE_FIELD / ArrayUnion / ArrayRemove /
+Increment / SERVER_TIMESTAMP transforms. Query semantics follow Firestore:
+documents missing a filtered or ordered field are excluded, results are
+ordered by document ID after the explicit orderings, and mixed types sort by
+Firestore's type order.
+
+Every call is counted the way Firestore bills and meters it (RPCs by method,
+document reads, writes and deletes, and the size of the documents returned),
+so tests can assert per-endpoint read and write budgets:
+
+    db = MemoryFirestore()
+    with db.measure() as ops:
+        get_valve_status('user_1')
+    assert ops['reads'] <= 1 and ops['writes'] == 0
+
+The whole store can be saved to and loaded from a snapshot file (gzipped
+JSON lines, one document per line), e.g. a synthetic fleet written by
+generate_fleet.py; STORAGE_BACKEND=memory loads MEMORY_SNAPSHOT at startup.
+"""
+
+import bisect
+import copy
+import gzip
+import heapq
+import itertools
+import json
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+
+from google.api_core.exceptions import Aborted, AlreadyExists, InvalidArgument, NotFound
+from google.cloud.firestore_v1 import transforms
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+MAX_BATCH_WRITES = 500
+DOCUMENT_ID = '__name__'
+ASCENDING = 'ASCENDING'
+DESCENDING = 'DESCENDING'
+
+_MISSING = object()
+
+
+# ----------------------------------------------------------------------------
+# Values
+# ----------------------------------------------------------------------------
+
+def _type_rank(value) -> int:
+    """Firestore's cross-type ordering"""
+    rank = _TYPE_RANKS.get(type(value))
+    if rank is not None:
+        return rank
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, datetime):
+        return 3
+    if isinstance(value, str):
+        return 4
+    if isinstance(value, bytes):
+        return 5
+    if isinstance(value, MemoryDocumentReference):
+        return 6
+    if isinstance(value, (list, tuple)):
+        return 8
+    return 9
+
+
+def _row_keys(row):
+    return row[0]
+
+
+_TYPE_RANKS = {type(None): 0, bool: 1, int: 2, float: 2, datetime: 3, str: 4, bytes: 5,
+               list: 8, tuple: 8, dict: 9}
+
+
+class _SortKey:
+    """Comparable wrapper ordering values like Firestore does"""
+
+    __slots__ = ('rank', 'value')
+
+    def __init__(self, value):
+        self.rank = _type_rank(value)
+        if self.rank == 6:
+            value = value.path
+        elif self.rank == 8:
+            value = [_SortKey(v) for v in value]
+        elif self.rank == 9:
+            value = sorted((k, _SortKey(v)) for k, v in value.items())
+        self.value = value
+
+    def __eq__(self, other):
+        return self.rank == other.rank and self.value == other.value
+
+    def __lt__(self, other):
+        if self.rank != other.rank:
+            return self.rank < other.rank
+        return self.rank != 0 and self.value < other.value
+
+
+def _value_size(value) -> int:
+    """Storage size of a field value (Firestore's size rules)"""
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float, datetime)):
+        return 8
+    if isinstance(value, str):
+        return len(value.encode('utf-8')) + 1
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, MemoryDocumentReference):
+        return sum(len(part.encode('utf-8')) + 1 for part in value.path.split('/')) + 16
+    if isinstance(value, (list, tuple)):
+        return sum(_value_size(v) for v in value)
+    if isinstance(value, dict):
+        return sum(len(k.encode('utf-8')) + 1 + _value_size(v) for k, v in value.items())
+    return 8
+
+
+def document_size(collection_id: str, document_id: str, data: Optional[Dict]) -> int:
+    """
+    Bytes of a document as Firestore sizes it: name + fields + 32
+
+    Used as the payload size of reads (what a field mask saves on the wire).
+    """
+    if data is None:
+        return 0
+    name = len(collection_id.encode('utf-8')) + len(document_id.encode('utf-8')) + 2 + 16
+    return name + _value_size(data) + 32
+
+
+def _get_path(data: Dict, path: str, default=_MISSING):
+    """Read a dotted field path"""
+    value = data
+    for part in path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return default
+        value = value[part]
+    return value
+
+
+def _apply_transform(current, value):
+    """Resolve a write value against the current field value"""
+    if value is transforms.SERVER_TIMESTAMP:
+        return datetime.now(timezone.utc)
+    if isinstance(value, transforms.ArrayUnion):
+        base = list(current) if isinstance(current, list) else []
+        return base + [v for v in value.values if v not in base]
+    if isinstance(value, transforms.ArrayRemove):
+        return [v for v in current if v not in value.values] if isinstance(current, list) else []
+    if isinstance(value, transforms.Increment):
+        if isinstance(current, (int, float)) and not isinstance(current, bool):
+            return current + value.value
+        return value.value
+    if isinstance(value, transforms.Maximum):
+        return max(current, value.value) if isinstance(current, (int, float)) else value.value
+    if isinstance(value, transforms.Minimum):
+        return min(current, value.value) if isinstance(current, (int, float)) else value.value
+    if isinstance(value, dict):
+        return {k: _apply_transform(_MISSING, v) for k, v in value.items() if v is not transforms.DELETE_FIELD}
+    return copy.deepcopy(value)
+
+
+def _set_path(data: Dict, path: str, value):
+    """Write a dotted field path, applying transforms and DELETE_FIELD"""
+    parts = path.split('.')
+    target = data
+    for part in parts[:-1]:
+        if not isinstance(target.get(part), dict):
+            if value is transforms.DELETE_FIELD:
+                return
+            target[part] = {}
+        target = target[part]
+    if value is transforms.DELETE_FIELD:
+        target.pop(parts[-1], None)
+    else:
+        target[parts[-1]] = _apply_transform(target.get(parts[-1], _MISSING), value)
+
+
+def _merge(target: Dict, data: Dict):
+    """set(merge=True): nested maps merge, other values replace"""
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        elif value is transforms.DELETE_FIELD:
+            target.pop(key, None)
+        else:
+            target[key] = _apply_transform(target.get(key, _MISSING), value)
+
+
+# ----------------------------------------------------------------------------
+# Documents
+# ----------------------------------------------------------------------------
+
+class MemoryDocumentSnapshot:
+    """Result of reading a document"""
+
+    def __init__(self, reference: 'MemoryDocumentReference', data: Optional[Dict],
+                 update_time: Optional[datetime] = None):
+        self.reference = reference
+        self._data = data
+        self.update_time = update_time if data is not None else None
+
+    @property
+    def id(self) -> str:
+        return self.reference.id
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict]:
+        return copy.deepcopy(self._data)
+
+    def get(self, field_path: str):
+        if self._data is None:
+            return None
+        value = _get_path(self._data, field_path)
+        if value is _MISSING:
+            raise KeyError(field_path)
+        return copy.deepcopy(value)
+
+
+class MemoryDocumentReference:
+    """Reference to one document"""
+
+    def __init__(self, client: 'MemoryFirestore', collection_id: str, document_id: str):
+        self._client = client
+        self.collection_id = collection_id
+        self.id = document_id
+
+    @property
+    def path(self) -> str:
+        return f'{self.collection_id}/{self.id}'
+
+    def __eq__(self, other):
+        return isinstance(other, MemoryDocumentReference) and self.path == other.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+    def get(self, field_paths: Optional[List[str]] = None, transaction=None) -> MemoryDocumentSnapshot:
+        return self._client._get_documents([self], field_paths, method='get', transaction=transaction)[0]
+
+    def set(self, document_data: Dict, merge: bool = False):
+        self._client._commit([('set', self, document_data, merge)])
+
+    def update(self, field_updates: Dict):
+        self._client._commit([('update', self, field_updates, False)])
+
+    def create(self, document_data: Dict):
+        self._client._commit([('create', self, document_data, False)])
+
+    def delete(self):
+        self._client._commit([('delete', self, None, False)])
+
+    def on_snapshot(self, callback) -> 'MemoryWatch':
+        """
+        Call callback(docs, changes, read_time) now and after every committed
+        write to this document; docs is [snapshot], or [] if it does not exist
+        """
+        return self._client._watch(self, callback)
+
+
+class MemoryWatch:
+    """Handle returned by on_snapshot"""
+
+    def __init__(self, client: 'MemoryFirestore', reference: MemoryDocumentReference, callback):
+        self._client = client
+        self.reference = reference
+        self.callback = callback
+
+    def unsubscribe(self):
+        self._client._unwatch(self)
+
+
+# ----------------------------------------------------------------------------
+# Queries
+# ----------------------------------------------------------------------------
+
+def _equal(a, b) -> bool:
+    if type(a) is type(b) and type(a) in (str, int, bool):
+        return a == b
+    return _SortKey(a) == _SortKey(b)
+
+
+_OPERATORS = {
+    '==': _equal,
+    '!=': lambda a, b: a is not None and not _equal(a, b),
+    '<': lambda a, b: _type_rank(a) == _type_rank(b) and _SortKey(a) < _SortKey(b),
+    '<=': lambda a, b: _type_rank(a) == _type_rank(b) and not _SortKey(b) < _SortKey(a),
+    '>': lambda a, b: _type_rank(a) == _type_rank(b) and _SortKey(b) < _SortKey(a),
+    '>=': lambda a, b: _type_rank(a) == _type_rank(b) and not _SortKey(a) < _SortKey(b),
+    'in': lambda a, b: any(_equal(a, v) for v in b),
+    'not-in': lambda a, b: a is not None and not any(_equal(a, v) for v in b),
+    'array_contains': lambda a, b: isinstance(a, list) and any(_SortKey(v) == _SortKey(b) for v in a),
+    'array_contains_any': lambda a, b: isinstance(a, list) and any(
+        _SortKey(v) == _SortKey(w) for v in a for w in b),
+}
+_OPERATORS['array-contains'] = _OPERATORS['array_contains']
+_OPERATORS['array-contains-any'] = _OPERATORS['array_contains_any']
+_INEQUALITIES = {'<', '<=', '>', '>=', '!=', 'not-in'}
+
+
+class MemoryQuery:
+    """Immutable query over one collection"""
+
+    def __init__(self, client: 'MemoryFirestore', collection_id: str, filters=(), orders=(),
+                 limit_: Optional[int] = None, offset_: int = 0, cursor=None, projection=None):
+        self._client = client
+        self._collection_id = collection_id
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit_
+        self._offset = offset_
+        self._cursor = cursor
+        self._projection = projection
+
+    def _copy(self, **changes) -> 'MemoryQuery':
+        state = dict(filters=self._filters, orders=self._orders, limit_=self._limit,
+                     offset_=self._offset, cursor=self._cursor, projection=self._projection)
+        state.update(changes)
+        return MemoryQuery(self._client, self._collection_id, **state)
+
+    def where(self, field_path: Optional[str] = None, op_string: Optional[str] = None,
+              value=None, filter: Optional[FieldFilter] = None) -> 'MemoryQuery':
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        if op_string not in _OPERATORS:
+            raise ValueError(f'Unsupported operator {op_string!r}')
+        if field_path == DOCUMENT_ID:
+            # Document ID filters take references; rows are matched on the ID
+            def to_id(v):
+                return v.id if isinstance(v, MemoryDocumentReference) else v
+            value = [to_id(v) for v in value] if op_string in ('in', 'not-in') else to_id(value)
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path: str, direction: str = ASCENDING) -> 'MemoryQuery':
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count: int) -> 'MemoryQuery':
+        return self._copy(limit_=count)
+
+    def offset(self, num_to_skip: int) -> 'MemoryQuery':
+        return self._copy(offset_=num_to_skip)
+
+    def select(self, field_paths: List[str]) -> 'MemoryQuery':
+        return self._copy(projection=list(field_paths))
+
+    def start_after(self, document_fields_or_snapshot) -> 'MemoryQuery':
+        return self._copy(cursor=document_fields_or_snapshot)
+
+    def count(self, alias: Optional[str] = None) -> 'MemoryAggregationQuery':
+        return MemoryAggregationQuery(self, alias or 'count')
+
+    def _effective_orders(self):
+        orders = list(self._orders)
+        ordered = {field for field, _ in orders}
+        # An inequality filter implies ordering on its field first
+        for field, op, _ in self._filters:
+            if op in _INEQUALITIES and field not in ordered:
+                orders.insert(0, (field, ASCENDING))
+                ordered.add(field)
+        if DOCUMENT_ID not in ordered:
+            last = orders[-1][1] if orders else ASCENDING
+            orders.append((DOCUMENT_ID, last))
+        return orders
+
+    def _run(self, limit: Optional[int] = None) -> List[tuple]:
+        """Matching (doc_id, data) pairs in query order (only the first `limit` if given)"""
+        orders = self._effective_orders()
+        if limit is not None and orders == [(DOCUMENT_ID, ASCENDING)]:
+            return self._run_in_id_order(limit)
+        with self._client._lock:
+            documents = list(self._client._collection(self._collection_id).items())
+
+        def value_of(doc_id, data, field):
+            return doc_id if field == DOCUMENT_ID else _get_path(data, field)
+
+        # (sort keys, doc_id, data): keys are built once per matching document
+        rows = []
+        for doc_id, data in documents:
+            filter_values = [value_of(doc_id, data, field) for field, _, _ in self._filters]
+            if any(value is _MISSING for value in filter_values):
+                continue
+            order_values = [value_of(doc_id, data, field) for field, _ in orders]
+            if any(value is _MISSING for value in order_values):
+                continue
+            if all(_OPERATORS[op](actual, value)
+                   for actual, (_, op, value) in zip(filter_values, self._filters)):
+                rows.append(([_SortKey(value) for value in order_values], doc_id, data))
+
+        if self._cursor is not None:
+            rows = self._after_cursor(rows, orders)
+
+        if len({direction for _, direction in orders}) == 1:
+            # Keys end with the document ID, so they are unique and a partial sort is exact
+            descending = orders[0][1] == DESCENDING
+            if limit is not None and limit < len(rows):
+                rows = (heapq.nlargest if descending else heapq.nsmallest)(limit, rows, key=_row_keys)
+            else:
+                rows.sort(key=_row_keys, reverse=descending)
+        else:
+            # Stable sorts, least significant ordering first
+            for i in reversed(range(len(orders))):
+                rows.sort(key=lambda row: row[0][i], reverse=orders[i][1] == DESCENDING)
+        rows = [(doc_id, data) for _, doc_id, data in rows]
+        return rows if limit is None else rows[:limit]
+
+    def _run_in_id_order(self, limit: int) -> List[tuple]:
+        """Pages ordered by document ID walk the sorted IDs from the cursor, like an index scan"""
+        cursor = self._cursor
+        if isinstance(cursor, MemoryDocumentSnapshot):
+            after = cursor.id
+        elif cursor is not None:
+            after = cursor.get(DOCUMENT_ID)
+            after = after.id if isinstance(after, MemoryDocumentReference) else after
+        else:
+            after = None
+
+        rows = []
+        with self._client._lock:
+            ids = self._client._sorted_ids(self._collection_id)
+            documents = self._client._collection(self._collection_id)
+            for i in range(bisect.bisect_right(ids, after) if after is not None else 0, len(ids)):
+                doc_id = ids[i]
+                data = documents[doc_id]
+                values = [doc_id if field == DOCUMENT_ID else _get_path(data, field)
+                          for field, _, _ in self._filters]
+                if all(actual is not _MISSING and _OPERATORS[op](actual, value)
+                       for actual, (_, op, value) in zip(values, self._filters)):
+                    rows.append((doc_id, data))
+                    if len(rows) == limit:
+                        break
+        return rows
+
+    def _after_cursor(self, rows, orders):
+        cursor = self._cursor
+        if isinstance(cursor, MemoryDocumentSnapshot):
+            cursor_values = [cursor.id if field == DOCUMENT_ID else _get_path(cursor._data or {}, field)
+                             for field, _ in orders]
+        else:
+            # Field dict: only the explicit orderings it names take part
+            cursor_values = [cursor.get(field, _MISSING) for field, _ in orders]
+            while cursor_values and cursor_values[-1] is _MISSING:
+                cursor_values.pop()
+        targets = [_SortKey(value) for value in cursor_values]
+
+        def is_after(keys):
+            for (_, direction), a, b in zip(orders, keys, targets):
+                if a == b:
+                    continue
+                return (b < a) if direction == ASCENDING else (a < b)
+            return False  # Equal on every cursor field: start_after excludes it
+
+        return [row for row in rows if is_after(row[0])]
+
+    def stream(self, transaction=None) -> Iterator[MemoryDocumentSnapshot]:
+        end = None if self._limit is None else self._offset + self._limit
+        rows = self._run(end)[self._offset:]
+        if transaction is not None:
+            transaction._track(self._collection_id, rows)
+        if self._projection is not None:
+            rows = [(doc_id, self._project(data)) for doc_id, data in rows]
+        # Firestore bills one read for a query that matches nothing
+        self._client._record('run_query', reads=max(len(rows), 1),
+                             bytes_read=sum(document_size(self._collection_id, doc_id, data)
+                                            for doc_id, data in rows))
+        update_times = self._client._update_times.get(self._collection_id, {})
+        for doc_id, data in rows:
+            yield MemoryDocumentSnapshot(
+                MemoryDocumentReference(self._client, self._collection_id, doc_id), copy.deepcopy(data),
+                update_times.get(doc_id))
+
+    def get(self, transaction=None) -> List[MemoryDocumentSnapshot]:
+        return list(self.stream(transaction))
+
+    def _project(self, data: Dict) -> Dict:
+        projected = {}
+        for path in self._projection:
+            value = _get_path(data, path)
+            if value is not _MISSING:
+                _set_path(projected, path, value)
+        return projected
+
+
+class MemoryAggregationQuery:
+    """query.count() - one read per 1000 matching index entries"""
+
+    def __init__(self, query: MemoryQuery, alias: str):
+        self._query = query
+        self._alias = alias
+
+    def get(self, transaction=None):
+        rows = self._query._run()[self._query._offset:]
+        if self._query._limit is not None:
+            rows = rows[:self._query._limit]
+        self._query._client._record('run_aggregation_query', reads=max(1, -(-len(rows) // 1000)))
+        return [[MemoryAggregationResult(self._alias, len(rows))]]
+
+
+class MemoryAggregationResult:
+    def __init__(self, alias: str, value: int):
+        self.alias = alias
+        self.value = value
+
+
+class MemoryCollectionReference(MemoryQuery):
+    """A collection is also the query over all its documents"""
+
+    def __init__(self, client: 'MemoryFirestore', collection_id: str):
+        super().__init__(client, collection_id)
+        self.id = collection_id
+
+    def document(self, document_id: Optional[str] = None) -> MemoryDocumentReference:
+        # Auto IDs look like Firestore's: 20 alphanumeric characters
+        document_id = document_id or uuid.uuid4().hex[:20]
+        return MemoryDocumentReference(self._client, self.id, document_id)
+
+    def add(self, document_data: Dict, document_id: Optional[str] = None):
+        ref = self.document(document_id)
+        ref.create(document_data)
+        return datetime.now(timezone.utc), ref
+
+    def list_documents(self) -> Iterator[MemoryDocumentReference]:
+        with self._client._lock:
+            ids = list(self._client._collection(self.id))
+        self._client._record('list_documents')
+        return (MemoryDocumentReference(self._client, self.id, doc_id) for doc_id in ids)
+
+
+# ----------------------------------------------------------------------------
+# Writes
+# ----------------------------------------------------------------------------
+
+class MemoryWriteBatch:
+    """Writes applied atomically on commit (max 500)"""
+
+    def __init__(self, client: 'MemoryFirestore'):
+        self._client = client
+        self._writes = []
+
+    def __len__(self):
+        return len(self._writes)
+
+    def set(self, reference: MemoryDocumentReference, document_data: Dict, merge: bool = False):
+        self._writes.append(('set', reference, document_data, merge))
+        return self
+
+    def update(self, reference: MemoryDocumentReference, field_updates: Dict):
+        self._writes.append(('update', reference, field_updates, False))
+        return self
+
+    def create(self, reference: MemoryDocumentReference, document_data: Dict):
+        self._writes.append(('create', reference, document_data, False))
+        return self
+
+    def delete(self, reference: MemoryDocumentReference):
+        self._writes.append(('delete', reference, None, False))
+        return self
+
+    def commit(self):
+        writes, self._writes = self._writes, []
+        return self._client._commit(writes)
+
+
+class MemoryTransaction(MemoryWriteBatch):
+    """
+    db.transaction() - usable with @firestore.transactional
+
+    Optimistic like Firestore's server: documents read in the transaction
+    are remembered, and the commit raises Aborted (so the decorator
+    retries) if any of them changed in the meantime.
+    """
+
+    def __init__(self, client: 'MemoryFirestore', max_attempts: int = 5, read_only: bool = False):
+        super().__init__(client)
+        self._max_attempts = max_attempts
+        self._read_only = read_only
+        self._id = None
+        self._read_versions = {}
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def in_progress(self) -> bool:
+        return self._id is not None
+
+    def _track(self, collection_id: str, rows):
+        for doc_id, data in rows:
+            self._read_versions.setdefault((collection_id, doc_id), data)
+
+    def get(self, ref_or_query, field_paths: Optional[List[str]] = None):
+        if isinstance(ref_or_query, MemoryDocumentReference):
+            return iter([ref_or_query.get(field_paths, transaction=self)])
+        return ref_or_query.stream(transaction=self)
+
+    def get_all(self, references, field_paths: Optional[List[str]] = None):
+        return self._client.get_all(references, field_paths, transaction=self)
+
+    def _begin(self, retry_id=None):
+        if self._id is not None:
+            raise ValueError('Transaction already in progress')
+        self._id = uuid.uuid4().bytes
+        self._client._record('begin_transaction')
+
+    def _clean_up(self):
+        self._writes = []
+        self._read_versions = {}
+        self._id = None
+
+    def _rollback(self):
+        if self._id is not None:
+            self._client._record('rollback')
+        self._clean_up()
+
+    def _commit(self):
+        writes, read_versions = self._writes, self._read_versions
+        try:
+            return self._client._commit(writes, read_versions)
+        finally:
+            self._clean_up()
+
+    def commit(self):
+        return self._commit()
+
+
+# ----------------------------------------------------------------------------
+# Snapshot files
+# ----------------------------------------------------------------------------
+
+def _snapshot_default(value):
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    raise TypeError(f'{type(value).__name__} cannot be stored in a snapshot')
+
+
+def _snapshot_hook(obj):
+    if len(obj) == 1 and '__datetime__' in obj:
+        return datetime.fromisoformat(obj['__datetime__'])
+    return obj
+
+
+class SnapshotWriter:
+    """
+    Streams documents to a snapshot file without holding them in memory
+
+        with SnapshotWriter('fleet.jsonl.gz') as snapshot:
+            snapshot.write('users', user_id, data)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.documents = 0
+        self._file = None
+
+    def __enter__(self) -> 'SnapshotWriter':
+        # Level 1: snapshots are written once per fleet and mostly compress well anyway
+        self._file = gzip.open(self.path, 'wt', encoding='utf-8', compresslevel=1)
+        return self
+
+    def write(self, collection_id: str, document_id: str, data: Dict):
+        self._file.write(json.dumps({'c': collection_id, 'id': document_id, 'd': data},
+                                    ensure_ascii=False, separators=(',', ':'),
+                                    default=_snapshot_default) + '\n')
+        self.documents += 1
+
+    def __exit__(self, *exc_info):
+        self._file.close()
+
+
+def read_snapshot(path: str) -> Iterator[tuple]:
+    """(collection_id, document_id, data) for every document in a snapshot file"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line, object_hook=_snapshot_hook)
+            yield record['c'], record['id'], record['d']
+
+
+# ----------------------------------------------------------------------------
+# Client
+# ----------------------------------------------------------------------------
+
+class MemoryFirestore:
+    """
+    Thread-safe in-memory Firestore client
+
+    One lock guards all collections; reads copy documents out and writes
+    copy them in, so callers never share mutable state with the store.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._collections: Dict[str, Dict[str, Dict]] = {}
+        self._id_index: Dict[str, List[str]] = {}  # Sorted IDs, rebuilt after adds/deletes
+        self._update_times: Dict[str, Dict[str, datetime]] = {}
+        self._last_update_time = datetime.fromtimestamp(0, timezone.utc)
+        self._listeners: Dict[tuple, List[MemoryWatch]] = {}
+        self._listeners_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = self._empty_stats()
+        self._measures = []
+
+    @staticmethod
+    def _empty_stats() -> Dict:
+        return {'rpcs': 0, 'reads': 0, 'writes': 0, 'deletes': 0, 'bytes_read': 0, 'by_method': {}}
+
+    def _collection(self, collection_id: str) -> Dict[str, Dict]:
+        return self._collections.setdefault(collection_id, {})
+
+    def _sorted_ids(self, collection_id: str) -> List[str]:
+        """Document IDs in order (call with the lock held)"""
+        ids = self._id_index.get(collection_id)
+        if ids is None:
+            ids = self._id_index[collection_id] = sorted(self._collection(collection_id))
+        return ids
+
+    def collection(self, collection_id: str) -> MemoryCollectionReference:
+        return MemoryCollectionReference(self, collection_id)
+
+    def document(self, document_path: str) -> MemoryDocumentReference:
+        collection_id, document_id = document_path.split('/', 1)
+        return MemoryDocumentReference(self, collection_id, document_id)
+
+    def batch(self) -> MemoryWriteBatch:
+        return MemoryWriteBatch(self)
+
+    def get_all(self, references, field_paths: Optional[List[str]] = None,
+                transaction=None) -> Iterator[MemoryDocumentSnapshot]:
+        return iter(self._get_documents(list(references), field_paths, method='batch_get',
+                                        transaction=transaction))
+
+    def transaction(self, max_attempts: int = 5, read_only: bool = False) -> 'MemoryTransaction':
+        return MemoryTransaction(self, max_attempts, read_only)
+
+    def collections(self) -> List[MemoryCollectionReference]:
+        with self._lock:
+            return [self.collection(name) for name in self._collections]
+
+    def close(self):
+        pass
+
+    # Metering
+
+    def _record(self, method: str, reads: int = 0, writes: int = 0, deletes: int = 0,
+                bytes_read: int = 0):
+        with self._stats_lock:
+            for stats in itertools.chain([self._stats], self._measures):
+                stats['rpcs'] += 1
+                stats['reads'] += reads
+                stats['writes'] += writes
+                stats['deletes'] += deletes
+                stats['bytes_read'] += bytes_read
+                stats['by_method'][method] = stats['by_method'].get(method, 0) + 1
+
+    def get_stats(self) -> Dict:
+        """RPCs (total and by method), document reads, writes, deletes and bytes read so far"""
+        with self._stats_lock:
+            stats = copy.deepcopy(self._stats)
+        with self._lock:
+            stats['documents'] = {name: len(docs) for name, docs in self._collections.items()}
+        return stats
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats = self._empty_stats()
+
+    @contextmanager
+    def measure(self):
+        """Count the operations made inside the block (all threads)"""
+        stats = self._empty_stats()
+        with self._stats_lock:
+            self._measures.append(stats)
+        try:
+            yield stats
+        finally:
+            with self._stats_lock:
+                self._measures.remove(stats)
+
+    # Storage
+
+    def _next_update_time(self) -> datetime:
+        """Commit time, strictly increasing so every version has its own update_time"""
+        now = datetime.now(timezone.utc)
+        if now <= self._last_update_time:
+            now = self._last_update_time + timedelta(microseconds=1)
+        self._last_update_time = now
+        return now
+
+    def _get_documents(self, references, field_paths, method: str,
+                       transaction: Optional['MemoryTransaction'] = None) -> List[MemoryDocumentSnapshot]:
+        snapshots = []
+        with self._lock:
+            for ref in references:
+                data = self._collection(ref.collection_id).get(ref.id)
+                if transaction is not None:
+                    transaction._track(ref.collection_id, [(ref.id, data)])
+                if data is not None and field_paths is not None:
+                    data = MemoryQuery(self, ref.collection_id, projection=list(field_paths))._project(data)
+                snapshots.append(MemoryDocumentSnapshot(
+                    ref, copy.deepcopy(data), self._update_times.get(ref.collection_id, {}).get(ref.id)))
+        self._record(method, reads=len(references),
+                     bytes_read=sum(document_size(s.reference.collection_id, s.id, s._data) for s in snapshots))
+        return snapshots
+
+    def _commit(self, writes, read_versions: Optional[Dict] = None) -> List:
+        if len(writes) > MAX_BATCH_WRITES:
+            raise InvalidArgument(f'maximum {MAX_BATCH_WRITES} writes allowed per request')
+        with self._lock:
+            # Transactions: every write replaces the stored dict, so identity is the version
+            for (collection_id, doc_id), seen in (read_versions or {}).items():
+                if self._collection(collection_id).get(doc_id) is not seen:
+                    self._record('commit')
+                    raise Aborted(f'Transaction lock timeout: {collection_id}/{doc_id} changed')
+            # Validate first so a failing batch changes nothing
+            staged = {}
+            for op, ref, data, merge in writes:
+                key = (ref.collection_id, ref.id)
+                current = staged.get(key, self._collection(ref.collection_id).get(ref.id))
+                if op == 'update' and current is None:
+                    raise NotFound(f'No document to update: {ref.path}')
+                if op == 'create' and current is not None:
+                    raise AlreadyExists(f'Document already exists: {ref.path}')
+                if op == 'delete':
+                    staged[key] = None
+                elif op == 'update':
+                    updated = copy.deepcopy(current)
+                    for path, value in data.items():
+                        _set_path(updated, path, value)
+                    staged[key] = updated
+                elif merge:
+                    merged = copy.deepcopy(current) if current is not None else {}
+                    _merge(merged, data)
+                    staged[key] = merged
+                else:
+                    staged[key] = {k: _apply_transform(_MISSING, v) for k, v in data.items()
+                                   if v is not transforms.DELETE_FIELD}
+            commit_time = self._next_update_time()
+            for (collection_id, doc_id), data in staged.items():
+                docs = self._collection(collection_id)
+                update_times = self._update_times.setdefault(collection_id, {})
+                if (data is None) == (doc_id in docs):
+                    self._id_index.pop(collection_id, None)
+                if data is None:
+                    docs.pop(doc_id, None)
+                    update_times.pop(doc_id, None)
+                else:
+                    docs[doc_id] = data
+                    update_times[doc_id] = commit_time
+            changed = {key: data for key, data in staged.items() if key in self._listeners}
+
+        deletes = sum(1 for op, *_ in writes if op == 'delete')
+        self._record('commit', writes=len(writes) - deletes, deletes=deletes)
+        for (collection_id, doc_id), data in changed.items():
+            self._notify(MemoryDocumentReference(self, collection_id, doc_id), data, commit_time)
+        return [commit_time] * len(writes)
+
+    # Listeners (local change feed)
+
+    def _watch(self, reference: MemoryDocumentReference, callback) -> MemoryWatch:
+        watch = MemoryWatch(self, reference, callback)
+        with self._lock:
+            with self._listeners_lock:
+                self._listeners.setdefault((reference.collection_id, reference.id), []).append(watch)
+            data = self._collection(reference.collection_id).get(reference.id)
+            update_time = self._update_times.get(reference.collection_id, {}).get(reference.id)
+            read_time = self._next_update_time()
+        # Like Firestore: the current state first, then every change
+        self._deliver(watch, data, update_time, read_time)
+        return watch
+
+    def _unwatch(self, watch: MemoryWatch):
+        key = (watch.reference.collection_id, watch.reference.id)
+        with self._listeners_lock:
+            watches = self._listeners.get(key, [])
+            if watch in watches:
+                watches.remove(watch)
+            if not watches:
+                self._listeners.pop(key, None)
+
+    def _notify(self, reference: MemoryDocumentReference, data: Optional[Dict], update_time: datetime):
+        with self._listeners_lock:
+            watches = list(self._listeners.get((reference.collection_id, reference.id), []))
+        for watch in watches:
+            self._deliver(watch, data, update_time, update_time)
+
+    def _deliver(self, watch: MemoryWatch, data: Optional[Dict], update_time, read_time):
+        # Firestore bills one read per document delivered to a listener
+        self._record('listen', reads=1,
+                     bytes_read=document_size(watch.reference.collection_id, watch.reference.id, data))
+        docs = [] if data is None else [MemoryDocumentSnapshot(watch.reference, copy.deepcopy(data), update_time)]
+        try:
+            watch.callback(docs, [], read_time)
+        except Exception as e:
+            print(f"⚠️  Snapshot listener for {watch.reference.path} failed: {e}")
+
+    def clear(self):
+        """Drop every document (statistics are kept)"""
+        with self._lock:
+            self._collections.clear()
+            self._id_index.clear()
+            self._update_times.clear()
+
+    def save_snapshot(self, path: str) -> int:
+        """Write every document to a snapshot file. Returns the number written."""
+        with self._lock, SnapshotWriter(path) as snapshot:
+            for collection_id, docs in self._collections.items():
+                for doc_id, data in docs.items():
+                    snapshot.write(collection_id, doc_id, data)
+        return snapshot.documents
+
+    def load_snapshot(self, path: str) -> int:
+        """
+        Add the documents of a snapshot file (replacing documents with the same
+        path). Not metered: it stands in for data already in the database.
+
+        Returns:
+            Number of documents loaded
+        """
+        loaded = 0
+        with self._lock:
+            update_time = self._next_update_time()
+            for collection_id, doc_id, data in read_snapshot(path):
+                self._collection(collection_id)[doc_id] = data
+                self._update_times.setdefault(collection_id, {})[doc_id] = update_time
+                loaded += 1
+            self._id_index.clear()
+        return loaded
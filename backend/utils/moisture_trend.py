@@ -0,0 +1,158 @@
+"""
+Moisture Trend
+Fits the soil drying rate from recent readings and schedules the next check
+
+The Pi asks for a decision again just before the soil can reach the plant's
+critical moisture threshold, instead of on a fixed period. Comfortably moist
+soil means long back-offs; dry soil, fast drying or a hot forecast mean
+short ones.
+"""
+
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import numpy as np
+
+# Handle imports for running from backend/ or parent directory
+try:
+    from utils.timeseries import get_timeseries_store
+except ImportError:
+    from backend.utils.timeseries import get_timeseries_store
+
+MIN_CHECK_MINUTES = 10
+MAX_CHECK_MINUTES = 240
+# Re-check this long after a watering ends, once the water has soaked in
+POST_WATERING_SETTLE_MINUTES = 15
+
+TREND_WINDOW_HOURS = 6
+MIN_TREND_POINTS = 4
+# A jump of this many points between readings is a watering or rain event
+RISE_RESET_POINTS = 3.0
+
+# Aim to check before moisture is within this many points of critical
+SAFETY_MARGIN_POINTS = 5.0
+# Use at most this fraction of the estimated time to reach the margin
+SAFETY_FACTOR = 0.7
+
+# Drying rate assumed without enough readings, at 25°C (%/hour)
+DEFAULT_DRYING_RATE = 1.0
+MIN_DRYING_RATE = 0.1
+# Likely rain within the horizon shortens the check to just after it
+RAIN_PROBABILITY_THRESHOLD = 60
+RAIN_MM_THRESHOLD = 2.0
+
+
+def fit_drying_rate(timestamps: np.ndarray, moisture: np.ndarray) -> Optional[Dict]:
+    """
+    Least-squares linear fit of moisture over time since the last rise
+
+    Args:
+        timestamps: Epoch seconds (sorted)
+        moisture: Soil moisture (%), NaN for gaps
+
+    Returns:
+        {'rate_per_hour', 'points', 'r_squared'} or None if too few points.
+        rate_per_hour is positive while the soil dries.
+    """
+    ok = ~np.isnan(moisture)
+    timestamps, moisture = timestamps[ok].astype(np.float64), moisture[ok].astype(np.float64)
+
+    # Only fit the decay after the most recent watering or rain
+    rises = np.flatnonzero(np.diff(moisture) > RISE_RESET_POINTS)
+    if len(rises):
+        timestamps, moisture = timestamps[rises[-1] + 1:], moisture[rises[-1] + 1:]
+
+    if len(timestamps) < MIN_TREND_POINTS or timestamps[-1] - timestamps[0] < 600:
+        return None
+
+    hours = (timestamps - timestamps[-1]) / 3600.0
+    slope, intercept = np.polyfit(hours, moisture, 1)
+    residuals = moisture - (slope * hours + intercept)
+    variance = np.var(moisture)
+    r_squared = 1.0 - np.var(residuals) / variance if variance > 0 else 1.0
+
+    return {
+        'rate_per_hour': round(float(-slope), 3),
+        'points': int(len(timestamps)),
+        'r_squared': round(float(r_squared), 3)
+    }
+
+
+def _forecast_factor(weather_data: Dict) -> float:
+    """Scale the default drying rate with temperature and humidity"""
+    current = weather_data.get('current', {}) if weather_data else {}
+    temperature = current.get('temperature', 25) or 25
+    humidity = current.get('humidity', 50) or 50
+    factor = 1.0 + 0.04 * (temperature - 25) + 0.005 * (50 - humidity)
+    return float(np.clip(factor, 0.5, 2.5))
+
+
+def _first_rain_hour(weather_data: Dict) -> Optional[int]:
+    """Hour offset of the first likely, significant rain in the forecast"""
+    if not weather_data:
+        return None
+    probability = np.asarray(weather_data.get('hourly_rain_probability', []), dtype=float)
+    precipitation = np.asarray(weather_data.get('hourly_precipitation_mm', []), dtype=float)
+    n = min(len(probability), len(precipitation))
+    hours = np.flatnonzero((probability[:n] >= RAIN_PROBABILITY_THRESHOLD) &
+                           (precipitation[:n] >= RAIN_MM_THRESHOLD))
+    return int(hours[0]) if len(hours) else None
+
+
+def schedule_next_check(user_id: str, plant_name: str, soil_moisture: float,
+                        critical_threshold: float, weather_data: Optional[Dict] = None,
+                        watering_minutes: int = 0) -> Dict:
+    """
+    When the Pi should ask for the next decision
+
+    Args:
+        user_id, plant_name: Series to fit the drying trend on
+        soil_moisture: Current soil moisture (%)
+        critical_threshold: Plant's critical_moisture_threshold (%)
+        weather_data: Forecast from the weather service (optional)
+        watering_minutes: Duration of a watering starting now, if any
+
+    Returns:
+        {'next_check_after': seconds, 'next_check_at': iso, 'reason', ...}
+    """
+    now = time.time()
+    soil_moisture = float(soil_moisture)
+    details = {}
+
+    if watering_minutes > 0:
+        minutes = watering_minutes + POST_WATERING_SETTLE_MINUTES
+        reason = 'after watering'
+    else:
+        series = get_timeseries_store().query(
+            user_id, plant_name, int(now - TREND_WINDOW_HOURS * 3600), int(now) + 1, '1m')
+        trend = fit_drying_rate(series['timestamp'], series['soil_moisture'])
+
+        if trend is not None and trend['rate_per_hour'] > 0:
+            rate = trend['rate_per_hour']
+            details['trend'] = trend
+            basis = 'fitted trend'
+        else:
+            rate = DEFAULT_DRYING_RATE * _forecast_factor(weather_data)
+            basis = 'default drying rate'
+        rate = max(rate, MIN_DRYING_RATE)
+
+        headroom = soil_moisture - (critical_threshold + SAFETY_MARGIN_POINTS)
+        hours_to_margin = max(headroom, 0.0) / rate
+        minutes = hours_to_margin * 60 * SAFETY_FACTOR
+        reason = f'{basis}: {rate:.2f}%/h drying, {max(headroom, 0.0):.1f} points above safety margin'
+        details['drying_rate_per_hour'] = round(rate, 3)
+        details['hours_to_critical'] = round(max(soil_moisture - critical_threshold, 0.0) / rate, 2)
+
+        rain_hour = _first_rain_hour(weather_data)
+        if rain_hour is not None and (rain_hour + 1) * 60 < minutes:
+            minutes = (rain_hour + 1) * 60
+            reason = f'rain expected in {rain_hour}h'
+
+    minutes = int(np.clip(minutes, MIN_CHECK_MINUTES, MAX_CHECK_MINUTES))
+    return dict(
+        next_check_after=minutes * 60,
+        next_check_at=(datetime.now() + timedelta(minutes=minutes)).isoformat(),
+        reason=reason,
+        **details
+    )
@@ -0,0 +1,270 @@
+"""
+User Profile Cache
+In-process LRU cache of users/<user_id>, kept coherent by snapshot listeners
+
+Farmer endpoints read the same profile on every request while profiles
+change rarely (admin edits, valve actions, AI mode toggles). The first read
+of a profile loads the whole document and, if it exists, starts a Firestore
+on_snapshot listener on it (on the in-memory backend: its local change
+feed); later reads are served from memory, projected to the caller's field
+mask. Unknown users cost one read and leave no entry or listener behind.
+
+Coherence:
+  - UserRepository writes invalidate the entry as soon as they commit, so a
+    process always reads its own writes
+  - Writes from other processes (or scripts writing directly) reach the
+    listener, which invalidates the entry when the document's update_time
+    differs from the cached one
+  - A read that raced with a write never caches what it read
+  - Entries also expire after USER_PROFILE_CACHE_TTL seconds, in case a
+    listener stops delivering
+
+Each cached profile holds one listener (in the Python SDK one watch stream
+and thread), so USER_PROFILE_CACHE_SIZE bounds both memory and listeners,
+per worker process: 4 gunicorn workers with a size of 100 keep up to 400
+watch streams open. The cache is therefore opt-in (size 0 by default). The
+least recently used profile is evicted and its listener closed.
+
+Misses read the whole document and apply the caller's field mask in
+memory, so with the cache on, field masks no longer reduce the bytes read
+from Firestore on a miss (hits read nothing).
+"""
+
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# Handle imports for running from backend/ or parent directory
+try:
+    from utils.firebase_client import get_db
+except ImportError:
+    from backend.utils.firebase_client import get_db
+
+# Profiles kept per worker process, each with a watch stream (0 disables the cache)
+USER_PROFILE_CACHE_SIZE = int(os.environ.get('USER_PROFILE_CACHE_SIZE', '0'))
+USER_PROFILE_CACHE_TTL = float(os.environ.get('USER_PROFILE_CACHE_TTL', '600'))
+
+_EPOCH = datetime.fromtimestamp(0, timezone.utc)
+
+
+def project(data: Dict, fields: Optional[List[str]]) -> Dict:
+    """Copy of the field paths of `data` a field-masked read would return"""
+    if fields is None:
+        return copy.deepcopy(data)
+    projected = {}
+    for path in fields:
+        parts = path.split('.')
+        value = data
+        for part in parts:
+            if not isinstance(value, dict) or part not in value:
+                break
+            value = value[part]
+        else:
+            target = projected
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = copy.deepcopy(value)
+    return projected
+
+
+class _Entry:
+    def __init__(self):
+        self.data: Optional[Dict] = None     # Full document while valid
+        self.version = None                  # update_time of data
+        self.latest = _EPOCH                 # Newest version the listener has seen
+        self.cached_at = 0.0
+        self.generation = 0                  # Local writes (invalidate) so far
+        self.watch = None
+
+
+class UserProfileCache:
+    """Thread-safe LRU cache of user documents, invalidated by listeners and local writes"""
+
+    def __init__(self, collection: str, max_size: int = USER_PROFILE_CACHE_SIZE,
+                 ttl_seconds: float = USER_PROFILE_CACHE_TTL):
+        self.collection = collection
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self._stats = {'hits': 0, 'misses': 0, 'fills': 0, 'stale_fills_dropped': 0,
+                       'invalidations': 0, 'listener_events': 0, 'listener_invalidations': 0,
+                       'expirations': 0, 'evictions': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def _ref(self, user_id: str):
+        return get_db().collection(self.collection).document(user_id)
+
+    def get(self, user_id: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+        """
+        User profile, or None if it does not exist
+
+        Args:
+            user_id: User ID
+            fields: Field paths to return (as a field-masked read would)
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry.data is not None:
+                if now - entry.cached_at < self.ttl_seconds:
+                    self._entries.move_to_end(user_id)
+                    self._stats['hits'] += 1
+                    return project(entry.data, fields)
+                entry.data = None
+                self._stats['expirations'] += 1
+            self._stats['misses'] += 1
+            new_entry = entry is None
+            if new_entry:
+                # Placeholder so local writes during the read bump its generation
+                entry = self._entries[user_id] = _Entry()
+            else:
+                self._entries.move_to_end(user_id)
+            generation = entry.generation
+
+        doc = self._ref(user_id).get()
+        if not doc.exists:
+            removed = None
+            with self._lock:
+                if self._entries.get(user_id) is entry and entry.data is None:
+                    # Unknown (or deleted) user: keep no entry or listener for it
+                    del self._entries[user_id]
+                    removed = entry
+            if removed is not None:
+                self._close(removed)
+            return None
+
+        data = doc.to_dict() or {}
+        if new_entry:
+            # Only existing profiles take a slot and a listener. The listener's
+            # first snapshot (on Firestore: shortly after) drops the fill below
+            # if a write landed between the read and the listener starting
+            with self._lock:
+                evicted = self._evict()
+            for old in evicted:
+                self._close(old)
+            self._listen(user_id, entry)
+
+        with self._lock:
+            if self._entries.get(user_id) is entry:
+                # Written locally, or the listener has seen a newer version, since the read
+                if entry.generation != generation or \
+                        (doc.update_time is not None and doc.update_time < entry.latest):
+                    self._stats['stale_fills_dropped'] += 1
+                else:
+                    entry.data = data
+                    entry.version = doc.update_time
+                    entry.cached_at = time.time()
+                    self._stats['fills'] += 1
+
+        return project(data, fields)
+
+    def cached_exists(self, user_id: str) -> bool:
+        """True if the profile is cached (so it exists); False means unknown"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry.data is not None \
+                    and time.time() - entry.cached_at < self.ttl_seconds:
+                self._stats['hits'] += 1
+                return True
+        return False
+
+    def invalidate(self, user_id: str):
+        """Drop a cached profile after writing it (the listener stays)"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                entry.data = None
+                entry.generation += 1
+                self._stats['invalidations'] += 1
+
+    def clear(self):
+        """Drop every profile and close their listeners"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            self._close(entry)
+
+    def _evict(self) -> List[_Entry]:
+        """Remove least recently used entries over max_size (call with the lock held)"""
+        evicted = []
+        while len(self._entries) > self.max_size:
+            _, entry = self._entries.popitem(last=False)
+            evicted.append(entry)
+            self._stats['evictions'] += 1
+        return evicted
+
+    def _listen(self, user_id: str, entry: _Entry):
+        def on_snapshot(docs, changes, read_time):
+            self._on_snapshot(user_id, entry, docs, read_time)
+
+        try:
+            watch = self._ref(user_id).on_snapshot(on_snapshot)
+        except Exception as e:
+            # Without a listener the entry is only as fresh as its TTL
+            print(f"⚠️  Profile listener for {user_id} failed to start: {e}")
+            return
+        with self._lock:
+            entry.watch = watch
+            closed = self._entries.get(user_id) is not entry
+        if closed:
+            self._close(entry)  # Evicted while the listener was starting
+
+    def _on_snapshot(self, user_id: str, entry: _Entry, docs, read_time):
+        doc = docs[0] if docs and docs[0].exists else None
+        # Deletions carry no update_time: order them by read time
+        version = doc.update_time if doc is not None else read_time
+        with self._lock:
+            self._stats['listener_events'] += 1
+            if version is None or version <= entry.latest:
+                return
+            entry.latest = version
+            if entry.data is not None and entry.version != version:
+                entry.data = None
+                self._stats['listener_invalidations'] += 1
+
+    def _close(self, entry: _Entry):
+        watch, entry.watch = entry.watch, None
+        if watch is not None:
+            try:
+                watch.unsubscribe()
+            except Exception as e:
+                print(f"⚠️  Could not close profile listener: {e}")
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = sum(1 for entry in self._entries.values() if entry.data is not None)
+            stats['listeners'] = sum(1 for entry in self._entries.values() if entry.watch is not None)
+        stats['max_size'] = self.max_size
+        stats['ttl_seconds'] = self.ttl_seconds
+        served = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / served, 3) if served else None
+        return stats
+
+
+# Singleton cache
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_profile_cache() -> UserProfileCache:
+    """Get the process-wide user profile cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    from utils.repositories import USERS_COLLECTION
+                except ImportError:
+                    from backend.utils.repositories import USERS_COLLECTION
+                _cache = UserProfileCache(USERS_COLLECTION)
+    return _cache
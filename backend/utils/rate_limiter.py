@@ -0,0 +1,53 @@
+"""
+Rate Limiter
+Token bucket shared by threads calling a metered API
+"""
+
+import threading
+import time
+from typing import Dict
+
+
+class TokenBucket:
+    """
+    Allows `rate_per_minute` calls per minute with bursts up to `burst`
+
+    Threads block in acquire() until a token is available or the timeout
+    passes.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._stats = {'granted': 0, 'denied': 0, 'total_wait_seconds': 0.0}
+
+    def acquire(self, timeout: float = 0.0) -> bool:
+        """Take one token, waiting at most `timeout` seconds. Returns False if none came."""
+        deadline = time.monotonic() + timeout
+        t0 = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_second)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self._stats['granted'] += 1
+                    self._stats['total_wait_seconds'] += now - t0
+                    return True
+                wait = (1 - self._tokens) / self.rate_per_second if self.rate_per_second > 0 else timeout
+                if now + wait > deadline:
+                    self._stats['denied'] += 1
+                    return False
+            time.sleep(wait)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['rate_per_minute'] = round(self.rate_per_second * 60, 1)
+        stats['burst'] = self.capacity
+        stats['total_wait_seconds'] = round(stats['total_wait_seconds'], 3)
+        return stats
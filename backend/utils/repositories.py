@@ -0,0 +1,352 @@
+"""
+Repositories
+Data access for users, irrigation_logs and plant_database
+
+Services read and write these collections through the repositories instead
+of building Firestore calls themselves. The database comes from get_db(),
+so the same code runs on Cloud Firestore or on the in-memory stand-in
+(STORAGE_BACKEND=memory). Batched writes that span collections (log writer,
+rollups, archives) still use the client directly.
+
+User writes that can change the admin stats counters (create/delete,
+plants, ai_mode) run in a transaction that also increments a counter
+shard (services/stats_service.py).
+
+User profile reads are served by an in-process cache kept coherent by
+snapshot listeners (utils/profile_cache.py); every user write below
+invalidates the cached profile once it commits.
+"""
+
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from firebase_admin import firestore
+from google.api_core.exceptions import AlreadyExists
+
+# Handle imports for running from backend/ or parent directory
+try:
+    from utils.firebase_client import get_db
+    from utils.profile_cache import get_profile_cache
+    from services.stats_service import COUNTED_USER_FIELDS, add_stats_increment, user_stats_delta
+except ImportError:
+    from backend.utils.firebase_client import get_db
+    from backend.utils.profile_cache import get_profile_cache
+    from backend.services.stats_service import COUNTED_USER_FIELDS, add_stats_increment, user_stats_delta
+
+USERS_COLLECTION = 'users'
+LOGS_COLLECTION = 'irrigation_logs'
+PLANTS_COLLECTION = 'plant_database'
+
+DELETE_FIELD = firestore.DELETE_FIELD
+DOCUMENT_ID = '__name__'
+FIRESTORE_BATCH_LIMIT = 500
+# Values per 'in' filter (Firestore's limit)
+IN_FILTER_LIMIT = 30
+CREATE_ATTEMPTS = 3
+USER_EXISTS_ERROR = 'User already exists'
+
+
+class UserRepository:
+    """users/<user_id>"""
+
+    def _collection(self):
+        return get_db().collection(USERS_COLLECTION)
+
+    def new_id(self) -> str:
+        """Allocate a document ID for a new user"""
+        return self._collection().document().id
+
+    def get(self, user_id: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+        """
+        User profile, or None if it does not exist
+
+        Args:
+            user_id: User ID
+            fields: Only read these field paths (a field mask). Profiles embed
+                    every plant's features, so hot paths should pass the
+                    fields they use. Missing fields are absent from the dict.
+                    With the profile cache on, the mask is applied to the
+                    cached document, and a miss reads the whole document.
+        """
+        cache = get_profile_cache()
+        if cache.enabled:
+            return cache.get(user_id, fields)
+        doc = self._collection().document(user_id).get(field_paths=fields)
+        return (doc.to_dict() or {}) if doc.exists else None
+
+    def exists(self, user_id: str) -> bool:
+        """Existence check that reads no fields (none at all if the profile is cached)"""
+        if get_profile_cache().cached_exists(user_id):
+            return True
+        return self._collection().document(user_id).get(field_paths=[]).exists
+
+    def set(self, user_id: str, data: Dict):
+        self._write_counted(user_id, 'set', data)
+
+    def update(self, user_id: str, updates: Dict):
+        """Update fields (dotted paths, DELETE_FIELD and transforms allowed)"""
+        if any(path.split('.')[0] in COUNTED_USER_FIELDS for path in updates):
+            self._write_counted(user_id, 'update', updates)
+        else:
+            try:
+                self._collection().document(user_id).update(updates)
+            finally:
+                get_profile_cache().invalidate(user_id)
+
+    def delete(self, user_id: str):
+        self._write_counted(user_id, 'delete')
+
+    def _write_counted(self, user_id: str, op: str, data: Optional[Dict] = None):
+        """Write a user and the stats counters it changes in one transaction"""
+        db = get_db()
+        ref = self._collection().document(user_id)
+
+        @firestore.transactional
+        def write(transaction):
+            snap = ref.get(field_paths=COUNTED_USER_FIELDS, transaction=transaction)
+            before = (snap.to_dict() or {}) if snap.exists else None
+            if op == 'set':
+                after = data
+                transaction.set(ref, data)
+            elif op == 'update':
+                after = _apply_counted_updates(before or {}, data)
+                transaction.update(ref, data)
+            else:
+                after = None
+                transaction.delete(ref)
+            add_stats_increment(db, transaction, user_stats_delta(before, after))
+
+        try:
+            write(db.transaction())
+        finally:
+            get_profile_cache().invalidate(user_id)
+
+    def create_many(self, users: List[Tuple[str, Dict]]) -> List[Optional[str]]:
+        """
+        Create new users in batches of FIRESTORE_BATCH_LIMIT writes
+
+        Each batch first checks which of its users already exist (one
+        get_all that reads no fields) and creates only the missing ones, plus
+        one counter shard increment for them, so users and stats commit
+        together. Re-running an overlapping import only adds new users when
+        the user IDs are deterministic (e.g. the fleet generator's); callers
+        that allocate fresh IDs must detect duplicates themselves.
+
+        Returns:
+            Per user: None if created, USER_EXISTS_ERROR if it already
+            existed, else the error of its batch
+        """
+        errors = []
+        per_batch = FIRESTORE_BATCH_LIMIT - 1
+        for i in range(0, len(users), per_batch):
+            errors += self._create_missing(users[i:i + per_batch])
+        return errors
+
+    def _create_missing(self, chunk: List[Tuple[str, Dict]]) -> List[Optional[str]]:
+        """Create the users of one batch that do not exist yet"""
+        db = get_db()
+        refs = [self._collection().document(user_id) for user_id, _ in chunk]
+        for attempt in range(CREATE_ATTEMPTS):
+            existing = {snap.id for snap in db.get_all(refs, field_paths=[]) if snap.exists}
+            errors = [USER_EXISTS_ERROR if user_id in existing else None for user_id, _ in chunk]
+            missing = [(ref, data) for ref, (user_id, data) in zip(refs, chunk) if user_id not in existing]
+            if not missing:
+                return errors
+            batch = db.batch()
+            delta = {}
+            for ref, data in missing:
+                batch.create(ref, data)
+                for field, value in user_stats_delta(None, data).items():
+                    delta[field] = delta.get(field, 0) + value
+            add_stats_increment(db, batch, delta)
+            try:
+                batch.commit()
+                return errors
+            except AlreadyExists as e:
+                # Another writer created one of them since the check: check again
+                last_error = str(e)
+            except Exception as e:
+                return [error or str(e) for error in errors]
+            finally:
+                cache = get_profile_cache()
+                for ref, _ in missing:
+                    cache.invalidate(ref.id)
+        return [error or last_error for error in errors]
+
+    def existing_emails(self, emails: List[str]) -> set:
+        """
+        Which of these emails already belong to a user (case-insensitive)
+
+        New users are stored with lowercased emails; each email is looked up
+        lowercased and as given (for older users), IN_FILTER_LIMIT values per
+        query.
+
+        Returns:
+            Lowercased emails that exist
+        """
+        values = sorted({v for email in emails for v in (email, email.lower())})
+        found = set()
+        for i in range(0, len(values), IN_FILTER_LIMIT):
+            query = self._collection().where('email', 'in', values[i:i + IN_FILTER_LIMIT]).select(['email'])
+            found.update(str(doc.to_dict().get('email', '')).lower() for doc in query.stream())
+        return found & {email.lower() for email in emails}
+
+    def add_plant(self, user_id: str, plant: Dict):
+        self.update(user_id, {'plants': firestore.ArrayUnion([plant])})
+
+    def clear_watering_state(self, user_id: str):
+        self.update(user_id, {'watering_state': DELETE_FIELD})
+
+    def stream(self, role: Optional[str] = None,
+               fields: Optional[List[str]] = None) -> Iterator[Tuple[str, Dict]]:
+        """
+        Iterate over users as (user_id, data)
+
+        Args:
+            role: Only users with this role
+            fields: Only read these fields
+        """
+        query = self._collection()
+        if role:
+            query = query.where('role', '==', role)
+        if fields:
+            query = query.select(fields)
+        for doc in query.stream():
+            yield doc.id, doc.to_dict() or {}
+
+    def page(self, limit: int, after: Optional[str] = None, role: Optional[str] = None,
+             fields: Optional[List[str]] = None) -> List[Tuple[str, Dict]]:
+        """
+        One page of users ordered by document ID
+
+        Args:
+            limit: Page size
+            after: Cursor - user ID of the last user of the previous page
+            role: Only users with this role (filtered by Firestore)
+            fields: Only read these fields
+
+        Returns:
+            (user_id, data) pairs
+        """
+        query = self._collection()
+        if role:
+            query = query.where('role', '==', role)
+        query = query.order_by(DOCUMENT_ID)
+        if fields is not None:
+            query = query.select(fields)
+        if after:
+            query = query.start_after({DOCUMENT_ID: after})
+        return [(doc.id, doc.to_dict() or {}) for doc in query.limit(limit).stream()]
+
+    def iter_pages(self, page_size: int, role: Optional[str] = None,
+                   fields: Optional[List[str]] = None) -> Iterator[List[Tuple[str, Dict]]]:
+        """
+        Walk every user one page at a time
+
+        Unlike stream(), no query stays open across the whole collection and
+        only one page is held in memory.
+        """
+        after = None
+        while True:
+            users = self.page(page_size, after=after, role=role, fields=fields)
+            if users:
+                yield users
+            if len(users) < page_size:
+                return
+            after = users[-1][0]
+
+
+def _apply_counted_updates(before: Dict, updates: Dict) -> Dict:
+    """The counted fields of a user after update(updates)"""
+    after = dict(before)
+    for path, value in updates.items():
+        field = path.split('.')[0]
+        if field not in COUNTED_USER_FIELDS:
+            continue
+        if path != field:
+            continue  # Nested paths do not change the counts
+        if value is DELETE_FIELD:
+            after.pop(field, None)
+        elif isinstance(value, firestore.ArrayUnion):
+            current = list(after.get(field) or [])
+            after[field] = current + [v for v in value.values if v not in current]
+        elif isinstance(value, firestore.ArrayRemove):
+            after[field] = [v for v in after.get(field) or [] if v not in value.values]
+        else:
+            after[field] = value
+    return after
+
+
+class IrrigationLogRepository:
+    """irrigation_logs/<log_id> (written in batches by utils/log_writer.py)"""
+
+    def _collection(self):
+        return get_db().collection(LOGS_COLLECTION)
+
+    def recent_for_user(self, user_id: str, limit: int, before: Optional[str] = None,
+                        fields: Optional[List[str]] = None,
+                        before_id: Optional[str] = None) -> List[Dict]:
+        """
+        A user's logs, newest first (ties on timestamp by log ID, descending)
+
+        Args:
+            user_id: User ID
+            limit: Maximum logs to read
+            before: Only logs with timestamp before this ISO timestamp
+            fields: Only read these field paths ('timestamp' is always read)
+            before_id: With before, the cursor is (before, before_id): logs
+                       with timestamp == before and a smaller ID follow too
+
+        Returns:
+            Log dicts, each with 'log_id'
+        """
+        query = self._collection()\
+                    .where('user_id', '==', user_id)\
+                    .order_by('timestamp', direction=firestore.Query.DESCENDING)\
+                    .order_by(DOCUMENT_ID, direction=firestore.Query.DESCENDING)
+        if fields is not None:
+            query = query.select(sorted(set(fields) | {'timestamp'}))
+        if before and before_id:
+            query = query.start_after({'timestamp': before, DOCUMENT_ID: before_id})
+        elif before:
+            query = query.where('timestamp', '<', before)
+        logs = []
+        for doc in query.limit(limit).stream():
+            log = doc.to_dict()
+            log['log_id'] = doc.id
+            logs.append(log)
+        return logs
+
+
+class PlantRepository:
+    """plant_database/<plant_name> - plants generated with Gemini"""
+
+    def _collection(self):
+        return get_db().collection(PLANTS_COLLECTION)
+
+    def get(self, plant_name: str) -> Optional[Dict]:
+        doc = self._collection().document(plant_name).get()
+        return doc.to_dict() if doc.exists else None
+
+    def save(self, plant_name: str, data: Dict):
+        self._collection().document(plant_name).set(data)
+
+    def stream(self) -> Iterator[Tuple[str, Dict]]:
+        for doc in self._collection().stream():
+            yield doc.id, doc.to_dict() or {}
+
+
+_users = UserRepository()
+_logs = IrrigationLogRepository()
+_plants = PlantRepository()
+
+
+def get_user_repository() -> UserRepository:
+    return _users
+
+
+def get_log_repository() -> IrrigationLogRepository:
+    return _logs
+
+
+def get_plant_repository() -> PlantRepository:
+    return _plants
@@ -0,0 +1,325 @@
+"""
+Sensor Telemetry
+Bulk parsing, validation and storage of Pi sensor readings
+
+Pis post batches of readings instead of embedding one reading in each
+decision request. Two wire formats are accepted:
+
+  NDJSON (Content-Type: application/x-ndjson), one reading per line:
+    {"plant_name": "tomato", "soil_moisture": 41.2, "temperature": 27.5,
+     "humidity": 48.0, "timestamp": 1730540000}
+    (timestamp: epoch seconds or ISO 8601; temperature/humidity optional)
+
+  Binary (Content-Type: application/octet-stream, ?plant_name=tomato),
+  packed little-endian 16-byte records:
+    uint32 timestamp | float32 soil_moisture | float32 temperature | float32 humidity
+    (NaN for a missing temperature/humidity)
+
+Validation is vectorized with NumPy over the whole batch. Accepted readings
+are appended to the per-plant ring buffers in utils.timeseries, for plants
+that exist in the user's profile only. The ring buffers live in the worker
+process that received the batch, so the newest reading of each plant is
+also written to sensor_latest/<user_id>_<plant>: /decision on any worker
+reads it from there.
+"""
+
+import json
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Handle imports for running from backend/ or parent directory
+try:
+    from utils.firebase_client import get_db
+    from utils.timeseries import get_timeseries_store
+    from utils.repositories import get_user_repository
+except ImportError:
+    from backend.utils.firebase_client import get_db
+    from backend.utils.timeseries import get_timeseries_store
+    from backend.utils.repositories import get_user_repository
+
+BINARY_RECORD_DTYPE = np.dtype([
+    ('timestamp', '<u4'),
+    ('soil_moisture', '<f4'),
+    ('temperature', '<f4'),
+    ('humidity', '<f4')
+])
+
+MAX_BATCH_READINGS = 65536
+# Checked before the body is read: 65536 NDJSON readings of ~120 bytes
+MAX_BATCH_BYTES = 8 * 1024 * 1024
+MAX_READING_AGE_SECONDS = 7 * 24 * 3600   # Pis buffer at most a week offline
+MAX_CLOCK_SKEW_SECONDS = 300
+# Latest reading younger than this can stand in for soil_moisture in /decision
+LATEST_READING_MAX_AGE_SECONDS = 30 * 60
+MAX_REPORTED_ERRORS = 10
+
+# Newest reading per (user, plant), shared by all worker processes
+LATEST_READINGS_COLLECTION = 'sensor_latest'
+
+VALID_RANGES = {
+    'soil_moisture': (0.0, 100.0),
+    'temperature': (-20.0, 60.0),
+    'humidity': (0.0, 100.0)
+}
+
+
+class TelemetryBatch:
+    """Columnar batch of readings for one (user, plant) series"""
+
+    def __init__(self, timestamps, soil_moisture, temperature, humidity, line_numbers=None):
+        self.timestamps = np.asarray(timestamps, dtype=np.uint32)
+        self.soil_moisture = np.asarray(soil_moisture, dtype=np.float32)
+        self.temperature = np.asarray(temperature, dtype=np.float32)
+        self.humidity = np.asarray(humidity, dtype=np.float32)
+        # Position of each reading in the request, for error reports
+        self.line_numbers = line_numbers if line_numbers is not None else np.arange(1, len(self.timestamps) + 1)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def select(self, mask) -> 'TelemetryBatch':
+        return TelemetryBatch(self.timestamps[mask], self.soil_moisture[mask],
+                              self.temperature[mask], self.humidity[mask])
+
+
+def _parse_timestamp(value) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(value).timestamp()
+
+
+def parse_ndjson(body: bytes) -> Tuple[Dict[str, TelemetryBatch], List[Dict]]:
+    """
+    Parse NDJSON readings into per-plant columnar batches
+
+    Returns:
+        ({plant_name: TelemetryBatch}, [structural errors])
+    """
+    columns = {}
+    errors = []
+    nan = float('nan')
+
+    for line_no, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            reading = json.loads(line)
+            plant = reading['plant_name'].lower()
+            row = (
+                _parse_timestamp(reading['timestamp']),
+                float(reading['soil_moisture']),
+                float(reading['temperature']) if reading.get('temperature') is not None else nan,
+                float(reading['humidity']) if reading.get('humidity') is not None else nan
+            )
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            errors.append({'line': line_no, 'error': f'Malformed reading: {e}'})
+            continue
+        columns.setdefault(plant, ([], []))
+        columns[plant][0].append(line_no)
+        columns[plant][1].append(row)
+
+    batches = {}
+    for plant, (line_numbers, rows) in columns.items():
+        ts, moisture, temp, hum = zip(*rows)
+        batches[plant] = TelemetryBatch(np.clip(ts, 0, 2**32 - 1), moisture, temp, hum,
+                                        np.asarray(line_numbers))
+    return batches, errors
+
+
+def parse_binary(body: bytes) -> TelemetryBatch:
+    """
+    Parse packed binary records (zero-copy view over the request body)
+
+    Raises:
+        ValueError: body length is not a multiple of the record size
+    """
+    if len(body) % BINARY_RECORD_DTYPE.itemsize:
+        raise ValueError(f'Binary body must be a multiple of {BINARY_RECORD_DTYPE.itemsize} bytes')
+    records = np.frombuffer(body, dtype=BINARY_RECORD_DTYPE)
+    return TelemetryBatch(records['timestamp'], records['soil_moisture'],
+                          records['temperature'], records['humidity'])
+
+
+def validate_batch(batch: TelemetryBatch, now: Optional[float] = None):
+    """
+    Vectorized range and freshness checks
+
+    Returns:
+        (valid TelemetryBatch, number rejected, [errors for the first rejected readings])
+    """
+    now = now or time.time()
+    ts = batch.timestamps.astype(np.float64)
+
+    checks = [
+        ('timestamp too old or in the future',
+         (ts >= now - MAX_READING_AGE_SECONDS) & (ts <= now + MAX_CLOCK_SKEW_SECONDS))
+    ]
+    for field, (low, high) in VALID_RANGES.items():
+        values = getattr(batch, field)
+        in_range = (values >= low) & (values <= high)
+        if field != 'soil_moisture':
+            in_range |= np.isnan(values)  # optional fields
+        checks.append((f'{field} out of range [{low}, {high}]', in_range))
+
+    valid = np.ones(len(batch), dtype=bool)
+    errors = []
+    for message, ok in checks:
+        newly_rejected = valid & ~ok
+        if newly_rejected.any() and len(errors) < MAX_REPORTED_ERRORS:
+            for idx in np.flatnonzero(newly_rejected)[:MAX_REPORTED_ERRORS - len(errors)]:
+                errors.append({'line': int(batch.line_numbers[idx]), 'error': message})
+        valid &= ok
+
+    return batch.select(valid), int((~valid).sum()), errors
+
+
+def ingest_telemetry(user_id: str, body: bytes, content_type: str,
+                     plant_name: Optional[str] = None) -> Dict:
+    """
+    Parse, validate and store a batch of readings
+
+    Args:
+        user_id: User the Pi belongs to
+        body: Raw request body
+        content_type: 'application/x-ndjson' or 'application/octet-stream'
+        plant_name: Required for binary batches
+
+    Returns:
+        Accepted/rejected counts and the first errors
+        (not_found is set when the user does not exist)
+    """
+    if len(body) > MAX_BATCH_BYTES:
+        return {'success': False, 'error': f'Batch larger than {MAX_BATCH_BYTES} bytes'}
+
+    if content_type == 'application/octet-stream':
+        if not plant_name:
+            return {'success': False, 'error': 'plant_name query parameter required for binary telemetry'}
+        try:
+            batch = parse_binary(body)
+        except ValueError as e:
+            return {'success': False, 'error': str(e)}
+        batches, errors = {plant_name.lower(): batch}, []
+    elif content_type in ('application/x-ndjson', 'application/json'):
+        batches, errors = parse_ndjson(body)
+    else:
+        return {'success': False, 'error': f'Unsupported content type: {content_type}'}
+
+    total = sum(len(b) for b in batches.values()) + len(errors)
+    if total > MAX_BATCH_READINGS:
+        return {'success': False, 'error': f'Batch larger than {MAX_BATCH_READINGS} readings'}
+
+    # Series are only created for known (user, plant) pairs
+    profile = get_user_repository().get(user_id, fields=['plants'])
+    if profile is None:
+        return {'success': False, 'not_found': True, 'error': f'User {user_id} not found'}
+    known_plants = {plant['name'].lower() for plant in profile.get('plants', []) if plant.get('name')}
+
+    store = get_timeseries_store()
+    now = time.time()
+    accepted = 0
+    rejected = len(errors)
+    latest = {}
+    for plant, batch in batches.items():
+        if plant not in known_plants:
+            rejected += len(batch)
+            errors.extend({'line': int(line), 'error': f'Plant {plant} not found in user profile'}
+                          for line in batch.line_numbers[:MAX_REPORTED_ERRORS])
+            continue
+        valid, n_rejected, batch_errors = validate_batch(batch, now)
+        store.append(user_id, plant, valid.timestamps, valid.soil_moisture,
+                     valid.temperature, valid.humidity)
+        accepted += len(valid)
+        rejected += n_rejected
+        errors.extend(batch_errors)
+        if len(valid):
+            i = int(np.argmax(valid.timestamps))
+            latest[plant] = {
+                'timestamp': int(valid.timestamps[i]),
+                'soil_moisture': float(valid.soil_moisture[i]),
+                'temperature': None if np.isnan(valid.temperature[i]) else float(valid.temperature[i]),
+                'humidity': None if np.isnan(valid.humidity[i]) else float(valid.humidity[i])
+            }
+
+    _save_latest_readings(user_id, latest)
+
+    return {
+        'success': True,
+        'accepted': accepted,
+        'rejected': rejected,
+        'errors': sorted(errors, key=lambda e: e['line'])[:MAX_REPORTED_ERRORS]
+    }
+
+
+def _latest_ref(user_id: str, plant_name: str):
+    doc_id = f"{user_id}_{plant_name.lower().replace('/', '_')}"
+    return get_db().collection(LATEST_READINGS_COLLECTION).document(doc_id)
+
+
+def _save_latest_readings(user_id: str, latest: Dict[str, Dict]):
+    """Write each plant's newest reading of a batch (one batched write)"""
+    if not latest:
+        return
+    batch = get_db().batch()
+    for plant, reading in latest.items():
+        batch.set(_latest_ref(user_id, plant), {**reading, 'user_id': user_id, 'plant_name': plant})
+    batch.commit()
+
+
+def get_latest_reading(user_id: str, plant_name: str,
+                       max_age_seconds: int = LATEST_READING_MAX_AGE_SECONDS) -> Optional[Dict]:
+    """
+    Latest reading for a plant, or None if there is none fresh enough
+
+    The newer of this worker's ring buffer and sensor_latest (written by
+    whichever worker ingested the last batch).
+    """
+    reading = get_timeseries_store().latest(user_id, plant_name)
+    doc = _latest_ref(user_id, plant_name).get()
+    if doc.exists:
+        stored = doc.to_dict()
+        if reading is None or stored['timestamp'] > reading['timestamp']:
+            reading = {column: stored.get(column)
+                       for column in ('timestamp', 'soil_moisture', 'temperature', 'humidity')}
+    if reading is None or time.time() - reading['timestamp'] > max_age_seconds:
+        return None
+    reading['age_seconds'] = int(time.time() - reading['timestamp'])
+    return reading
+
+
+def get_sensor_series(user_id: str, plant_name: str, start_ts: Optional[int] = None,
+                      end_ts: Optional[int] = None, resolution: str = '1h') -> Dict:
+    """
+    Sensor history for dashboards
+
+    Args:
+        start_ts, end_ts: Epoch seconds (default: the last 24 hours)
+        resolution: 'raw', '1m', '1h' or '1d'
+
+    Returns:
+        Column lists (timestamp, soil_moisture, temperature, humidity), NaN as None
+    """
+    end_ts = int(end_ts if end_ts is not None else time.time() + 1)
+    start_ts = int(start_ts if start_ts is not None else end_ts - 24 * 3600)
+    try:
+        columns = get_timeseries_store().query(user_id, plant_name, start_ts, end_ts, resolution)
+    except ValueError as e:
+        return {'success': False, 'error': str(e)}
+
+    series = {'timestamp': columns['timestamp'].tolist()}
+    for name in ('soil_moisture', 'temperature', 'humidity'):
+        values = columns[name].astype(object)
+        values[np.isnan(columns[name])] = None
+        series[name] = values.tolist()
+
+    return {
+        'success': True,
+        'plant_name': plant_name,
+        'resolution': resolution,
+        'start': start_ts,
+        'end': end_ts,
+        'count': len(series['timestamp']),
+        'series': series
+    }
@@ -0,0 +1,371 @@
+"""
+Time Series Store
+Per-(user, plant) sensor history in fixed-size ring buffers
+
+Each series keeps four tiers:
+  raw  - every reading as received
+  1m   - 1 minute means
+  1h   - 1 hour means
+  1d   - 1 day means
+
+Buffers are columnar NumPy arrays (uint32 timestamps, float32 values) that
+start small and grow up to a fixed capacity, then overwrite the oldest
+points. Downsampled tiers are updated incrementally on every append.
+Snapshots are written as memory-mapped .npy files and reloaded at startup.
+Range queries return NumPy arrays.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+VALUE_COLUMNS = ('soil_moisture', 'temperature', 'humidity')
+
+# name -> (bucket width in seconds, capacity in points)
+TIERS = {
+    'raw': (None, 2048),       # ~1.5 days at one reading per minute
+    '1m': (60, 1440 * 2),      # 2 days
+    '1h': (3600, 24 * 90),     # 90 days
+    '1d': (86400, 365 * 3)     # 3 years
+}
+INITIAL_ALLOCATION = 64
+
+SNAPSHOT_DIR = os.environ.get(
+    'TIMESERIES_SNAPSHOT_DIR',
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'timeseries')
+)
+SNAPSHOT_INTERVAL_SECONDS = int(os.environ.get('TIMESERIES_SNAPSHOT_INTERVAL', 300))
+
+_SNAPSHOT_DTYPE = np.dtype([('timestamp', '<u4')] + [(c, '<f4') for c in VALUE_COLUMNS])
+
+
+class RingBuffer:
+    """Growable fixed-capacity ring of (timestamp, 3 x float32) columns"""
+
+    def __init__(self, capacity: int, initial: int = INITIAL_ALLOCATION):
+        self.capacity = capacity
+        alloc = min(initial, capacity)
+        self.timestamps = np.zeros(alloc, dtype=np.uint32)
+        self.values = np.zeros((alloc, len(VALUE_COLUMNS)), dtype=np.float32)
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def _ordered_index(self) -> np.ndarray:
+        return (self.start + np.arange(self.size)) % len(self.timestamps)
+
+    def _grow(self, needed: int):
+        alloc = len(self.timestamps)
+        if needed <= alloc or alloc >= self.capacity:
+            return
+        new_alloc = min(self.capacity, max(alloc * 2, needed))
+        order = self._ordered_index()
+        timestamps = np.zeros(new_alloc, dtype=np.uint32)
+        values = np.zeros((new_alloc, len(VALUE_COLUMNS)), dtype=np.float32)
+        timestamps[:self.size] = self.timestamps[order]
+        values[:self.size] = self.values[order]
+        self.timestamps, self.values, self.start = timestamps, values, 0
+
+    def append(self, timestamps: np.ndarray, values: np.ndarray):
+        """Append points (vectorized); the oldest points are overwritten when full"""
+        n = len(timestamps)
+        if n == 0:
+            return
+        if n > self.capacity:
+            timestamps, values, n = timestamps[-self.capacity:], values[-self.capacity:], self.capacity
+
+        self._grow(self.size + n)
+        alloc = len(self.timestamps)
+        pos = (self.start + self.size + np.arange(n)) % alloc
+        self.timestamps[pos] = timestamps
+        self.values[pos] = values
+
+        overflow = max(0, self.size + n - alloc)
+        self.size = min(self.size + n, alloc)
+        self.start = (self.start + overflow) % alloc
+
+    def range(self, start_ts: int, end_ts: int):
+        """Points with start_ts <= timestamp < end_ts, sorted by time"""
+        order = self._ordered_index()
+        timestamps = self.timestamps[order]
+        mask = (timestamps >= start_ts) & (timestamps < end_ts)
+        timestamps, values = timestamps[mask], self.values[order][mask]
+        sort = np.argsort(timestamps, kind='stable')
+        return timestamps[sort], values[sort]
+
+    def to_snapshot(self) -> np.ndarray:
+        order = self._ordered_index()
+        records = np.zeros(self.size, dtype=_SNAPSHOT_DTYPE)
+        records['timestamp'] = self.timestamps[order]
+        for i, column in enumerate(VALUE_COLUMNS):
+            records[column] = self.values[order, i]
+        return records
+
+    def load_snapshot(self, records: np.ndarray):
+        self.start = self.size = 0
+        values = np.stack([records[c] for c in VALUE_COLUMNS], axis=1) if len(records) else \
+            np.zeros((0, len(VALUE_COLUMNS)), dtype=np.float32)
+        self.append(np.asarray(records['timestamp']), values)
+
+
+class _Bucket:
+    """Open (not yet complete) downsampling bucket"""
+
+    def __init__(self, bucket_id: int, sums: np.ndarray, counts: np.ndarray):
+        self.bucket_id = bucket_id
+        self.sums = sums
+        self.counts = counts
+
+    def mean(self) -> np.ndarray:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (self.sums / self.counts).astype(np.float32)
+
+
+class Series:
+    """One (user, plant) series: raw ring plus downsampled tiers"""
+
+    def __init__(self, key):
+        self.key = key
+        self.lock = threading.Lock()
+        self.tiers = {name: RingBuffer(capacity) for name, (_, capacity) in TIERS.items()}
+        self.open_buckets: Dict[str, Optional[_Bucket]] = {name: None for name in TIERS}
+        self.latest = None
+        self.dirty = False
+
+    def append(self, timestamps: np.ndarray, values: np.ndarray):
+        sort = np.argsort(timestamps, kind='stable')
+        timestamps, values = timestamps[sort].astype(np.uint32), values[sort].astype(np.float32)
+
+        with self.lock:
+            self.tiers['raw'].append(timestamps, values)
+            for name, (width, _) in TIERS.items():
+                if width:
+                    self._downsample(name, width, timestamps, values)
+
+            if self.latest is None or int(timestamps[-1]) >= self.latest[0]:
+                self.latest = (int(timestamps[-1]), values[-1].copy())
+            self.dirty = True
+
+    def _downsample(self, name: str, width: int, timestamps: np.ndarray, values: np.ndarray):
+        bucket_ids = timestamps.astype(np.int64) // width
+        current = self.open_buckets[name]
+        if current is not None:
+            # Late readings for an already closed bucket only live in the raw tier
+            keep = bucket_ids >= current.bucket_id
+            bucket_ids, values = bucket_ids[keep], values[keep]
+        if not len(bucket_ids):
+            return
+
+        unique_ids, first = np.unique(bucket_ids, return_index=True)
+        present = ~np.isnan(values)
+        sums = np.add.reduceat(np.where(present, values, 0).astype(np.float64), first, axis=0)
+        counts = np.add.reduceat(present.astype(np.int64), first, axis=0)
+
+        closed_ts, closed_values = [], []
+        if current is not None:
+            if unique_ids[0] == current.bucket_id:
+                sums[0] += current.sums
+                counts[0] += current.counts
+            else:
+                closed_ts.append(current.bucket_id * width)
+                closed_values.append(current.mean())
+
+        for i in range(len(unique_ids) - 1):
+            closed_ts.append(unique_ids[i] * width)
+            closed_values.append(_Bucket(unique_ids[i], sums[i], counts[i]).mean())
+
+        if closed_ts:
+            self.tiers[name].append(np.asarray(closed_ts, dtype=np.uint32), np.stack(closed_values))
+        self.open_buckets[name] = _Bucket(int(unique_ids[-1]), sums[-1], counts[-1])
+
+    def query(self, tier: str, start_ts: int, end_ts: int):
+        with self.lock:
+            timestamps, values = self.tiers[tier].range(start_ts, end_ts)
+            bucket = self.open_buckets.get(tier)
+            width = TIERS[tier][0]
+            if bucket is not None and start_ts <= bucket.bucket_id * width < end_ts:
+                # Include the current, still filling bucket as the last point
+                timestamps = np.append(timestamps, np.uint32(bucket.bucket_id * width))
+                values = np.vstack([values, bucket.mean()])
+        return timestamps, values
+
+
+class TimeSeriesStore:
+    """All series of this process, with periodic memory-mapped snapshots"""
+
+    def __init__(self, snapshot_dir: Optional[str] = SNAPSHOT_DIR):
+        self._lock = threading.Lock()
+        self._series: Dict[tuple, Series] = {}
+        self.total_readings = 0
+        self.snapshot_dir = os.path.abspath(snapshot_dir) if snapshot_dir else None
+        if self.snapshot_dir:
+            self.load_snapshot()
+
+    def _get_series(self, user_id: str, plant_name: str, create: bool = False) -> Optional[Series]:
+        key = (user_id, plant_name.lower())
+        series = self._series.get(key)
+        if series is None and create:
+            with self._lock:
+                series = self._series.setdefault(key, Series(key))
+        return series
+
+    def append(self, user_id: str, plant_name: str, timestamps, soil_moisture, temperature, humidity):
+        """Append a batch of readings to a series"""
+        if not len(timestamps):
+            return
+        values = np.stack([
+            np.asarray(soil_moisture, dtype=np.float32),
+            np.asarray(temperature, dtype=np.float32),
+            np.asarray(humidity, dtype=np.float32)
+        ], axis=1)
+        self._get_series(user_id, plant_name, create=True).append(np.asarray(timestamps), values)
+        with self._lock:
+            self.total_readings += len(timestamps)
+
+    def latest(self, user_id: str, plant_name: str) -> Optional[Dict]:
+        """Most recent reading of a series"""
+        series = self._get_series(user_id, plant_name)
+        if series is None or series.latest is None:
+            return None
+        timestamp, values = series.latest
+        reading = {'timestamp': timestamp}
+        for column, value in zip(VALUE_COLUMNS, values):
+            reading[column] = None if np.isnan(value) else float(value)
+        return reading
+
+    def query(self, user_id: str, plant_name: str, start_ts: int, end_ts: int,
+              resolution: str = 'raw') -> Dict[str, np.ndarray]:
+        """
+        Range query on one tier
+
+        Args:
+            start_ts, end_ts: Epoch seconds, end exclusive
+            resolution: 'raw', '1m', '1h' or '1d'
+
+        Returns:
+            {'timestamp': uint32 array, 'soil_moisture'/'temperature'/'humidity': float32 arrays}
+        """
+        if resolution not in TIERS:
+            raise ValueError(f"Unknown resolution '{resolution}', expected one of {list(TIERS)}")
+        series = self._get_series(user_id, plant_name)
+        if series is None:
+            timestamps = np.zeros(0, dtype=np.uint32)
+            values = np.zeros((0, len(VALUE_COLUMNS)), dtype=np.float32)
+        else:
+            timestamps, values = series.query(resolution, start_ts, end_ts)
+        result = {'timestamp': timestamps}
+        for i, column in enumerate(VALUE_COLUMNS):
+            result[column] = values[:, i]
+        return result
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    def _series_dir(self, key) -> str:
+        digest = hashlib.sha1('\x00'.join(key).encode('utf-8')).hexdigest()[:20]
+        return os.path.join(self.snapshot_dir, digest)
+
+    def save_snapshot(self) -> int:
+        """Write every changed series to memory-mapped .npy files. Returns series written."""
+        if not self.snapshot_dir:
+            return 0
+        written = 0
+        for key, series in list(self._series.items()):
+            if not series.dirty:
+                continue
+            series_dir = self._series_dir(key)
+            os.makedirs(series_dir, exist_ok=True)
+            with series.lock:
+                meta = {'user_id': key[0], 'plant_name': key[1], 'latest': None, 'open_buckets': {}}
+                for name, ring in series.tiers.items():
+                    records = ring.to_snapshot()
+                    path = os.path.join(series_dir, f'{name}.npy')
+                    mm = np.lib.format.open_memmap(path + '.tmp', mode='w+', dtype=_SNAPSHOT_DTYPE,
+                                                   shape=records.shape)
+                    mm[:] = records
+                    mm.flush()
+                    del mm
+                    os.replace(path + '.tmp', path)
+                for name, bucket in series.open_buckets.items():
+                    if bucket is not None:
+                        meta['open_buckets'][name] = {
+                            'bucket_id': bucket.bucket_id,
+                            'sums': bucket.sums.tolist(),
+                            'counts': bucket.counts.tolist()
+                        }
+                if series.latest is not None:
+                    meta['latest'] = [series.latest[0], series.latest[1].tolist()]
+                series.dirty = False
+            with open(os.path.join(series_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+            written += 1
+        return written
+
+    def load_snapshot(self) -> int:
+        """Load every series snapshot found in snapshot_dir. Returns series loaded."""
+        if not self.snapshot_dir or not os.path.isdir(self.snapshot_dir):
+            return 0
+        loaded = 0
+        for entry in os.listdir(self.snapshot_dir):
+            meta_path = os.path.join(self.snapshot_dir, entry, 'meta.json')
+            if not os.path.exists(meta_path):
+                continue
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                series = Series((meta['user_id'], meta['plant_name']))
+                for name, ring in series.tiers.items():
+                    path = os.path.join(self.snapshot_dir, entry, f'{name}.npy')
+                    if os.path.exists(path):
+                        ring.load_snapshot(np.load(path, mmap_mode='r'))
+                for name, bucket in meta.get('open_buckets', {}).items():
+                    series.open_buckets[name] = _Bucket(bucket['bucket_id'],
+                                                        np.asarray(bucket['sums'], dtype=np.float64),
+                                                        np.asarray(bucket['counts'], dtype=np.int64))
+                if meta.get('latest'):
+                    series.latest = (meta['latest'][0], np.asarray(meta['latest'][1], dtype=np.float32))
+            except Exception as e:
+                print(f"⚠️  Skipping corrupt time series snapshot {entry}: {e}")
+                continue
+            self._series[series.key] = series
+            loaded += 1
+        if loaded:
+            print(f"📈 Loaded {loaded} sensor time series from snapshot")
+        return loaded
+
+    def start_snapshots(self, interval_seconds: int = SNAPSHOT_INTERVAL_SECONDS):
+        """Snapshot periodically in the background and once more at exit"""
+        def loop():
+            stop = threading.Event()
+            while not stop.wait(interval_seconds):
+                try:
+                    self.save_snapshot()
+                except Exception as e:
+                    print(f"⚠️  Time series snapshot failed: {e}")
+
+        threading.Thread(target=loop, name='timeseries-snapshot', daemon=True).start()
+        atexit.register(self.save_snapshot)
+
+
+# Singleton store
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_timeseries_store() -> TimeSeriesStore:
+    """Get the process-wide time series store (loads the last snapshot)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = TimeSeriesStore()
+                _store.start_snapshots()
+    return _store
@@ -0,0 +1,196 @@
+"""
+Startup Warmup
+Initializes expensive dependencies before the first request
+
+Without it the first request after a deploy pays for Firebase Admin SDK
+initialization, the gRPC channel and auth token, XGBoost model loading and
+the plant database. Warmup runs these steps in a background thread at
+startup; GET /ready returns 503 until the required steps have finished,
+while /health keeps reporting liveness only. A required step that fails
+(e.g. Firestore briefly unreachable during a deploy) is retried with
+backoff until it succeeds, so the instance becomes ready without a restart.
+With WARMUP_ON_STARTUP=0, /ready reports ready with state "disabled".
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Process start, for time-to-ready (this module is imported by app.py at startup)
+PROCESS_STARTED = time.time()
+
+WARMUP_ON_STARTUP = os.environ.get('WARMUP_ON_STARTUP', '1') != '0'
+# Backoff between retries of failed required steps (doubles up to the max)
+RETRY_INITIAL_SECONDS = 1.0
+RETRY_MAX_SECONDS = 60.0
+
+
+def _warm_firestore():
+    """Initialize credentials and channel, then one cheap read to prime the auth token"""
+    try:
+        from utils.firebase_client import get_db
+        from utils.repositories import USERS_COLLECTION
+    except ImportError:
+        from backend.utils.firebase_client import get_db
+        from backend.utils.repositories import USERS_COLLECTION
+    # A missing document costs one read and returns nothing
+    get_db().collection(USERS_COLLECTION).document('_warmup').get()
+
+
+def _warm_models():
+    """Load the XGBoost models and Gemini client used for decisions"""
+    try:
+        from services.irrigation_service import get_decision_maker
+    except ImportError:
+        from backend.services.irrigation_service import get_decision_maker
+    if get_decision_maker() is None:
+        raise RuntimeError('decision models unavailable, decisions will use the rule-based fallback')
+
+
+def _warm_plant_database():
+    try:
+        from services.plant_service import get_plant_database
+    except ImportError:
+        from backend.services.plant_service import get_plant_database
+    get_plant_database()
+
+
+def _warm_log_writer():
+    """Start the log flush thread and replay any spooled logs"""
+    try:
+        from utils.log_writer import get_log_writer
+    except ImportError:
+        from backend.utils.log_writer import get_log_writer
+    get_log_writer()
+
+
+def _warm_weather():
+    """Create the weather provider and its HTTP session (no API call)"""
+    try:
+        from utils.weather_providers import get_http_session, get_weather_provider
+    except ImportError:
+        from backend.utils.weather_providers import get_http_session, get_weather_provider
+    if get_weather_provider().name in ('weatherapi', 'record'):
+        get_http_session()
+
+
+# (name, function, required): /ready waits for required steps to succeed
+WARMUP_STEPS: List[Tuple[str, Callable, bool]] = [
+    ('firestore', _warm_firestore, True),
+    ('plant_database', _warm_plant_database, True),
+    ('log_writer', _warm_log_writer, True),
+    ('models', _warm_models, False),
+    ('weather', _warm_weather, False),
+]
+
+
+class Warmup:
+    """Runs the warmup steps (retrying failed required ones) and reports progress"""
+
+    def __init__(self, steps: List[Tuple[str, Callable, bool]] = None, enabled: bool = True):
+        self.steps = steps if steps is not None else WARMUP_STEPS
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        # Disabled: nothing to wait for (dependencies initialize on first use)
+        self._state = 'pending' if enabled else 'disabled'
+        self._results: Dict[str, Dict] = {name: {'status': 'pending', 'required': required}
+                                          for name, _, required in self.steps}
+        self._started_at = None
+        self._finished_at = None
+
+    def start(self) -> 'Warmup':
+        """Run the steps in a background thread (no-op if already started)"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, daemon=True, name='warmup')
+                self._thread.start()
+        return self
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until warmup finishes. Returns True if ready."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.is_ready()
+
+    def run(self):
+        self._started_at = time.time()
+        self._state = 'running'
+        print("🔥 Warming up...")
+        for name, step, required in self.steps:
+            self._run_step(name, step, required)
+
+        delay = RETRY_INITIAL_SECONDS
+        while True:
+            failed = [(name, step) for name, step, required in self.steps
+                      if required and self._results[name]['status'] != 'ok']
+            if not failed:
+                break
+            self._state = 'retrying'
+            print(f"❌ Warmup not ready ({', '.join(name for name, _ in failed)}), "
+                  f"retrying in {delay:.0f}s")
+            time.sleep(delay)
+            delay = min(delay * 2, RETRY_MAX_SECONDS)
+            for name, step in failed:
+                self._run_step(name, step, True)
+
+        self._finished_at = time.time()
+        self._state = 'ready'
+        timings = ', '.join(f"{name} {r['seconds']}s" for name, r in self._results.items())
+        print(f"✅ Ready in {self._finished_at - PROCESS_STARTED:.1f}s since start ({timings})")
+
+    def _run_step(self, name: str, step: Callable, required: bool):
+        result = self._results[name]
+        result['status'] = 'running'
+        result['attempts'] = result.get('attempts', 0) + 1
+        t0 = time.perf_counter()
+        try:
+            step()
+            result['status'] = 'ok'
+            result.pop('error', None)
+        except Exception as e:
+            result['status'] = 'failed'
+            result['error'] = str(e)
+            print(f"{'❌' if required else '⚠️ '} Warmup step '{name}' failed: {e}")
+        result['seconds'] = round(time.perf_counter() - t0, 3)
+
+    def is_ready(self) -> bool:
+        return self._state in ('ready', 'disabled')
+
+    def get_status(self) -> Dict:
+        """Readiness report for GET /ready"""
+        status = {
+            'ready': self.is_ready(),
+            'state': self._state,
+            'steps': {name: dict(result) for name, result in self._results.items()},
+            'started_at': datetime.fromtimestamp(PROCESS_STARTED).isoformat()
+        }
+        if self._started_at is not None:
+            status['warmup_started_at'] = datetime.fromtimestamp(self._started_at).isoformat()
+        if self._finished_at is not None:
+            status['warmup_seconds'] = round(self._finished_at - self._started_at, 3)
+            status['time_to_ready_seconds'] = round(self._finished_at - PROCESS_STARTED, 3)
+        else:
+            status['elapsed_seconds'] = round(time.time() - PROCESS_STARTED, 3)
+        return status
+
+
+# Singleton warmup
+_warmup = None
+_warmup_lock = threading.Lock()
+
+
+def get_warmup() -> Warmup:
+    """Get the process-wide warmup"""
+    global _warmup
+    if _warmup is None:
+        with _warmup_lock:
+            if _warmup is None:
+                _warmup = Warmup(enabled=WARMUP_ON_STARTUP)
+    return _warmup
+
+
+def start_warmup() -> Warmup:
+    """Start warming up in the background (called once at app startup)"""
+    return get_warmup().start()
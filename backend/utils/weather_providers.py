@@ -0,0 +1,432 @@
+"""
+Weather Providers
+Sources of WeatherAPI-format forecast payloads
+
+Every provider returns a decoded forecast.json payload in WeatherAPI's
+format (location, current, forecast.forecastday[].hour[]), so parsing,
+caching and the offline store do not depend on where it came from.
+
+  weatherapi - WeatherAPI.com over a pooled HTTP session (default)
+  replay     - captured JSON files, no network
+  record     - WeatherAPI, saving every payload for later replay
+  synthetic  - deterministic seasonal Tunisian weather for load tests
+
+Select with WEATHER_PROVIDER; WEATHER_REPLAY_DIR and WEATHER_SYNTHETIC_SEED
+configure the replay and synthetic providers.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Handle imports for running from backend/ or parent directory
+try:
+    from utils.forecast_cache import normalize_location
+    from utils.geo import normalize_name, resolve_location
+    from utils.rate_limiter import TokenBucket
+except ImportError:
+    from backend.utils.forecast_cache import normalize_location
+    from backend.utils.geo import normalize_name, resolve_location
+    from backend.utils.rate_limiter import TokenBucket
+
+PROVIDER_NAME = os.environ.get('WEATHER_PROVIDER', 'weatherapi')
+REPLAY_DIR = os.environ.get(
+    'WEATHER_REPLAY_DIR',
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'weather', 'replay')
+)
+SYNTHETIC_SEED = int(os.environ.get('WEATHER_SYNTHETIC_SEED', 42))
+
+# WeatherAPI.com API key
+API_KEY = os.environ.get('WEATHER_API_KEY', '2df98185da8e47e8940212529250111')
+# Override to point at a stand-in server (benchmarks, local testing)
+BASE_URL = os.environ.get('WEATHER_API_BASE_URL', 'https://api.weatherapi.com/v1').rstrip('/')
+
+# WeatherAPI plan quota, shared by every fetch in this process
+MAX_CALLS_PER_MINUTE = float(os.environ.get('WEATHER_API_MAX_CALLS_PER_MINUTE', 600))
+QUOTA_BURST = int(os.environ.get('WEATHER_API_QUOTA_BURST', 60))
+# A fetch waits at most this long for quota before failing
+QUOTA_WAIT_SECONDS = 10
+
+# HTTP client tuning
+HTTP_POOL_SIZE = int(os.environ.get('WEATHER_HTTP_POOL_SIZE', 16))
+CONNECT_TIMEOUT_SECONDS = 3.05
+READ_TIMEOUT_SECONDS = 10
+MAX_RETRIES = 3
+RETRY_BACKOFF_FACTOR = 0.5   # 0.5s, 1s, 2s between attempts
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+# Tunisia does not observe daylight saving time
+TUNISIA_TZ = timezone(timedelta(hours=1))
+
+
+def get_quota_stats() -> dict:
+    """WeatherAPI quota limiter counters"""
+    return _quota.get_stats()
+
+
+_quota = TokenBucket(MAX_CALLS_PER_MINUTE, QUOTA_BURST)
+
+# Pooled HTTP session (keep-alive, retries failed connections)
+_session = None
+_session_lock = threading.Lock()
+_http_stats = {'requests': 0, 'errors': 0, 'retries': 0, 'connect_retries': 0,
+               'total_latency_ms': 0.0, 'max_latency_ms': 0.0, 'last_latency_ms': None}
+
+
+def get_http_session() -> requests.Session:
+    """Get the process-wide WeatherAPI session"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                # Only failed connections are retried here: they never reach
+                # WeatherAPI. 5xx responses are billed calls, so fetch()
+                # retries them itself, taking quota for each attempt
+                retry = Retry(
+                    total=MAX_RETRIES,
+                    read=0,  # A slow read is not retried: the forecast cache will try again
+                    status=0,
+                    backoff_factor=RETRY_BACKOFF_FACTOR,
+                    allowed_methods=frozenset(['GET']),
+                    respect_retry_after_header=False,
+                    raise_on_status=False
+                )
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE,
+                                      max_retries=retry, pool_block=False)
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def _http_get(url: str) -> requests.Response:
+    """GET through the pooled session, recording latency and retries"""
+    t0 = time.perf_counter()
+    try:
+        response = get_http_session().get(url, timeout=(CONNECT_TIMEOUT_SECONDS, READ_TIMEOUT_SECONDS))
+    except requests.exceptions.RequestException:
+        _record_http_call(t0, error=True)
+        raise
+    retries = response.raw.retries.history if getattr(response.raw, 'retries', None) else ()
+    _record_http_call(t0, error=response.status_code >= 400, retries=len(retries))
+    return response
+
+
+def _record_http_call(t0: float, error: bool = False, retries: int = 0):
+    latency_ms = (time.perf_counter() - t0) * 1000
+    with _session_lock:
+        _http_stats['requests'] += 1
+        _http_stats['errors'] += int(error)
+        _http_stats['retries'] += retries
+        _http_stats['connect_retries'] += retries
+        _http_stats['total_latency_ms'] += latency_ms
+        _http_stats['max_latency_ms'] = max(_http_stats['max_latency_ms'], latency_ms)
+        _http_stats['last_latency_ms'] = latency_ms
+
+
+def get_http_stats() -> dict:
+    """
+    WeatherAPI client metrics
+    
+    Returns:
+        Request/error/retry counts, latency, and connections opened vs reused
+    """
+    with _session_lock:
+        stats = dict(_http_stats)
+        session = _session
+    
+    # urllib3 counts every new connection a pool opens
+    connections_opened = 0
+    if session is not None:
+        for adapter in session.adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    connections_opened += pool.num_connections
+    
+    requests_made = stats['requests']
+    stats['connections_opened'] = connections_opened
+    # Each 5xx retry is its own request; connection retries happen inside one
+    stats['connections_reused'] = max(requests_made + stats.pop('connect_retries') - connections_opened, 0)
+    stats['avg_latency_ms'] = round(stats['total_latency_ms'] / requests_made, 1) if requests_made else None
+    stats['max_latency_ms'] = round(stats['max_latency_ms'], 1)
+    if stats['last_latency_ms'] is not None:
+        stats['last_latency_ms'] = round(stats['last_latency_ms'], 1)
+    del stats['total_latency_ms']
+    return stats
+
+
+class WeatherProviderError(Exception):
+    """The provider could not produce a forecast"""
+
+
+class WeatherProvider(ABC):
+    """Base class: fetch(location) returns a forecast.json payload"""
+
+    name = 'base'
+
+    @abstractmethod
+    def fetch(self, location: str) -> Dict:
+        """
+        Forecast payload for a location
+
+        Raises:
+            WeatherProviderError: no forecast could be produced
+        """
+
+
+class WeatherAPIProvider(WeatherProvider):
+    """WeatherAPI.com forecast.json, 2 days"""
+
+    name = 'weatherapi'
+
+    def __init__(self, base_url: str = BASE_URL, api_key: str = API_KEY):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+
+    def fetch(self, location: str) -> Dict:
+        url = f"{self.base_url}/forecast.json?key={self.api_key}&q={location}&days=2&aqi=no"
+        try:
+            # Every attempt is a billed call: each one takes quota
+            for attempt in range(MAX_RETRIES + 1):
+                if not _quota.acquire(QUOTA_WAIT_SECONDS):
+                    raise WeatherProviderError('WeatherAPI call quota exceeded')
+                response = _http_get(url)
+                if response.status_code not in RETRY_STATUS_CODES or attempt == MAX_RETRIES:
+                    break
+                with _session_lock:
+                    _http_stats['retries'] += 1
+                time.sleep(RETRY_BACKOFF_FACTOR * 2 ** attempt)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            # URLs in errors carry the key
+            raise WeatherProviderError(str(e).replace(self.api_key, '***')) from e
+        return response.json()
+
+
+class ReplayProvider(WeatherProvider):
+    """
+    Serves captured payloads from a directory, one JSON file per location
+
+    Args:
+        directory: Where payloads are stored
+        source: Provider to fetch from when recording or when no capture exists
+        record: Always fetch from source and overwrite the capture
+        rebase: Shift replayed payloads by whole days so they start today
+    """
+
+    name = 'replay'
+
+    def __init__(self, directory: str = REPLAY_DIR, source: Optional[WeatherProvider] = None,
+                 record: bool = False, rebase: bool = True):
+        self.directory = os.path.abspath(directory)
+        self.source = source
+        self.record = record
+        self.rebase = rebase
+        if record:
+            self.name = 'record'
+
+    def path_for(self, location: str) -> str:
+        key = normalize_location(location)
+        slug = re.sub(r'[^a-z0-9]+', '_', normalize_name(key)).strip('_')[:48]
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:8]
+        return os.path.join(self.directory, f'{slug}-{digest}.json' if slug else f'{digest}.json')
+
+    def fetch(self, location: str) -> Dict:
+        path = self.path_for(location)
+        if self.record or not os.path.exists(path):
+            if self.source is None:
+                raise WeatherProviderError(f'No captured forecast for {location!r} in {self.directory}')
+            payload = self.source.fetch(location)
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(path + '.tmp', path)
+            return payload
+
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        return rebase_payload(payload) if self.rebase else payload
+
+
+def rebase_payload(payload: Dict, now: Optional[float] = None) -> Dict:
+    """Shift a captured payload by whole days so its first day is today"""
+    now = time.time() if now is None else now
+    captured = payload['location']['localtime_epoch']
+    shift = int((now - captured) // 86400) * 86400
+    local_now = datetime.fromtimestamp(now, TUNISIA_TZ)
+    payload['location']['localtime_epoch'] = int(now)
+    payload['location']['localtime'] = f"{local_now:%Y-%m-%d} {local_now.hour}:{local_now:%M}"
+    if shift:
+        for day in payload['forecast']['forecastday']:
+            if 'date_epoch' in day:
+                day['date_epoch'] += shift
+            for hour in day['hour']:
+                hour['time_epoch'] += shift
+                hour['time'] = datetime.fromtimestamp(hour['time_epoch'], TUNISIA_TZ).strftime('%Y-%m-%d %H:%M')
+            day['date'] = datetime.fromtimestamp(day['hour'][0]['time_epoch'], TUNISIA_TZ).strftime('%Y-%m-%d')
+    return payload
+
+
+class SyntheticProvider(WeatherProvider):
+    """
+    Seasonal Tunisian weather, deterministic for (seed, location, day)
+
+    The north is cooler with wet winters, the south hotter and drier.
+    Temperature follows a diurnal cycle, radiation follows solar elevation,
+    and rainy days get a storm window of a few hours.
+    """
+
+    name = 'synthetic'
+
+    def __init__(self, seed: int = SYNTHETIC_SEED, clock=time.time):
+        self.seed = seed
+        self.clock = clock
+
+    def _coordinates(self, location: str):
+        resolved = resolve_location(location)
+        if resolved['resolved']:
+            lat, lon = (float(v) for v in resolved['query'].split(','))
+            return lat, lon
+        return 36.8065, 10.1815  # Tunis
+
+    def _day(self, location_key: str, lat: float, day_start: datetime) -> Dict[str, np.ndarray]:
+        digest = hashlib.sha256(f'{self.seed}:{location_key}:{day_start:%Y-%m-%d}'.encode('utf-8')).digest()
+        rng = np.random.default_rng(int.from_bytes(digest[:8], 'little'))
+        doy = day_start.timetuple().tm_yday
+        hours = np.arange(24)
+        south = 36.8 - lat  # degrees south of Tunis
+
+        season = math.sin(2 * math.pi * (doy - 105) / 365)  # -1 mid-January, +1 mid-July
+        mean_temp = 19 + 8.5 * season + 0.9 * south + rng.normal(0, 1.5)
+        amplitude = 5 + 0.6 * south + 1.5 * season
+        temp = mean_temp + amplitude * np.sin(2 * np.pi * (hours - 9) / 24) + rng.normal(0, 0.4, 24)
+
+        # Wet-day chance: ~40% in a northern winter, a few percent in summer or the south
+        wet_chance = max(0.02, (0.22 - 0.2 * season) * float(np.clip((lat - 31) / 6, 0.15, 1.0)))
+        chance_of_rain = rng.uniform(0, 20, 24).round()
+        precip = np.zeros(24)
+        cloud_factor = np.ones(24)
+        if rng.random() < wet_chance:
+            start = int(rng.integers(0, 20))
+            length = int(rng.integers(2, 9))
+            storm = (hours >= start) & (hours < start + length)
+            chance_of_rain[storm] = rng.uniform(60, 95, storm.sum()).round()
+            precip[storm] = rng.exponential(1.5, storm.sum()).round(2)
+            cloud_factor[storm] = 0.3
+
+        humidity = np.clip(72 - 3.5 * south - 2.0 * (temp - mean_temp) + 20 * (cloud_factor < 1)
+                           + rng.normal(0, 3, 24), 15, 100).round()
+        wind = np.clip(rng.gamma(4, 3, 24) * (1 + 0.3 * np.sin(2 * np.pi * (hours - 10) / 24)), 0, 80).round(1)
+
+        # Clear-sky shortwave radiation from solar elevation
+        declination = math.radians(23.44) * math.sin(2 * math.pi * (284 + doy) / 365)
+        hour_angle = np.radians(15 * (hours + 0.5 - 12.5))
+        phi = math.radians(lat)
+        sin_elevation = math.sin(phi) * math.sin(declination) + \
+            math.cos(phi) * math.cos(declination) * np.cos(hour_angle)
+        short_rad = (np.clip(sin_elevation, 0, None) * 1000 * 0.75 * cloud_factor).round(1)
+
+        return {
+            'temp_c': temp.round(1), 'humidity': humidity, 'wind_kph': wind,
+            'chance_of_rain': chance_of_rain, 'precip_mm': precip, 'short_rad': short_rad
+        }
+
+    def fetch(self, location: str) -> Dict:
+        now = self.clock()
+        lat, lon = self._coordinates(location)
+        key = normalize_location(location)
+        local_now = datetime.fromtimestamp(now, TUNISIA_TZ)
+        today = local_now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        forecastday = []
+        for d in range(2):
+            day_start = today + timedelta(days=d)
+            series = self._day(key, lat, day_start)
+            day_epoch = int(day_start.timestamp())
+            hours = []
+            for h in range(24):
+                temp = float(series['temp_c'][h])
+                rain = float(series['chance_of_rain'][h])
+                precip = float(series['precip_mm'][h])
+                hours.append({
+                    'time_epoch': day_epoch + h * 3600,
+                    'time': f'{day_start:%Y-%m-%d} {h:02d}:00',
+                    'temp_c': temp,
+                    'humidity': int(series['humidity'][h]),
+                    'wind_kph': float(series['wind_kph'][h]),
+                    'chance_of_rain': int(rain),
+                    'precip_mm': precip,
+                    'short_rad': float(series['short_rad'][h]),
+                    'uv': round(float(series['short_rad'][h]) / 100, 1),
+                    'feelslike_c': temp,
+                    'condition': {'text': 'Moderate rain' if precip >= 1 else
+                                  'Patchy rain nearby' if rain >= 60 else
+                                  'Sunny' if series['short_rad'][h] > 0 else 'Clear'}
+                })
+            forecastday.append({'date': f'{day_start:%Y-%m-%d}', 'date_epoch': day_epoch, 'hour': hours})
+
+        current = forecastday[0]['hour'][local_now.hour]
+        return {
+            'location': {
+                'name': location, 'lat': lat, 'lon': lon, 'tz_id': 'Africa/Tunis',
+                'localtime_epoch': int(now),
+                'localtime': f"{local_now:%Y-%m-%d} {local_now.hour}:{local_now:%M}"
+            },
+            'current': {
+                'temp_c': current['temp_c'], 'humidity': current['humidity'],
+                'condition': current['condition'], 'wind_kph': current['wind_kph'],
+                'feelslike_c': current['feelslike_c']
+            },
+            'forecast': {'forecastday': forecastday}
+        }
+
+
+def create_provider(name: str = PROVIDER_NAME) -> WeatherProvider:
+    """Build a provider by name (weatherapi, replay, record, synthetic)"""
+    if name == 'weatherapi':
+        return WeatherAPIProvider()
+    if name == 'replay':
+        return ReplayProvider(REPLAY_DIR)
+    if name == 'record':
+        return ReplayProvider(REPLAY_DIR, source=WeatherAPIProvider(), record=True)
+    if name == 'synthetic':
+        return SyntheticProvider(SYNTHETIC_SEED)
+    raise ValueError(f"Unknown WEATHER_PROVIDER '{name}'")
+
+
+# Active provider
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_weather_provider() -> WeatherProvider:
+    """Get the process-wide provider selected by WEATHER_PROVIDER"""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = create_provider()
+                print(f"🌦️  Weather provider: {_provider.name}")
+    return _provider
+
+
+def set_weather_provider(provider: WeatherProvider):
+    """Swap the active provider (benchmarks, load tests)"""
+    global _provider
+    with _provider_lock:
+        _provider = provider
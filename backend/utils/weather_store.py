@@ -0,0 +1,152 @@
+"""
+Offline Weather Store
+Local SQLite copy of every fetched forecast, for provider outages
+
+Each successful WeatherAPI fetch stores its hourly rain forecast (both
+days, keyed by location and hour) and current conditions. When the
+provider is unreachable, the most recent forecast for the hours still ahead
+is served instead, marked degraded with how stale it is.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+
+STORE_PATH = os.environ.get(
+    'WEATHER_STORE_PATH',
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'weather', 'forecasts.sqlite3')
+)
+FORECAST_HOURS = 24
+# Hours older than this are pruned
+RETENTION_SECONDS = 3 * 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS forecast_hours (
+    location_key TEXT NOT NULL,
+    hour_epoch INTEGER NOT NULL,
+    rain_probability REAL NOT NULL,
+    precipitation_mm REAL NOT NULL,
+    fetched_at INTEGER NOT NULL,
+    PRIMARY KEY (location_key, hour_epoch)
+);
+CREATE TABLE IF NOT EXISTS current_conditions (
+    location_key TEXT PRIMARY KEY,
+    current_json TEXT NOT NULL,
+    fetched_at INTEGER NOT NULL
+);
+"""
+
+
+class WeatherStore:
+    """SQLite forecast store (one connection per call, WAL journal)"""
+
+    def __init__(self, path: str = STORE_PATH):
+        self.path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._write_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:  # Commits on success
+                yield conn
+        finally:
+            conn.close()
+
+    def save(self, location_key: str, payload: Dict, current_weather: Dict):
+        """
+        Store every forecast hour of a WeatherAPI payload
+
+        Args:
+            location_key: Normalized provider query
+            payload: Decoded forecast.json response
+            current_weather: Parsed current conditions
+        """
+        now = int(time.time())
+        rows = [
+            (location_key, hour['time_epoch'], float(hour['chance_of_rain']), float(hour['precip_mm']), now)
+            for day in payload['forecast']['forecastday'] for hour in day['hour']
+        ]
+        with self._write_lock, self._connect() as conn:
+            conn.executemany('INSERT OR REPLACE INTO forecast_hours VALUES (?, ?, ?, ?, ?)', rows)
+            conn.execute('INSERT OR REPLACE INTO current_conditions VALUES (?, ?, ?)',
+                         (location_key, json.dumps(current_weather), now))
+            conn.execute('DELETE FROM forecast_hours WHERE hour_epoch < ?', (now - RETENTION_SECONDS,))
+
+    def load(self, location_key: str, location: str, now: Optional[float] = None) -> Optional[Dict]:
+        """
+        Last stored forecast for the next 24 hours
+
+        Returns:
+            Forecast dict shaped like get_weather_forecast's, with
+            'degraded': True and a 'staleness' block, or None if nothing
+            stored covers the coming hours.
+        """
+        now = time.time() if now is None else now
+        start = int(-(-(now // 60 * 60) // 3600) * 3600)  # First hour at or after now
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT hour_epoch, rain_probability, precipitation_mm, fetched_at FROM forecast_hours '
+                'WHERE location_key = ? AND hour_epoch >= ? AND hour_epoch < ? ORDER BY hour_epoch',
+                (location_key, start, start + FORECAST_HOURS * 3600)
+            ).fetchall()
+            current_row = conn.execute(
+                'SELECT current_json, fetched_at FROM current_conditions WHERE location_key = ?',
+                (location_key,)
+            ).fetchone()
+        if not rows or current_row is None:
+            return None
+
+        data = np.asarray(rows, dtype=np.float64)
+        index = ((data[:, 0] - start) // 3600).astype(int)
+        hourly_rain_probability = np.zeros(FORECAST_HOURS)
+        hourly_precipitation_mm = np.zeros(FORECAST_HOURS)
+        hourly_rain_probability[index] = data[:, 1]
+        hourly_precipitation_mm[index] = data[:, 2]
+        fetched_at = int(data[:, 3].min())
+
+        return {
+            'success': True,
+            'location': location,
+            'current': json.loads(current_row[0]),
+            'hourly_rain_probability': hourly_rain_probability,
+            'hourly_precipitation_mm': hourly_precipitation_mm,
+            'total_rainfall_24h': float(hourly_precipitation_mm.sum()),
+            'max_rain_probability_24h': float(hourly_rain_probability.max()),
+            'timestamp': datetime.now().isoformat(),
+            'degraded': True,
+            'staleness': {
+                'source': 'offline_store',
+                'fetched_at': datetime.fromtimestamp(fetched_at).isoformat(),
+                'age_minutes': int((now - fetched_at) // 60),
+                'current_fetched_at': datetime.fromtimestamp(current_row[1]).isoformat(),
+                'hours_available': len(rows),
+                'hours_missing': FORECAST_HOURS - len(rows)
+            }
+        }
+
+
+# Singleton store
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_weather_store() -> WeatherStore:
+    """Get the process-wide offline weather store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = WeatherStore()
+    return _store